@@ -11,14 +11,108 @@ Aplicación web para comparar dos documentos y detectar plagio.
 import streamlit as st
 import sys
 import os
+import html
 import tempfile
+import time
+import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 
 # Agregar el directorio src al path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.plagiarism_detector import PlagiarismDetector
+from src.plagiarism_detector import PlagiarismDetector, PROGRESS_STAGES
+from src.embedding_cache import EmbeddingCache
+from src.result_cache import ResultCache
+from src.job_queue import JobQueue, QUEUED, RUNNING, FAILED, CANCELLED
+from src.document_loader import load_document, iter_archive_documents
+from src.batch_comparison import BatchComparison, BATCH_STAGES
+from src.profiling import TimingStats, configure_logging, start_metrics_server
+
+# Directorio de caché (volumen /app/cache en docker-compose)
+CACHE_DIR = os.environ.get(
+    'PLAGIARISM_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'cache'))
+
+# Backend de embeddings: 'torch' (SentenceTransformer) u 'onnx' (int8 en models/)
+EMBEDDING_BACKEND = os.environ.get('PLAGIARISM_EMBEDDING_BACKEND', 'torch')
+
+# Documentos largos: codificar por ventanas solapadas en lugar de truncar
+CHUNKED_ENCODING = os.environ.get('PLAGIARISM_CHUNKED_ENCODING', '0') != '0'
+
+# Caché de resultados: tiempo de vida (segundos) y máximo de comparaciones
+RESULT_CACHE_TTL = float(os.environ.get('PLAGIARISM_RESULT_TTL', 7 * 24 * 3600))
+RESULT_CACHE_MAX_ITEMS = int(os.environ.get('PLAGIARISM_RESULT_MAX_ITEMS', 2000))
+
+# Comparaciones ejecutándose a la vez (las demás esperan en cola) y
+# segundos entre consultas del estado de un trabajo
+MAX_CONCURRENT_JOBS = int(os.environ.get('PLAGIARISM_MAX_CONCURRENT_JOBS', 1))
+JOB_POLL_SECONDS = float(os.environ.get('PLAGIARISM_JOB_POLL_SECONDS', 1.0))
+
+# Límites de los documentos subidos (tamaño del archivo y texto extraído)
+MAX_UPLOAD_BYTES = int(float(os.environ.get('PLAGIARISM_MAX_UPLOAD_MB', 20)) * 1024 * 1024)
+MAX_DOCUMENT_CHARS = int(os.environ.get('PLAGIARISM_MAX_DOCUMENT_CHARS', 2_000_000))
+
+# Logging (nivel y formato JSON) y puerto local opcional de /metrics
+# con los tiempos por etapa en formato de Prometheus
+LOG_LEVEL = os.environ.get('PLAGIARISM_LOG_LEVEL', 'INFO')
+LOG_JSON = os.environ.get('PLAGIARISM_LOG_JSON', '0') != '0'
+METRICS_PORT = int(os.environ.get('PLAGIARISM_METRICS_PORT', 0))
+
+# Modo por lotes: documentos máximos por lote
+MAX_BATCH_DOCUMENTS = int(os.environ.get('PLAGIARISM_MAX_BATCH_DOCUMENTS', 300))
+
+STAGE_LABELS = {
+    'preprocess': "Preprocesando textos",
+    'semantic': "Calculando similitud semántica",
+    'lexical': "Calculando métricas léxicas",
+    'sequence': "Analizando secuencias",
+    'screening': "Preseleccionando pares (embeddings y shingles)",
+    'analysis': "Analizando a fondo los pares más parecidos",
+}
+
+
+@st.cache_resource
+def load_embedding_cache():
+    """
+    Caché de embeddings compartida por todas las sesiones.
+    Los documentos de referencia no se vuelven a codificar.
+    """
+    return EmbeddingCache(cache_dir=os.path.join(CACHE_DIR, 'embeddings'))
+
+
+@st.cache_resource
+def load_result_cache():
+    """
+    Caché de resultados compartida por todas las sesiones (volumen de caché).
+    Las comparaciones repetidas se muestran sin recalcular.
+    """
+    return ResultCache(cache_dir=os.path.join(CACHE_DIR, 'results'),
+                       ttl_seconds=RESULT_CACHE_TTL, max_items=RESULT_CACHE_MAX_ITEMS)
+
+
+@st.cache_resource
+def load_timing_stats():
+    """
+    Tiempos por etapa acumulados de todas las sesiones. Configura el
+    logging una sola vez y, si PLAGIARISM_METRICS_PORT está definido,
+    los sirve en /metrics.
+    """
+    configure_logging(LOG_LEVEL, json_format=LOG_JSON)
+    stats = TimingStats()
+    if METRICS_PORT:
+        start_metrics_server(stats, METRICS_PORT)
+    return stats
+
+
+@st.cache_resource
+def load_job_queue():
+    """
+    Cola de comparaciones compartida por todas las sesiones.
+    El análisis corre fuera del hilo del script, de modo que la sesión
+    sigue respondiendo, y el número de análisis simultáneos está acotado
+    para no exceder la memoria del contenedor.
+    """
+    return JobQueue(stages=PROGRESS_STAGES, max_concurrent=MAX_CONCURRENT_JOBS)
 
 
 @st.cache_resource
@@ -26,8 +120,16 @@ def load_plagiarism_detector(language, model_name='paraphrase-multilingual-MiniL
     """
     Cachea el detector para evitar recargarlo en cada interacción.
     Esto mejora significativamente el rendimiento en deployment.
+    Las sesiones concurrentes comparten lotes de embeddings (micro_batching).
+    El modelo se carga en segundo plano mientras se dibuja la interfaz (warm_up).
     """
-    return PlagiarismDetector(language=language, model_name=model_name)
+    return PlagiarismDetector(language=language, model_name=model_name,
+                              embedding_cache=load_embedding_cache(),
+                              micro_batching=True, warm_up=True,
+                              embedding_backend=EMBEDDING_BACKEND,
+                              chunked_encoding=CHUNKED_ENCODING,
+                              passage_alignment=True,
+                              timing_stats=load_timing_stats())
 
 
 def create_gauge_chart(percentage, title):
@@ -97,6 +199,38 @@ def create_breakdown_chart(breakdown_data):
     return fig
 
 
+def highlight_passages(text, passages, span_key):
+    """
+    Marca en HTML los pasajes coincidentes de un texto.
+
+    Args:
+        text: Texto original
+        passages: Pasajes del detector (details['passages'])
+        span_key: 'source_span' (documento A) o 'suspicious_span' (documento B)
+    """
+    parts = []
+    cursor = 0
+    numbered = sorted(enumerate(passages, start=1), key=lambda item: item[1][span_key][0])
+
+    for number, passage in numbered:
+        start, end = passage[span_key]
+        if start < cursor:
+            start = cursor
+        if start >= end:
+            continue
+        parts.append(html.escape(text[cursor:start]))
+        color = "#ffb3b3" if passage['score'] >= 0.75 else "#ffe08a"
+        parts.append(
+            f'<mark style="background-color:{color}" title="Pasaje {number} '
+            f'({passage["score"]*100:.0f}%)"><sup>{number}</sup>'
+            f'{html.escape(text[start:end])}</mark>')
+        cursor = end
+
+    parts.append(html.escape(text[cursor:]))
+    return ('<div style="max-height:400px;overflow-y:auto;white-space:pre-wrap;'
+            'font-size:0.9em">' + ''.join(parts) + '</div>')
+
+
 def get_verdict_color(similarity_percentage):
     """Retorna el color basado en el nivel de similitud"""
     if similarity_percentage >= 75:
@@ -109,6 +243,408 @@ def get_verdict_color(similarity_percentage):
         return "green"
 
 
+def render_results(result, text_a, text_b):
+    """Muestra el resultado de una comparación (recién calculado o de la caché)"""
+    st.markdown("---")
+    st.header("📊 Resultados del Análisis")
+
+    # Resultado principal
+    similarity = result['similarity_percentage']
+    verdict = result['verdict']
+    verdict_color = get_verdict_color(similarity)
+
+    # Gauge principal
+    st.plotly_chart(
+        create_gauge_chart(similarity, "Similitud Total"),
+        use_container_width=True
+    )
+
+    # Veredicto con color
+    st.markdown(f"### Veredicto: :{verdict_color}[{verdict}]")
+
+    st.markdown("---")
+
+    # Desglose por categorías
+    st.subheader("📈 Desglose Detallado por Categorías")
+
+    # Gráfico de barras
+    st.plotly_chart(
+        create_breakdown_chart(result['breakdown']),
+        use_container_width=True
+    )
+
+    # Tabla con métricas
+    col_metrics1, col_metrics2, col_metrics3, col_metrics4 = st.columns(4)
+
+    with col_metrics1:
+        st.metric(
+            label="🧠 Semántico",
+            value=result['breakdown']['semantic'],
+            delta=None
+        )
+
+    with col_metrics2:
+        st.metric(
+            label="📝 Léxico",
+            value=result['breakdown']['lexical'],
+            delta=None
+        )
+
+    with col_metrics3:
+        st.metric(
+            label="🏗️ Estructural",
+            value=result['breakdown']['structural'],
+            delta=None
+        )
+
+    with col_metrics4:
+        st.metric(
+            label="🔄 Secuencia",
+            value=result['breakdown']['sequence'],
+            delta=None
+        )
+
+    st.markdown("---")
+
+    # Información detallada en expandibles
+    passages = result['details'].get('passages', [])
+    with st.expander(f"🖍️ Pasajes Coincidentes ({len(passages)})", expanded=bool(passages)):
+        if passages:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("**Documento A**")
+                st.markdown(highlight_passages(text_a, passages, 'source_span'),
+                            unsafe_allow_html=True)
+            with col2:
+                st.markdown("**Documento B**")
+                st.markdown(highlight_passages(text_b, passages, 'suspicious_span'),
+                            unsafe_allow_html=True)
+
+            st.table({
+                'Pasaje': list(range(1, len(passages) + 1)),
+                'A (caracteres)': [f"{p['source_span'][0]}-{p['source_span'][1]}" for p in passages],
+                'B (caracteres)': [f"{p['suspicious_span'][0]}-{p['suspicious_span'][1]}" for p in passages],
+                'Similitud': [f"{p['score']*100:.1f}%" for p in passages],
+                'Método': [p['method'] for p in passages]
+            })
+        else:
+            st.info("No se encontraron pasajes coincidentes.")
+
+    with st.expander("🔬 Análisis Semántico Detallado"):
+        semantic = result['details']['semantic']
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.metric("Similitud Global", f"{semantic['overall']*100:.2f}%")
+        with col2:
+            st.metric("Promedio de Oraciones", f"{semantic['sentence_avg']*100:.2f}%")
+        with col3:
+            st.metric("Oraciones Coincidentes", semantic['matched_sentences'])
+
+        aligned = semantic.get('aligned_sentences', [])
+        if aligned:
+            st.markdown("**Oraciones coincidentes:**")
+            for match in sorted(aligned, key=lambda m: m['similarity'], reverse=True)[:20]:
+                st.markdown(
+                    f"- **A[{match['index1'] + 1}]** {match['sentence1']}  \n"
+                    f"  **B[{match['index2'] + 1}]** {match['sentence2']}  \n"
+                    f"  :orange[{match['similarity']*100:.1f}%]"
+                )
+
+        st.info("El análisis semántico usa embeddings de BERT para detectar parafraseo y similitud de significado.")
+
+    with st.expander("📖 Métricas Léxicas Detalladas"):
+        lexical = result['details']['lexical']
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.metric("TF-IDF Coseno", f"{lexical['tfidf_cosine']*100:.2f}%")
+            st.metric("Jaccard", f"{lexical['jaccard']*100:.2f}%")
+
+        with col2:
+            st.metric("Trigramas", f"{lexical['trigram']*100:.2f}%")
+            st.metric("Dice Coefficient", f"{lexical['dice']*100:.2f}%")
+
+        st.info("Las métricas léxicas analizan similitud a nivel de palabras, n-gramas y vocabulario.")
+
+    with st.expander("⚖️ Pesos Utilizados en el Análisis"):
+        weights = result['weights_used']
+
+        weights_data = {
+            'Categoría': list(weights.keys()),
+            'Peso': [f"{v*100:.0f}%" for v in weights.values()]
+        }
+
+        st.table(weights_data)
+        st.info("El puntaje final es una combinación ponderada de todas las métricas.")
+
+    timings = result['details'].get('timings')
+    if timings:
+        with st.expander("⏱️ Tiempo por Etapa"):
+            st.dataframe(pd.DataFrame([{
+                'Etapa': stage,
+                'Tiempo (ms)': round(record['wall_ms'], 1),
+                'CPU (ms)': round(record['cpu_ms'], 1),
+                'Entrada': ', '.join(f"{key}={int(value)}" for key, value in record.items()
+                                     if key not in ('wall_ms', 'cpu_ms', 'calls')),
+            } for stage, record in sorted(timings.items(), key=lambda item: -item[1]['wall_ms'])]),
+                use_container_width=True, hide_index=True)
+
+    # Mensaje final según el resultado
+    st.markdown("---")
+
+    if similarity >= 75:
+        st.error("⚠️ **ALERTA**: Se ha detectado un nivel muy alto de similitud. Se recomienda una revisión manual inmediata.")
+    elif similarity >= 50:
+        st.warning("⚠️ **ATENCIÓN**: Se ha detectado similitud considerable. Se recomienda revisar manualmente.")
+    elif similarity >= 30:
+        st.warning("ℹ️ **NOTA**: Hay similitud moderada. Puede requerir revisión según el contexto.")
+    else:
+        st.success("✅ **OK**: Los documentos muestran baja similitud y parecen ser originales.")
+
+
+def read_uploaded_document(uploaded_file, slot):
+    """
+    Extrae el texto de un archivo subido (PDF página por página, TXT/MD
+    por bloques). El texto se guarda en la sesión, uno por cargador
+    (slot), para no volver a extraerlo en cada re-ejecución del script.
+
+    Returns:
+        Texto del documento o None si no se pudo leer
+    """
+    file_key = (getattr(uploaded_file, 'file_id', None), uploaded_file.name, uploaded_file.size)
+    state_key = f'document_{slot}'
+
+    cached = st.session_state.get(state_key)
+    if cached is not None and cached[0] == file_key:
+        return cached[1]
+
+    try:
+        text = load_document(uploaded_file, name=uploaded_file.name,
+                             max_bytes=MAX_UPLOAD_BYTES, max_chars=MAX_DOCUMENT_CHARS)
+    except Exception as e:
+        st.error(f"❌ No se pudo leer {uploaded_file.name}: {str(e)}")
+        return None
+
+    st.session_state[state_key] = (file_key, text)
+    return text
+
+
+def render_job_progress(job_id, job):
+    """
+    Muestra la posición en cola o la etapa en curso de un trabajo y vuelve
+    a ejecutar el script tras JOB_POLL_SECONDS para consultar su estado.
+    """
+    st.markdown("---")
+    if job['status'] == QUEUED:
+        position = load_job_queue().queue_position(job_id)
+        st.info(f"⏳ En cola: {position} análisis por delante.")
+        if st.button("✖️ Cancelar análisis"):
+            load_job_queue().cancel(job_id)
+            st.rerun()
+    else:
+        label = STAGE_LABELS.get(job['stage'], "Analizando documentos")
+        st.progress(job['progress'],
+                    text=f"🔄 {label}... ({job['elapsed_seconds']:.0f} s)")
+
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
+
+
+def render_comparison(comparison, language):
+    """
+    Muestra el estado de la última comparación de la sesión: el avance
+    del trabajo mientras está en cola o en ejecución (consultándolo con
+    re-ejecuciones periódicas) y el resultado cuando está listo.
+    """
+    job_id = comparison.get('job_id')
+    job = load_job_queue().get(job_id) if job_id else None
+
+    if job is not None and job['status'] in (QUEUED, RUNNING):
+        render_job_progress(job_id, job)
+
+    if job is not None:
+        # El trabajo terminó: en adelante el resultado se toma de la caché
+        del comparison['job_id']
+
+        if job['status'] == CANCELLED:
+            st.warning("Análisis cancelado.")
+            return
+        if job['status'] == FAILED:
+            st.error(f"❌ Error durante el análisis: {job['error']}")
+            return
+        if 'error' in job['result']:
+            st.error(f"❌ {job['result']['error']}")
+            return
+
+        render_results(job['result'], comparison['text_a'], comparison['text_b'])
+        return
+
+    # Re-render (p. ej. tras cambiar un widget): mostrar el último
+    # resultado desde la caché sin recalcular
+    detector = load_plagiarism_detector(language=language)
+    result = load_result_cache().get(
+        ResultCache.key_for(detector, comparison['text_a'], comparison['text_b']))
+    if result is not None:
+        render_results(result, comparison['text_a'], comparison['text_b'])
+
+
+def read_batch_uploads(uploaded_files):
+    """
+    Extrae los documentos de un lote de archivos subidos (PDF, TXT, MD o
+    ZIP con varios de ellos). El lote se guarda en la sesión para no
+    volver a extraerlo en cada re-ejecución del script.
+
+    Returns:
+        Lista de tuplas (nombre, texto) de los documentos con contenido
+    """
+    batch_key = tuple((getattr(f, 'file_id', None), f.name, f.size) for f in uploaded_files)
+    cached = st.session_state.get('batch_documents')
+    if cached is not None and cached[0] == batch_key:
+        return cached[1]
+
+    documents = []
+    for uploaded_file in uploaded_files:
+        try:
+            if uploaded_file.name.lower().endswith('.zip'):
+                documents.extend(iter_archive_documents(
+                    uploaded_file, max_files=MAX_BATCH_DOCUMENTS,
+                    max_bytes=MAX_UPLOAD_BYTES, max_chars=MAX_DOCUMENT_CHARS))
+            else:
+                documents.append((uploaded_file.name, load_document(
+                    uploaded_file, name=uploaded_file.name,
+                    max_bytes=MAX_UPLOAD_BYTES, max_chars=MAX_DOCUMENT_CHARS)))
+        except Exception as e:
+            st.error(f"❌ No se pudo leer {uploaded_file.name}: {str(e)}")
+
+    documents = [(name, text) for name, text in documents if text.strip()]
+    st.session_state['batch_documents'] = (batch_key, documents)
+    return documents
+
+
+def render_batch_results(result, documents):
+    """Muestra la matriz de similitud y el ranking de un lote"""
+    names = result['names']
+    pairs = result['pairs']
+    total_pairs = len(names) * (len(names) - 1) // 2
+
+    st.markdown("---")
+    st.header("📊 Resultados del Lote")
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Documentos", len(names))
+    with col2:
+        st.metric("Pares preseleccionados", total_pairs)
+    with col3:
+        st.metric("Pares analizados a fondo", len(pairs))
+    with col4:
+        st.metric("Pares con similitud ≥ 50%",
+                  sum(pair['similarity_percentage'] >= 50 for pair in pairs))
+
+    # Matriz de similitud de la primera pasada
+    st.subheader("🗺️ Matriz de Similitud (preselección)")
+    heatmap = px.imshow(
+        result['score'] * 100, x=names, y=names, zmin=0, zmax=100,
+        color_continuous_scale='Reds', labels={'color': 'Preselección (%)'},
+        aspect='auto')
+    heatmap.update_layout(height=max(400, min(20 * len(names), 1000)))
+    st.plotly_chart(heatmap, use_container_width=True)
+    st.caption("Promedio del coseno de embeddings y del Jaccard de shingles (MinHash) "
+               "de todos los pares; los más altos se analizan a fondo.")
+
+    # Ranking de los pares analizados
+    st.subheader("🏆 Pares Más Similares")
+    st.dataframe(pd.DataFrame([{
+        'Documento A': pair['name1'],
+        'Documento B': pair['name2'],
+        'Similitud (%)': round(pair['similarity_percentage'], 1),
+        'Veredicto': pair['result'].get('verdict', pair['result'].get('error', '')),
+        'Preselección (%)': round(pair['candidate_score'] * 100, 1),
+        'Semántica (%)': round(pair['semantic'] * 100, 1),
+        'Jaccard (%)': round(pair['jaccard'] * 100, 1),
+    } for pair in pairs]), use_container_width=True, hide_index=True)
+
+    # Detalle de un par
+    if pairs:
+        selected = st.selectbox(
+            "Ver el análisis completo de un par",
+            options=range(len(pairs)),
+            format_func=lambda k: f"{pairs[k]['name1']} ↔ {pairs[k]['name2']} "
+                                  f"({pairs[k]['similarity_percentage']:.1f}%)")
+        pair = pairs[selected]
+        if 'error' not in pair['result']:
+            render_results(pair['result'], documents[pair['index1']][1],
+                           documents[pair['index2']][1])
+
+
+def render_batch_mode(language):
+    """
+    Modo por lotes: todos los pares de muchos documentos. Una primera
+    pasada rápida puntúa todos los pares y el análisis completo se
+    ejecuta solo sobre los más parecidos, como trabajo en segundo plano.
+    """
+    st.header("📚 Cargar Lote de Documentos")
+
+    uploaded_files = st.file_uploader(
+        "Selecciona los archivos o un ZIP con todos ellos",
+        type=['txt', 'md', 'pdf', 'zip'],
+        accept_multiple_files=True,
+        key="batch_files"
+    )
+
+    documents = read_batch_uploads(uploaded_files) if uploaded_files else []
+    if len(documents) > MAX_BATCH_DOCUMENTS:
+        st.error(f"⚠️ El lote tiene {len(documents)} documentos (límite: {MAX_BATCH_DOCUMENTS}).")
+        st.stop()
+
+    total_pairs = len(documents) * (len(documents) - 1) // 2
+    if documents:
+        st.info(f"📊 Documentos: {len(documents)} | Pares: {total_pairs}")
+
+    top_k = st.slider("Pares a analizar a fondo", min_value=1, max_value=200,
+                      value=20, help="Los pares con mayor score de preselección "
+                                     "se comparan con el análisis completo.")
+
+    st.markdown("---")
+
+    if st.button("🔍 Analizar Lote", type="primary", use_container_width=True):
+        if len(documents) < 2:
+            st.error("⚠️ Proporciona al menos dos documentos con contenido.")
+            st.stop()
+
+        batch = BatchComparison(load_plagiarism_detector(language=language))
+        st.session_state['batch'] = {
+            'documents': documents,
+            'job_id': load_job_queue().submit(
+                lambda progress: batch.run(documents, top_k=top_k, progress=progress),
+                stages=BATCH_STAGES)
+        }
+
+    if 'batch' not in st.session_state:
+        return
+
+    batch_state = st.session_state['batch']
+    job_id = batch_state.get('job_id')
+    job = load_job_queue().get(job_id) if job_id else None
+
+    if job is not None and job['status'] in (QUEUED, RUNNING):
+        render_job_progress(job_id, job)
+
+    if job is not None:
+        # El trabajo terminó: el resultado queda en la sesión
+        del batch_state['job_id']
+        if job['status'] == CANCELLED:
+            st.warning("Análisis cancelado.")
+        elif job['status'] == FAILED:
+            st.error(f"❌ Error durante el análisis: {job['error']}")
+        else:
+            batch_state['result'] = job['result']
+
+    if 'result' in batch_state:
+        render_batch_results(batch_state['result'], batch_state['documents'])
+
+
 def main():
     st.set_page_config(
         page_title="Detector de Plagio",
@@ -129,6 +665,16 @@ def main():
             index=0
         )
 
+        # Crear el detector al abrir la página: el modelo se carga en
+        # segundo plano mientras el usuario sube los documentos
+        load_plagiarism_detector(language=language)
+
+        mode = st.radio(
+            "Modo",
+            options=["Dos documentos", "Lote de documentos"],
+            index=0
+        )
+
         st.markdown("---")
         st.header("📊 Información del Sistema")
         st.markdown("""
@@ -155,6 +701,10 @@ def main():
         st.markdown("Alma Paulina González Sandoval")
         st.markdown("Diego Sánchez Valle")
 
+    if mode == "Lote de documentos":
+        render_batch_mode(language)
+        return
+
     # Área principal
     st.header("📄 Cargar Documentos para Comparar")
 
@@ -173,7 +723,9 @@ def main():
         )
 
         if file1:
-            file1_text = file1.read().decode('utf-8', errors='ignore')
+            file1_text = read_uploaded_document(file1, 'file1')
+
+        if file1_text:
             preview_text = file1_text[:500] + "..." if len(file1_text) > 500 else file1_text
             st.text_area("Vista previa - Documento A", preview_text, height=200, disabled=True)
             st.info(f"📊 Caracteres: {len(file1_text)} | Palabras: {len(file1_text.split())}")
@@ -187,7 +739,9 @@ def main():
         )
 
         if file2:
-            file2_text = file2.read().decode('utf-8', errors='ignore')
+            file2_text = read_uploaded_document(file2, 'file2')
+
+        if file2_text:
             preview_text = file2_text[:500] + "..." if len(file2_text) > 500 else file2_text
             st.text_area("Vista previa - Documento B", preview_text, height=200, disabled=True)
             st.info(f"📊 Caracteres: {len(file2_text)} | Palabras: {len(file2_text.split())}")
@@ -251,131 +805,27 @@ def main():
             st.error("⚠️ El texto B está vacío.")
             st.stop()
 
-        # Mostrar spinner mientras se procesa
-        with st.spinner("🔄 Analizando documentos... Esto puede tomar unos segundos."):
-            try:
-                # Inicializar detector (cacheado para mejor rendimiento)
-                detector = load_plagiarism_detector(language=language)
-
-                # Comparar textos
-                result = detector.compare_texts(text_a, text_b)
-
-                # Mostrar resultados
-                st.markdown("---")
-                st.header("📊 Resultados del Análisis")
-
-                # Resultado principal
-                similarity = result['similarity_percentage']
-                verdict = result['verdict']
-                verdict_color = get_verdict_color(similarity)
+        # Inicializar detector (cacheado para mejor rendimiento)
+        detector = load_plagiarism_detector(language=language)
+        result_cache = load_result_cache()
+        result_key = ResultCache.key_for(detector, text_a, text_b)
 
-                # Gauge principal
-                st.plotly_chart(
-                    create_gauge_chart(similarity, "Similitud Total"),
-                    use_container_width=True
-                )
-
-                # Veredicto con color
-                st.markdown(f"### Veredicto: :{verdict_color}[{verdict}]")
+        # Recordar la comparación para los re-renders de la sesión
+        comparison = {'key': result_key, 'text_a': text_a, 'text_b': text_b}
 
-                st.markdown("---")
+        # Si el resultado no está en caché, encolar el análisis; el trabajo
+        # corre en segundo plano y la sesión consulta su avance
+        if result_cache.get(result_key) is None:
+            comparison['job_id'] = load_job_queue().submit(
+                lambda progress: result_cache.get_or_compute(
+                    result_key,
+                    lambda: detector.compare_texts(text_a, text_b, progress=progress)),
+                key=result_key)
 
-                # Desglose por categorías
-                st.subheader("📈 Desglose Detallado por Categorías")
-
-                # Gráfico de barras
-                st.plotly_chart(
-                    create_breakdown_chart(result['breakdown']),
-                    use_container_width=True
-                )
+        st.session_state['last_comparison'] = comparison
 
-                # Tabla con métricas
-                col_metrics1, col_metrics2, col_metrics3, col_metrics4 = st.columns(4)
-
-                with col_metrics1:
-                    st.metric(
-                        label="🧠 Semántico",
-                        value=result['breakdown']['semantic'],
-                        delta=None
-                    )
-
-                with col_metrics2:
-                    st.metric(
-                        label="📝 Léxico",
-                        value=result['breakdown']['lexical'],
-                        delta=None
-                    )
-
-                with col_metrics3:
-                    st.metric(
-                        label="🏗️ Estructural",
-                        value=result['breakdown']['structural'],
-                        delta=None
-                    )
-
-                with col_metrics4:
-                    st.metric(
-                        label="🔄 Secuencia",
-                        value=result['breakdown']['sequence'],
-                        delta=None
-                    )
-
-                st.markdown("---")
-
-                # Información detallada en expandibles
-                with st.expander("🔬 Análisis Semántico Detallado"):
-                    semantic = result['details']['semantic']
-                    col1, col2, col3 = st.columns(3)
-
-                    with col1:
-                        st.metric("Similitud Global", f"{semantic['overall']*100:.2f}%")
-                    with col2:
-                        st.metric("Promedio de Oraciones", f"{semantic['sentence_avg']*100:.2f}%")
-                    with col3:
-                        st.metric("Oraciones Coincidentes", semantic['matched_sentences'])
-
-                    st.info("El análisis semántico usa embeddings de BERT para detectar parafraseo y similitud de significado.")
-
-                with st.expander("📖 Métricas Léxicas Detalladas"):
-                    lexical = result['details']['lexical']
-                    col1, col2 = st.columns(2)
-
-                    with col1:
-                        st.metric("TF-IDF Coseno", f"{lexical['tfidf_cosine']*100:.2f}%")
-                        st.metric("Jaccard", f"{lexical['jaccard']*100:.2f}%")
-
-                    with col2:
-                        st.metric("Trigramas", f"{lexical['trigram']*100:.2f}%")
-                        st.metric("Dice Coefficient", f"{lexical['dice']*100:.2f}%")
-
-                    st.info("Las métricas léxicas analizan similitud a nivel de palabras, n-gramas y vocabulario.")
-
-                with st.expander("⚖️ Pesos Utilizados en el Análisis"):
-                    weights = result['weights_used']
-
-                    weights_data = {
-                        'Categoría': list(weights.keys()),
-                        'Peso': [f"{v*100:.0f}%" for v in weights.values()]
-                    }
-
-                    st.table(weights_data)
-                    st.info("El puntaje final es una combinación ponderada de todas las métricas.")
-
-                # Mensaje final según el resultado
-                st.markdown("---")
-
-                if similarity >= 75:
-                    st.error("⚠️ **ALERTA**: Se ha detectado un nivel muy alto de similitud. Se recomienda una revisión manual inmediata.")
-                elif similarity >= 50:
-                    st.warning("⚠️ **ATENCIÓN**: Se ha detectado similitud considerable. Se recomienda revisar manualmente.")
-                elif similarity >= 30:
-                    st.warning("ℹ️ **NOTA**: Hay similitud moderada. Puede requerir revisión según el contexto.")
-                else:
-                    st.success("✅ **OK**: Los documentos muestran baja similitud y parecen ser originales.")
-
-            except Exception as e:
-                st.error(f"❌ Error durante el análisis: {str(e)}")
-                st.exception(e)
+    if 'last_comparison' in st.session_state:
+        render_comparison(st.session_state['last_comparison'], language)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+"""
+benchmark_lcs.py
+Benchmark del cálculo de LCS (Longest Common Subsequence)
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Mide la latencia de SimilarityMetrics.longest_common_subsequence según la
+longitud de los textos y verifica que el ratio coincida con la matriz DP
+completa en las longitudes pequeñas.
+
+Uso: python benchmark_lcs.py
+"""
+
+import sys
+import os
+import random
+import time
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from similarity_metrics import SimilarityMetrics
+
+
+def lcs_ratio_dp(text1: str, text2: str) -> float:
+    "Implementación de referencia con la matriz DP completa"
+    m = len(text1)
+    n = len(text2)
+
+    if m == 0 or n == 0:
+        return 0.0
+
+    L = [[0] * (n + 1) for _ in range(m + 1)]
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            if text1[i - 1] == text2[j - 1]:
+                L[i][j] = L[i - 1][j - 1] + 1
+            else:
+                L[i][j] = max(L[i - 1][j], L[i][j - 1])
+
+    return L[m][n] / max(m, n)
+
+
+def random_text(length: int, rng: random.Random) -> str:
+    "Genera un texto pseudoaleatorio con distribución de letras del español"
+    alphabet = 'eaosrnidlctumpbgvyqhfzjñxkw      '
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+def main():
+    metrics = SimilarityMetrics()
+    rng = random.Random(42)
+
+    print("\n" + "="*70)
+    print("Benchmark de LCS (bit-paralelo vs matriz DP)")
+    print("="*70)
+    print(f"{'Longitud':>10s} {'Bit-paralelo (s)':>18s} {'DP (s)':>12s} {'Ratio':>10s}")
+
+    for length in [100, 500, 1000, 2000, 5000, 10000, 20000]:
+        text1 = random_text(length, rng)
+        text2 = random_text(length, rng)
+
+        start = time.perf_counter()
+        ratio = metrics.longest_common_subsequence(text1, text2)
+        fast_time = time.perf_counter() - start
+
+        # La matriz DP completa solo es viable para textos cortos
+        if length <= 2000:
+            start = time.perf_counter()
+            reference = lcs_ratio_dp(text1, text2)
+            dp_time = f"{time.perf_counter() - start:12.4f}"
+            assert ratio == reference, f"Ratio distinto en longitud {length}"
+        else:
+            dp_time = f"{'-':>12s}"
+
+        print(f"{length:10d} {fast_time:18.4f} {dp_time} {ratio:10.4f}")
+
+    # Comparación a nivel de palabras
+    words1 = random_text(20000, rng).split()
+    words2 = random_text(20000, rng).split()
+    start = time.perf_counter()
+    ratio = metrics.longest_common_subsequence(words1, words2, level='word')
+    print(f"\n Nivel palabra ({len(words1)} x {len(words2)} tokens): "
+          f"{time.perf_counter() - start:.4f}s, ratio {ratio:.4f}")
+
+    print("\n" + "="*70 + "\n")
+
+
+if __name__ == "__main__":
+    main()
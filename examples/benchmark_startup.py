@@ -0,0 +1,89 @@
+"""
+benchmark_startup.py
+Benchmark del arranque en frío del detector
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Mide en procesos nuevos (sin módulos ya importados):
+- Tiempo de importar el paquete y los módulos principales
+- Tiempo de construir PlagiarismDetector (sin cargar el modelo)
+- Latencia de la primera comparación con y sin warm_up
+
+Uso: python benchmark_startup.py
+"""
+
+import sys
+import os
+import subprocess
+import json
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Cada escenario corre en un intérprete limpio y reporta sus tiempos en JSON
+SCENARIO = '''
+import json, sys, time
+sys.path.insert(0, {src!r})
+timings = {{}}
+
+start = time.perf_counter()
+import plagiarism_detector
+timings['import'] = time.perf_counter() - start
+timings['torch_imported'] = 'torch' in sys.modules
+
+start = time.perf_counter()
+detector = plagiarism_detector.PlagiarismDetector(warm_up={warm_up})
+timings['construct'] = time.perf_counter() - start
+
+# Tiempo que el usuario tarda en subir los documentos
+time.sleep({idle})
+
+start = time.perf_counter()
+detector.compare_texts("El cambio climático afecta al planeta.",
+                       "El calentamiento global impacta la Tierra.")
+timings['first_request'] = time.perf_counter() - start
+
+start = time.perf_counter()
+detector.compare_texts("La fotosíntesis produce oxígeno.",
+                       "Las plantas generan oxígeno con la luz.")
+timings['second_request'] = time.perf_counter() - start
+
+print('TIMINGS ' + json.dumps(timings))
+'''
+
+
+def run_scenario(warm_up: bool, idle: float) -> dict:
+    code = SCENARIO.format(src=SRC_DIR, warm_up=warm_up, idle=idle)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                            text=True, check=True).stdout
+
+    for line in output.splitlines():
+        if line.startswith('TIMINGS '):
+            return json.loads(line[len('TIMINGS '):])
+    raise RuntimeError("El escenario no reportó tiempos")
+
+
+def main():
+    print("=" * 70)
+    print("BENCHMARK DE ARRANQUE EN FRÍO")
+    print("=" * 70)
+
+    idle = 5.0
+    print(f"\nTiempo de espera simulado antes de la primera petición: {idle:.1f} s")
+
+    for warm_up in (False, True):
+        timings = run_scenario(warm_up, idle)
+        label = "con warm_up" if warm_up else "sin warm_up"
+
+        print(f"\n{label}:")
+        print(f"  Importar plagiarism_detector: {timings['import'] * 1000:8.1f} ms"
+              f"  (torch cargado: {'sí' if timings['torch_imported'] else 'no'})")
+        print(f"  Construir el detector:        {timings['construct'] * 1000:8.1f} ms")
+        print(f"  Primera comparación:          {timings['first_request'] * 1000:8.1f} ms")
+        print(f"  Segunda comparación:          {timings['second_request'] * 1000:8.1f} ms")
+
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+check_minhash.py
+Verificación de la estimación MinHash frente a ngram_similarity
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Compara el Jaccard estimado con firmas MinHash contra el Jaccard exacto de
+trigramas (SimilarityMetrics.ngram_similarity) en pares del dataset.
+La cota usada es 4 errores estándar: 4 / (2·sqrt(num_perm)).
+
+Uso: python check_minhash.py [ruta_dataset.csv] [num_perm]
+"""
+
+import sys
+import os
+import math
+
+import numpy as np
+import pandas as pd
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from text_preprocessor import TextPreprocessor
+from similarity_metrics import SimilarityMetrics
+from minhash import MinHasher, LSHIndex
+
+
+def main():
+    dataset_path = sys.argv[1] if len(sys.argv) > 1 else "../data/training/plagiarism_dataset.csv"
+    num_perm = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+
+    df = pd.read_csv(dataset_path).head(200)
+    preprocessor = TextPreprocessor(language='spanish')
+    metrics = SimilarityMetrics()
+    hasher = MinHasher(num_perm=num_perm, ngram_size=3, preprocessor=preprocessor)
+
+    error_bound = 4 / (2 * math.sqrt(num_perm))
+    errors = []
+    lsh = LSHIndex(threshold=0.5, num_perm=num_perm)
+
+    for idx, row in df.iterrows():
+        tokens1 = preprocessor.tokenize_words(preprocessor.normalize_text(row['text1']))
+        tokens2 = preprocessor.tokenize_words(preprocessor.normalize_text(row['text2']))
+
+        exact = metrics.ngram_similarity(tokens1, tokens2, n=3)
+        signature1 = hasher.signature_from_tokens(tokens1)
+        signature2 = hasher.signature_from_tokens(tokens2)
+        estimate = MinHasher.estimate_jaccard(signature1, signature2)
+
+        errors.append(abs(estimate - exact))
+        lsh.insert((idx, 'text1'), signature1)
+        lsh.insert((idx, 'text2'), signature2)
+
+    errors = np.array(errors)
+    print("\n" + "="*70)
+    print(f"MinHash ({num_perm} permutaciones) vs ngram_similarity")
+    print("="*70)
+    print(f"  Pares evaluados:  {len(errors)}")
+    print(f"  Error medio:      {errors.mean():.4f}")
+    print(f"  Error máximo:     {errors.max():.4f}")
+    print(f"  Cota (4 sigma):   {error_bound:.4f}")
+    print(f"  LSH: {lsh.bands} bandas x {lsh.rows} filas, "
+          f"{len(lsh.candidate_pairs())} pares candidatos")
+    print("="*70 + "\n")
+
+    if errors.max() > error_bound:
+        print(" La estimación supera la cota de error")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+check_onnx_parity.py
+Paridad entre los backends de embeddings 'torch' y 'onnx'
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Calcula la similitud semántica de los pares de los datasets incluidos con
+ambos backends y verifica que la diferencia absoluta del coseno no supere
+la tolerancia. También reporta el tiempo de codificación de cada backend.
+
+Uso: python check_onnx_parity.py [max_pares_por_dataset] [tolerancia]
+"""
+
+import sys
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from plagiarism_detector import PlagiarismDetector
+
+DATASETS = [
+    "../data/training/plagiarism_dataset.csv",
+    "../data/training/pan2011_dataset.csv",
+]
+
+
+def semantic_scores(detector: PlagiarismDetector, pairs) -> tuple:
+    "Coseno por par y tiempo total de codificación"
+    texts = list(dict.fromkeys(text for pair in pairs for text in pair))
+
+    start = time.perf_counter()
+    embeddings = detector._encode(texts, batch_size=32)
+    elapsed = time.perf_counter() - start
+
+    lookup = dict(zip(texts, embeddings))
+    scores = np.array([detector.compute_semantic_similarity(text1, text2, lookup)
+                       for text1, text2 in pairs])
+    return scores, elapsed
+
+
+def main():
+    max_pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    tolerance = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+
+    print("=" * 70)
+    print("PARIDAD DE BACKENDS DE EMBEDDINGS (torch vs onnx int8)")
+    print("=" * 70)
+
+    torch_detector = PlagiarismDetector(language='spanish', embedding_backend='torch')
+    onnx_detector = PlagiarismDetector(language='spanish', embedding_backend='onnx')
+    preprocessor = torch_detector.preprocessor
+
+    worst = 0.0
+    for dataset_path in DATASETS:
+        if not os.path.exists(dataset_path):
+            print(f"\n{dataset_path} no existe, se omite")
+            continue
+
+        df = pd.read_csv(dataset_path).head(max_pairs)
+        pairs = [(preprocessor.normalize_text(str(text1)), preprocessor.normalize_text(str(text2)))
+                 for text1, text2 in zip(df['text1'], df['text2'])]
+
+        torch_scores, torch_time = semantic_scores(torch_detector, pairs)
+        onnx_scores, onnx_time = semantic_scores(onnx_detector, pairs)
+        drift = np.abs(torch_scores - onnx_scores)
+        worst = max(worst, float(drift.max()))
+
+        print(f"\n{os.path.basename(dataset_path)} ({len(pairs)} pares)")
+        print(f"  Desviación del coseno: media {drift.mean():.4f} | "
+              f"p95 {np.percentile(drift, 95):.4f} | máxima {drift.max():.4f}")
+        print(f"  Correlación de Pearson: {np.corrcoef(torch_scores, onnx_scores)[0, 1]:.4f}")
+        print(f"  Tiempo de codificación: torch {torch_time:.2f}s | onnx {onnx_time:.2f}s")
+
+    print("\n" + "=" * 70)
+    if worst > tolerance:
+        print(f"FALLO: desviación máxima {worst:.4f} > tolerancia {tolerance:.4f}")
+        print("=" * 70)
+        sys.exit(1)
+
+    print(f"OK: desviación máxima {worst:.4f} <= tolerancia {tolerance:.4f}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
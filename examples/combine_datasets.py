@@ -1,53 +1,77 @@
-import pandas as pd
+"""
+combine_datasets.py
+Combina los datasets de entrenamiento en formato columnar
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Lee por bloques los datasets de data/training (CSV o directorios .pairs)
+y escribe combined_dataset.pairs (ver src/pair_dataset.py). Los textos
+repetidos entre datasets se guardan una sola vez.
+
+Uso: python combine_datasets.py
+"""
+
+import sys
+import os
 from pathlib import Path
 
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pair_dataset import PairDataset, PairDatasetWriter, is_pair_dataset, iter_dataset_frames
+
+COMBINED_NAMES = ("combined_dataset.csv", "combined_dataset.pairs")
+
 
 def combine_datasets():
     "Combina los datasets disponnibles"
 
     data_dir = Path("../data/training")
-    datasets = []
-    dataset_info = []
-
-    # Busqueda de todos los csv
-    for csv_file in sorted(data_dir.glob("*.csv")):
-        if csv_file.name == "combined_dataset.csv":
-            continue
-
-        try:
-            df = pd.read_csv(csv_file)
-
-            if all(col in df.columns for col in ['text1', 'text2', 'is_plagiarism']):
-                datasets.append(df)
-                dataset_info.append({
-                    'nombre': csv_file.name,
-                    'pares': len(df),
-                    'plagio': df['is_plagiarism'].sum(),
-                    'no plagio': (~df['is_plagiarism']).sum()
-                })
-                print(f"✓ {csv_file.name}: {len(df)} pares")
-
-        except Exception as e:
-            print(f"\n Error con {csv_file.name}: {e}")
-
-    if not datasets:
-        print("\n No se encontraron datasets para combinar")
-        return None
+    output_path = data_dir / "combined_dataset.pairs"
+
+    # Busqueda de todos los datasets (CSV o columnares)
+    sources = [path for path in sorted(data_dir.iterdir())
+               if path.name not in COMBINED_NAMES and
+               (path.suffix == '.csv' or is_pair_dataset(str(path)))]
+
+    combined_pairs = 0
+    with PairDatasetWriter(str(output_path)) as writer:
+        for source in sources:
+            try:
+                pairs = 0
+                plagiarism = 0
+                for frame in iter_dataset_frames(str(source)):
+                    if not all(col in frame.columns for col in ['text1', 'text2', 'is_plagiarism']):
+                        break
+                    writer.add_dataframe(frame)
+                    pairs += len(frame)
+                    plagiarism += int(frame['is_plagiarism'].sum())
+
+                if pairs:
+                    combined_pairs += pairs
+                    print(f"✓ {source.name}: {pairs} pares ({plagiarism} plagio, "
+                          f"{pairs - plagiarism} no plagio)")
 
-    # Combinar
-    combined = pd.concat(datasets, ignore_index=True)
+            except Exception as e:
+                print(f"\n Error con {source.name}: {e}")
 
-    # Shuffle
-    combined = combined.sample(frac=1, random_state=42).reset_index(drop=True)
+        # Shuffle de la tabla de pares (los textos no se mueven)
+        writer.close(shuffle_seed=42)
+
+    if not combined_pairs:
+        print("\n No se encontraron datasets para combinar")
+        return None
 
-    # Guardar
-    output_file = data_dir / "combined_dataset.csv"
-    combined.to_csv(output_file, index=False)
+    combined = PairDataset(str(output_path))
+    plagiarism = int(combined.pairs['is_plagiarism'].sum())
+    size_mb = sum(f.stat().st_size for f in output_path.iterdir()) / 1024 ** 2
 
-    print(f"\n✓ Dataset combinado guardado: {output_file}")
-    print(f"  Total: {len(combined)} pares ({combined['is_plagiarism'].sum()} plagio, {(~combined['is_plagiarism']).sum()} no plagio)")
+    print(f"\n✓ Dataset combinado guardado: {output_path}")
+    print(f"  Total: {len(combined)} pares ({plagiarism} plagio, {len(combined) - plagiarism} no plagio)")
+    print(f"  Documentos únicos: {combined.num_documents} | Tamaño: {size_mb:.2f} MB")
 
-    return output_file
+    return output_path
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+"""
+compare_sequence_engines.py
+Correlación entre los motores de similitud de secuencia
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Calcula SequenceMatcher ('difflib') y la teselación sobre IDs de tokens
+('tiling') en los pares del dataset y reporta su correlación y tiempos.
+
+Uso: python compare_sequence_engines.py [ruta_dataset.csv] [max_pares]
+"""
+
+import sys
+import os
+import time
+
+import pandas as pd
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from text_preprocessor import TextPreprocessor
+from similarity_metrics import SimilarityMetrics
+
+
+def main():
+    dataset_path = sys.argv[1] if len(sys.argv) > 1 else "../data/training/combined_dataset.csv"
+    max_pairs = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    df = pd.read_csv(dataset_path)
+    if max_pairs:
+        df = df.head(max_pairs)
+
+    preprocessor = TextPreprocessor(language='spanish')
+    difflib_metrics = SimilarityMetrics(sequence_engine='difflib')
+    tiling_metrics = SimilarityMetrics(sequence_engine='tiling')
+
+    rows = []
+    difflib_time = 0.0
+    tiling_time = 0.0
+
+    for idx, row in df.iterrows():
+        text1 = preprocessor.normalize_text(row['text1'])
+        text2 = preprocessor.normalize_text(row['text2'])
+
+        start = time.perf_counter()
+        difflib_score = difflib_metrics.sequence_similarity(text1, text2)
+        difflib_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        tiling_score = tiling_metrics.sequence_similarity(text1, text2)
+        tiling_time += time.perf_counter() - start
+
+        rows.append({
+            'difflib': difflib_score,
+            'tiling': tiling_score,
+            'is_plagiarism': int(row['is_plagiarism'])
+        })
+
+    scores = pd.DataFrame(rows)
+
+    print("\n" + "="*70)
+    print(f"Motores de secuencia en {os.path.basename(dataset_path)} ({len(scores)} pares)")
+    print("="*70)
+    print(f"  Pearson:   {scores['difflib'].corr(scores['tiling'], method='pearson'):.4f}")
+    print(f"  Spearman:  {scores['difflib'].corr(scores['tiling'], method='spearman'):.4f}")
+    print(f"\n  Tiempo difflib: {difflib_time:.2f}s")
+    print(f"  Tiempo tiling:  {tiling_time:.2f}s")
+
+    print("\n  Correlación con la etiqueta de plagio:")
+    for engine in ['difflib', 'tiling']:
+        print(f"    {engine:8s}: {scores[engine].corr(scores['is_plagiarism']):.4f}")
+
+    print("\n  Promedio por clase:")
+    print(scores.groupby('is_plagiarism')[['difflib', 'tiling']].mean().to_string())
+    print("\n" + "="*70 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+evaluate_passages.py
+Evaluación de la localización de pasajes con las métricas de PAN
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Ejecuta PlagiarismDetector.locate_passages sobre los pares (sospechoso,
+fuente) anotados del PAN Plagiarism Corpus 2011 y compara los pasajes con
+las anotaciones this_offset/source_offset:
+- Precisión y recall a nivel de caracteres
+- Granularidad (detecciones por caso detectado)
+- plagdet = F1 / log2(1 + granularidad)
+
+Uso: python evaluate_passages.py ruta_corpus [max_documentos] [--no-semantic]
+"""
+
+import sys
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from tqdm import tqdm
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from plagiarism_detector import PlagiarismDetector
+from passage_alignment import pan_metrics
+from process_pan2011 import PAN2011Processor
+
+
+def read_full_text(file_path: Path) -> str:
+    "Lee un documento completo (los offsets de PAN se refieren al archivo entero)"
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: python evaluate_passages.py ruta_corpus [max_documentos] [--no-semantic]")
+        return
+
+    corpus_path = sys.argv[1]
+    args = [arg for arg in sys.argv[2:] if not arg.startswith('--')]
+    max_documents = int(args[0]) if args else 50
+    use_semantic = '--no-semantic' not in sys.argv
+
+    print("=" * 70)
+    print("EVALUACIÓN DE PASAJES (MÉTRICAS PAN)")
+    print("=" * 70)
+
+    processor = PAN2011Processor(corpus_path)
+    source_files = {path.name: path for path in processor.source_path.glob('part*/*.txt')}
+    xml_files = sorted(processor.suspicious_path.glob('part*/*.xml'))
+
+    detector = PlagiarismDetector(language='english')
+
+    cases = []
+    detections = []
+    evaluated = 0
+    start = time.perf_counter()
+
+    for xml_file in tqdm(xml_files, desc="Documentos"):
+        if evaluated >= max_documents:
+            break
+
+        sections = processor.parse_xml_annotations(xml_file)
+        if not sections:
+            continue
+
+        by_source = defaultdict(list)
+        for section in sections:
+            by_source[section['source_file']].append(section)
+
+        suspicious_text = read_full_text(xml_file.with_suffix('.txt'))
+        evaluated += 1
+
+        for source_name, source_sections in by_source.items():
+            if source_name not in source_files:
+                continue
+
+            pair = (xml_file.stem, source_name)
+            source_text = read_full_text(source_files[source_name])
+
+            for section in source_sections:
+                cases.append({
+                    'pair': pair,
+                    'source_span': (section['source_offset'],
+                                    section['source_offset'] + section['source_length']),
+                    'suspicious_span': (section['this_offset'],
+                                        section['this_offset'] + section['this_length'])
+                })
+
+            passages = detector.locate_passages(
+                source_text, suspicious_text,
+                sentence_alignments=None if use_semantic else [])
+            detections.extend({**passage, 'pair': pair} for passage in passages)
+
+    elapsed = time.perf_counter() - start
+    metrics = pan_metrics(cases, detections)
+
+    print(f"\nDocumentos sospechosos evaluados: {evaluated}")
+    print(f"Casos anotados: {metrics['cases']} | Detecciones: {metrics['detections']}")
+    print(f"Alineación semántica de oraciones: {'sí' if use_semantic else 'no'}")
+    print(f"\n  Precisión:    {metrics['precision']:.4f}")
+    print(f"  Recall:       {metrics['recall']:.4f}")
+    print(f"  Granularidad: {metrics['granularity']:.4f}")
+    print(f"  Plagdet:      {metrics['plagdet']:.4f}")
+    print(f"\n  Tiempo total: {elapsed:.1f}s")
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
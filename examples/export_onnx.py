@@ -0,0 +1,42 @@
+"""
+export_onnx.py
+Exporta el modelo de embeddings a ONNX con cuantización int8
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Crea models/<modelo>-onnx-int8, que PlagiarismDetector usa con
+embedding_backend='onnx'. Después conviene verificar la desviación con
+check_onnx_parity.py.
+
+Uso: python export_onnx.py [nombre_modelo] [directorio_salida]
+"""
+
+import sys
+import os
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from embedding_backends import export_onnx_model, ONNX_MODEL_FILE
+
+
+def main():
+    model_name = sys.argv[1] if len(sys.argv) > 1 else 'paraphrase-multilingual-MiniLM-L12-v2'
+    output_dir = sys.argv[2] if len(sys.argv) > 2 else None
+
+    print("=" * 70)
+    print("EXPORTACIÓN DEL MODELO DE EMBEDDINGS A ONNX (INT8)")
+    print("=" * 70)
+    print(f"\nModelo: {model_name}")
+
+    output_dir = export_onnx_model(model_name, output_dir)
+    size_mb = os.path.getsize(os.path.join(output_dir, ONNX_MODEL_FILE)) / 1024 ** 2
+
+    print(f"Modelo exportado en: {os.path.abspath(output_dir)}")
+    print(f"Tamaño del modelo cuantizado: {size_mb:.1f} MB")
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+fit_tfidf.py
+Ajuste del vectorizador TF-IDF sobre el corpus de entrenamiento
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Ajusta el IDF una sola vez sobre todos los textos de data/training/*.csv
+(normalizados como en el detector) y lo guarda en models/ para usarlo con
+PlagiarismDetector(tfidf_model_path=...).
+
+Uso: python fit_tfidf.py [ruta_salida]
+"""
+
+import sys
+import os
+from pathlib import Path
+
+import pandas as pd
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from text_preprocessor import TextPreprocessor
+from similarity_metrics import SimilarityMetrics
+
+
+def main():
+    output_path = sys.argv[1] if len(sys.argv) > 1 else "../models/tfidf_vectorizer.joblib"
+    data_dir = Path("../data/training")
+
+    preprocessor = TextPreprocessor(language='spanish')
+    corpus = {}
+
+    for csv_file in sorted(data_dir.glob("*.csv")):
+        # combined_dataset.csv repite las filas de los otros datasets
+        if csv_file.name == "combined_dataset.csv":
+            continue
+
+        df = pd.read_csv(csv_file)
+        for column in ['text1', 'text2']:
+            for text in df[column].dropna():
+                corpus.setdefault(text, None)
+
+        print(f"✓ {csv_file.name}: {len(df)} pares")
+
+    documents = [preprocessor.normalize_text(text) for text in corpus]
+    print(f"\n Documentos únicos: {len(documents)}")
+
+    metrics = SimilarityMetrics()
+    metrics.fit_tfidf(documents)
+    metrics.save_tfidf(output_path)
+
+    print(f" Vocabulario: {len(metrics.fitted_vectorizer.vocabulary_)} términos")
+    print(f"✓ Vectorizador guardado en: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
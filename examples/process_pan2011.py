@@ -7,37 +7,132 @@ Fecha: Diciembre 2025
 
 Extrae pares de textos del corpus PAN-2011 para entrenamiento.
 Genera dataset balanceado con casos positivos y negativos.
+
+Pensado para procesar el corpus completo:
+- Índice nombre de archivo -> ruta de los documentos fuente (una sola vez)
+- Anotaciones XML parseadas con iterparse en un pool de procesos
+- Documentos fuente leídos una vez a través de una caché LRU acotada
+- Pares escritos al CSV por bloques, sin acumularlos en memoria
+
+Uso: python process_pan2011.py [ruta_corpus] [max_pares (0 = todos)]
 """
 
-import pandas as pd
+import random
+import sys
 import xml.etree.ElementTree as ET
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
 from tqdm import tqdm
-import random
+
+
+def parse_annotations(xml_file: Path) -> Tuple[Path, List[dict]]:
+    """
+    Parsea en streaming las anotaciones de plagio de un documento sospechoso.
+    Función de módulo para poder ejecutarse en el pool de procesos.
+
+    Returns:
+        Tupla (xml_file, lista de secciones con plagio)
+    """
+    plagiarism_sections = []
+
+    try:
+        for _, element in ET.iterparse(str(xml_file), events=('end',)):
+            if element.tag == 'feature':
+                source_ref = element.get('source_reference', '')
+                if source_ref:
+                    plagiarism_sections.append({
+                        'source_file': source_ref,
+                        'source_offset': int(element.get('source_offset', 0)),
+                        'source_length': int(element.get('source_length', 0)),
+                        'this_offset': int(element.get('this_offset', 0)),
+                        'this_length': int(element.get('this_length', 0)),
+                        'obfuscation': element.get('obfuscation', 'none')
+                    })
+            element.clear()
+    except Exception:
+        # Archivo sin plagio o mal formado
+        pass
+
+    return xml_file, plagiarism_sections
 
 
 class PAN2011Processor:
     "Procesador para PAN-2011"
 
-    def __init__(self, corpus_path: str):
+    def __init__(self, corpus_path: str, max_chars: int = 2000,
+                 source_cache_size: int = 256, chunk_size: int = 1000,
+                 n_jobs: Optional[int] = None):
+        """
+            corpus_path: Ruta del corpus PAN-2011
+            max_chars: Longitud máxima de cada texto del dataset
+            source_cache_size: Documentos fuente completos en la caché LRU
+            chunk_size: Pares escritos al CSV por bloque
+            n_jobs: Procesos para parsear los XML (None = núcleos disponibles)
+        """
         self.corpus_path = Path(corpus_path)
         self.external_path = self.corpus_path / "external-detection-corpus"
         self.source_path = self.external_path / "source-document"
         self.suspicious_path = self.external_path / "suspicious-document"
 
-        self.data = []
-
-    def read_text_file(self, file_path: Path) -> str:
-        """Lee un archivo de texto."""
+        self.max_chars = max_chars
+        self.source_cache_size = source_cache_size
+        self.chunk_size = chunk_size
+        self.n_jobs = n_jobs
+
+        self._source_index = None
+        self._source_names = None
+        self._source_cache = OrderedDict()
+        self._random = random.Random(42)
+
+        self.pending = []
+        self.stats = Counter()
+        self.plagiarism_types = Counter()
+
+    @property
+    def source_index(self) -> dict:
+        "Índice nombre de archivo -> ruta de todos los documentos fuente"
+        if self._source_index is None:
+            self._source_index = {
+                path.name: path for path in self.source_path.glob('part*/*.txt')}
+        return self._source_index
+
+    def read_full_text(self, file_path: Path) -> str:
+        """Lee un archivo de texto completo (sin recortar: los offsets de PAN se refieren a él)."""
         try:
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read().strip()
-                # Limitar a primeros 2000 caracteres para evitar textos muy largos
-                return content[:2000] if len(content) > 2000 else content
+                return f.read()
         except Exception as e:
             print(f"⚠️  Error leyendo {file_path}: {e}")
             return ""
 
+    def read_text_file(self, file_path: Path) -> str:
+        """Lee un archivo de texto."""
+        content = self.read_full_text(file_path).strip()
+        # Limitar a los primeros max_chars caracteres para evitar textos muy largos
+        return content[:self.max_chars]
+
+    def read_source(self, source_filename: str) -> str:
+        """
+        Texto completo de un documento fuente, a través de la caché LRU
+        (un mismo fuente aparece en muchas secciones y documentos).
+        """
+        text = self._source_cache.get(source_filename)
+        if text is not None:
+            self._source_cache.move_to_end(source_filename)
+            return text
+
+        source_file = self.source_index.get(source_filename)
+        text = self.read_full_text(source_file) if source_file else ""
+
+        self._source_cache[source_filename] = text
+        while len(self._source_cache) > self.source_cache_size:
+            self._source_cache.popitem(last=False)
+        return text
+
     def parse_xml_annotations(self, xml_file: Path) -> list:
         """
         Parsea el archivo XML de anotaciones de PAN.
@@ -45,217 +140,171 @@ class PAN2011Processor:
         Returns:
             Lista de diccionarios con información de plagio
         """
-        plagiarism_sections = []
-
-        try:
-            tree = ET.parse(xml_file)
-            root = tree.getroot()
-
-            # Buscar todas las características de plagio
-            for feature in root.findall('.//feature'):
-                source_ref = feature.get('source_reference', '')
-                source_offset = int(feature.get('source_offset', 0))
-                source_length = int(feature.get('source_length', 0))
-                this_offset = int(feature.get('this_offset', 0))
-                this_length = int(feature.get('this_length', 0))
-                obfuscation = feature.get('obfuscation', 'none')
-
-                if source_ref:
-                    plagiarism_sections.append({
-                        'source_file': source_ref,
-                        'source_offset': source_offset,
-                        'source_length': source_length,
-                        'this_offset': this_offset,
-                        'this_length': this_length,
-                        'obfuscation': obfuscation
-                    })
-
-        except Exception as e:
-            # Archivo sin plagio (muchos archivos sospechosos no tienen plagio)
-            pass
-
-        return plagiarism_sections
+        return parse_annotations(xml_file)[1]
 
     def extract_text_section(self, text: str, offset: int, length: int) -> str:
         """Extrae una sección específica del texto."""
         if length <= 0 or offset < 0:
             return text[:500]  # Retornar primeros 500 chars si no hay info
-        return text[offset:offset + length]
+        return text[offset:offset + length][:self.max_chars]
 
-    def process_suspicious_document(self, susp_file: Path, xml_file: Path):
-        """Procesa un documento sospechoso y sus anotaciones."""
+    def process_suspicious_document(self, susp_file: Path, plagiarism_sections: list):
+        """
+        Procesa un documento sospechoso y sus anotaciones.
+        Las secciones se extraen de los documentos completos, así que los
+        offsets son válidos aunque caigan después de max_chars.
+        """
+        if not plagiarism_sections:
+            # NO HAY PLAGIO - este documento es original
+            return
 
-        # Leer texto sospechoso
-        susp_text = self.read_text_file(susp_file)
+        susp_text = self.read_full_text(susp_file)
         if not susp_text or len(susp_text) < 50:
             return
 
-        # Parsear anotaciones
-        plagiarism_sections = self.parse_xml_annotations(xml_file)
-
-        if plagiarism_sections:
-            # HAY PLAGIO - procesar cada sección
-            for section in plagiarism_sections:
-                # Encontrar archivo fuente
-                source_filename = section['source_file']
-
-                # Buscar en todas las partes
-                source_file = None
-                for part_dir in self.source_path.iterdir():
-                    if part_dir.is_dir():
-                        potential_file = part_dir / source_filename
-                        if potential_file.exists():
-                            source_file = potential_file
-                            break
-
-                if source_file and source_file.exists():
-                    source_text = self.read_text_file(source_file)
-
-                    if source_text and len(source_text) > 50:
-                        # Extraer secciones específicas si es posible
-                        if section['source_length'] > 0:
-                            source_section = self.extract_text_section(
-                                source_text,
-                                section['source_offset'],
-                                section['source_length']
-                            )
-                        else:
-                            source_section = source_text
-
-                        if section['this_length'] > 0:
-                            susp_section = self.extract_text_section(
-                                susp_text,
-                                section['this_offset'],
-                                section['this_length']
-                            )
-                        else:
-                            susp_section = susp_text
-
-                        # Agregar par de plagio
-                        if len(source_section) > 50 and len(susp_section) > 50:
-                            self.data.append({
-                                'text1': source_section,
-                                'text2': susp_section,
-                                'is_plagiarism': True,
-                                'plagiarism_type': section['obfuscation']
-                            })
-        else:
-            # NO HAY PLAGIO - este documento es original
-            # Lo usaremos para generar pares negativos
-            pass
+        for section in plagiarism_sections:
+            source_text = self.read_source(section['source_file'])
+            if not source_text or len(source_text) <= 50:
+                continue
+
+            # Extraer secciones específicas si es posible
+            if section['source_length'] > 0:
+                source_section = self.extract_text_section(
+                    source_text, section['source_offset'], section['source_length'])
+            else:
+                source_section = source_text.strip()[:self.max_chars]
+
+            if section['this_length'] > 0:
+                susp_section = self.extract_text_section(
+                    susp_text, section['this_offset'], section['this_length'])
+            else:
+                susp_section = susp_text.strip()[:self.max_chars]
+
+            # Agregar par de plagio
+            if len(source_section) > 50 and len(susp_section) > 50:
+                self.add_pair(source_section, susp_section, True, section['obfuscation'])
+
+    def add_pair(self, text1: str, text2: str, is_plagiarism: bool, plagiarism_type: str):
+        "Agrega un par al bloque pendiente de escribir"
+        self.pending.append({
+            'text1': text1,
+            'text2': text2,
+            'is_plagiarism': is_plagiarism,
+            'plagiarism_type': plagiarism_type
+        })
+        self.stats['plagiarism' if is_plagiarism else 'original'] += 1
+        if is_plagiarism:
+            self.plagiarism_types[plagiarism_type] += 1
+
+    def flush(self, output_path: Path):
+        "Escribe el bloque pendiente al CSV (mezclado) y lo vacía"
+        if not self.pending:
+            return
 
-    def process_all_documents(self, max_pairs: int = 1000):
+        self._random.shuffle(self.pending)
+        write_header = not output_path.exists() or output_path.stat().st_size == 0
+        pd.DataFrame(self.pending).to_csv(
+            output_path, mode='a', header=write_header, index=False)
+        self.pending = []
+
+    def process_all_documents(self, max_pairs: Optional[int] = None,
+                              output_file: str = "../data/training/pan2011_dataset.csv"):
         """
-        Procesa todos los documentos del corpus.
+        Procesa los documentos del corpus y escribe el dataset por bloques.
 
         Args:
-            max_pairs: Número máximo de pares a procesar
+            max_pairs: Número máximo de pares (None = corpus completo)
+            output_file: CSV de salida (se sobrescribe)
         """
         print("\n Procesando PAN-2011 External Detection Corpus...")
         print(f" Ruta: {self.external_path}")
 
-        # Recolectar todos los archivos sospechosos
-        suspicious_files = []
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        if output_path.exists():
+            output_path.unlink()
 
-        for part_dir in self.suspicious_path.iterdir():
-            if part_dir.is_dir() and part_dir.name.startswith('part'):
-                xml_files = list(part_dir.glob("*.xml"))
-                suspicious_files.extend(xml_files)
+        # Recolectar todos los archivos sospechosos
+        xml_files = sorted(self.suspicious_path.glob('part*/*.xml'))
+        suspicious_texts = [xml_file.with_suffix('.txt') for xml_file in xml_files]
+        print(f" Encontrados {len(xml_files)} documentos sospechosos")
+        print(f" Indexados {len(self.source_index)} documentos fuente")
 
-        print(f" Encontrados {len(suspicious_files)} documentos sospechosos")
+        max_positive = max_pairs // 2 if max_pairs else None
 
-        # Procesar archivos sospechosos (casos de plagio)
+        # Procesar archivos sospechosos (casos de plagio) con el XML
+        # parseado en paralelo; cada positivo se acompaña de un negativo
         print("\n Procesando casos de plagio...")
 
-        processed = 0
-        for xml_file in tqdm(suspicious_files[:max_pairs], desc="Procesando"):
-            txt_file = xml_file.with_suffix('.txt')
+        with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+            for xml_file, sections in tqdm(
+                    executor.map(parse_annotations, xml_files, chunksize=64),
+                    total=len(xml_files), desc="Procesando"):
+                txt_file = xml_file.with_suffix('.txt')
+                if not txt_file.exists():
+                    continue
+
+                positives_before = self.stats['plagiarism']
+                self.process_suspicious_document(txt_file, sections)
+                for _ in range(self.stats['plagiarism'] - positives_before):
+                    self.generate_negative_pair(suspicious_texts)
 
-            if txt_file.exists():
-                self.process_suspicious_document(txt_file, xml_file)
-                processed += 1
+                if len(self.pending) >= self.chunk_size:
+                    self.flush(output_path)
 
                 # Limitar número de pares
-                if len(self.data) >= max_pairs // 2:
+                if max_positive and self.stats['plagiarism'] >= max_positive:
+                    executor.shutdown(wait=True, cancel_futures=True)
                     break
 
-        print(f"Procesados {len(self.data)} pares con plagio")
-
-        # Generar pares negativos (NO plagio)
-        self.generate_negative_pairs(num_pairs=len(self.data))
-
-        print(f"\n Total de pares generados: {len(self.data)}")
+        self.flush(output_path)
+        self.print_summary(output_path)
 
-    def generate_negative_pairs(self, num_pairs: int):
-        "Genera pares negativos (sin plagio)."
-        print(f"\n Generando {num_pairs} pares sin plagio...")
+    def generate_negative_pair(self, suspicious_files: List[Path], attempts: int = 10):
+        "Genera un par negativo (sin plagio) con documentos al azar."
+        if self._source_names is None:
+            self._source_names = sorted(self.source_index)
+        source_names = self._source_names
 
-        # Recolectar archivos fuente y sospechosos
-        source_files = []
-        suspicious_files = []
-
-        for part_dir in self.source_path.iterdir():
-            if part_dir.is_dir():
-                source_files.extend(list(part_dir.glob("*.txt")))
-
-        for part_dir in self.suspicious_path.iterdir():
-            if part_dir.is_dir():
-                suspicious_files.extend(list(part_dir.glob("*.txt")))
+        if not source_names or not suspicious_files:
+            return
 
-        random.seed(42)
+        for _ in range(attempts):
+            source_name = self._random.choice(source_names)
+            susp_file = self._random.choice(suspicious_files)
 
-        for _ in tqdm(range(num_pairs), desc="Generando negativos"):
-            if len(source_files) > 0 and len(suspicious_files) > 0:
-                source_file = random.choice(source_files)
-                susp_file = random.choice(suspicious_files)
+            # Asegurar que son diferentes
+            if Path(source_name).stem == susp_file.stem:
+                continue
 
-                # Asegurar que son diferentes
-                if source_file.stem != susp_file.stem:
-                    source_text = self.read_text_file(source_file)
-                    susp_text = self.read_text_file(susp_file)
+            source_text = self.read_source(source_name).strip()[:self.max_chars]
+            susp_text = self.read_text_file(susp_file)
 
-                    if len(source_text) > 50 and len(susp_text) > 50:
-                        self.data.append({
-                            'text1': source_text,
-                            'text2': susp_text,
-                            'is_plagiarism': False,
-                            'plagiarism_type': 'none'
-                        })
+            if len(source_text) > 50 and len(susp_text) > 50:
+                self.add_pair(source_text, susp_text, False, 'none')
+                return
 
-    def save_to_csv(self, output_file: str = "../data/training/pan2011_dataset.csv"):
-        """Guarda el dataset procesado."""
+    def print_summary(self, output_path: Path):
+        """Muestra las estadísticas del dataset escrito."""
+        total = self.stats['plagiarism'] + self.stats['original']
 
-        if not self.data:
+        if not total:
             print("\n No hay datos para guardar")
             return
 
-        df = pd.DataFrame(self.data)
-
-        # Shuffle
-        df = df.sample(frac=1, random_state=42).reset_index(drop=True)
-
-        # Crear directorio
-        output_path = Path(output_file)
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-
-        # Guardar
-        df.to_csv(output_path, index=False)
-
         print("\n" + "="*70)
         print(" DATASET GUARDADO EXITOSAMENTE")
         print("="*70)
         print(f"\n Archivo: {output_path}")
         print(f"\n Estadísticas:")
-        print(f"   Total de pares: {len(df)}")
-        print(f"   Con plagio: {df['is_plagiarism'].sum()}")
-        print(f"   Sin plagio: {(~df['is_plagiarism']).sum()}")
-        print(f"   Balance: {df['is_plagiarism'].sum() / len(df) * 100:.1f}%")
+        print(f"   Total de pares: {total}")
+        print(f"   Con plagio: {self.stats['plagiarism']}")
+        print(f"   Sin plagio: {self.stats['original']}")
+        print(f"   Balance: {self.stats['plagiarism'] / total * 100:.1f}%")
 
-        if 'plagiarism_type' in df.columns:
+        if self.plagiarism_types:
             print(f"\n   Tipos de plagio detectados:")
-            plagiarism_types = df[df['is_plagiarism']
-                                  ]['plagiarism_type'].value_counts()
-            for ptype, count in plagiarism_types.items():
+            for ptype, count in self.plagiarism_types.most_common():
                 print(f"     • {ptype}: {count}")
 
         print("\n" + "="*70)
@@ -269,33 +318,34 @@ def main():
     print("="*70)
 
     # Ruta al corpus
-    corpus_path = "/Users/snvpau/Downloads/PAN-PLAGIARISM/pan-plagiarism-corpus-2011"
+    corpus_path = sys.argv[1] if len(sys.argv) > 1 else \
+        "/Users/snvpau/Downloads/PAN-PLAGIARISM/pan-plagiarism-corpus-2011"
 
     # Verificar que existe
     if not Path(corpus_path).exists():
         print(f"\n Error: No se encuentra el corpus en {corpus_path}")
-        print("\n Verifica la ruta o cambia la variable 'corpus_path' en el script")
+        print("\n Verifica la ruta o pásala como argumento: python process_pan2011.py ruta_corpus")
         return
 
     print(f"\n📁 Corpus encontrado: {corpus_path}")
 
-    # Preguntar cantidad de pares
-    print("\n¿Cuántos pares deseas generar?")
-    print("  500  - Rápido (~2 min)")
-    print("  1000 - Recomendado (~5 min)")
-    print("  2000 - Completo (~10 min)")
+    # Cantidad de pares
+    if len(sys.argv) > 2:
+        num_pairs = int(sys.argv[2])
+    else:
+        print("\n¿Cuántos pares deseas generar?")
+        print("  500  - Rápido")
+        print("  1000 - Recomendado")
+        print("  0    - Corpus completo")
 
-    try:
-        num_pairs = int(input("\nNúmero de pares: ").strip() or "1000")
-    except:
-        num_pairs = 1000
+        try:
+            num_pairs = int(input("\nNúmero de pares: ").strip() or "1000")
+        except:
+            num_pairs = 1000
 
-    # Procesar
+    # Procesar y guardar por bloques
     processor = PAN2011Processor(corpus_path)
-    processor.process_all_documents(max_pairs=num_pairs)
-
-    # Guardar
-    processor.save_to_csv()
+    processor.process_all_documents(max_pairs=num_pairs or None)
 
     print("\n🎉 ¡Listo! Ahora puedes entrenar el modelo:")
     print("\n   cd examples")
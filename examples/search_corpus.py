@@ -0,0 +1,69 @@
+"""
+search_corpus.py
+Búsqueda de plagio de un documento contra un corpus de referencia
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Indexa todos los .txt de un directorio y compara un documento nuevo
+solo contra los candidatos más parecidos.
+
+Uso: python search_corpus.py directorio_corpus/ documento.txt [top_k]
+"""
+
+import sys
+import os
+from pathlib import Path
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from plagiarism_detector import PlagiarismDetector
+from corpus_index import CorpusIndex
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(f"\nUso: python {sys.argv[0]} directorio_corpus/ documento.txt [top_k]")
+        sys.exit(1)
+
+    corpus_dir = Path(sys.argv[1])
+    query_path = sys.argv[2]
+    top_k = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    detector = PlagiarismDetector(language='spanish')
+    index_dir = corpus_dir / '.corpus_index'
+
+    # Reutilizar el índice si ya existe
+    if index_dir.exists():
+        print(f"\n Cargando índice desde {index_dir}")
+        index = CorpusIndex.load(str(index_dir), detector)
+    else:
+        print(f"\n Indexando documentos de {corpus_dir}")
+        index = CorpusIndex(detector)
+        index.add_documents(
+            (path.name, path.read_text(encoding='utf-8', errors='ignore'))
+            for path in sorted(corpus_dir.glob('*.txt'))
+        )
+        index.save(str(index_dir))
+
+    print(f" Documentos indexados: {len(index)}")
+
+    with open(query_path, 'r', encoding='utf-8') as f:
+        query = f.read()
+
+    results = index.search(query, top_k=top_k)
+
+    print("\n" + "="*70)
+    print(f"Documentos más parecidos a {os.path.basename(query_path)}")
+    print("="*70)
+    for rank, result in enumerate(results, 1):
+        print(f"\n {rank}. {result['doc_id']}")
+        print(f"    Similitud: {result['similarity_percentage']:.2f}%")
+        print(f"    Resultado: {result['verdict']}")
+
+    print("\n" + "="*70 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -29,6 +29,7 @@ def train_with_dataset():
 
     # Buscar dataset combinado primero
     dataset_options = [
+        "../data/training/combined_dataset.pairs",
         "../data/training/combined_dataset.csv",
         "../data/training/pan2011_dataset.csv",
         "../data/training/plagiarism_dataset.csv"
@@ -54,15 +55,16 @@ def train_with_dataset():
     # Crear detector
     detector = PlagiarismDetector(language='spanish')
 
-    # Crear entrenador
-    trainer = PlagiarismModelTrainer(detector)
+    # Crear entrenador (los scores por componente se guardan en cache/)
+    trainer = PlagiarismModelTrainer(detector, cache_dir="../cache/training")
 
     # Entrenar
     results = trainer.train(
         dataset_path=dataset_path,
         optimize_weights=True,
         optimize_threshold=True,
-        test_size=0.2
+        test_size=0.2,
+        timings_path="../models/training_timings.json"
     )
 
     # Guardar configuración optimizada
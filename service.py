@@ -0,0 +1,300 @@
+"""
+service.py
+Servicio HTTP asíncrono para Detección de Plagio
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Expone el detector para otros sistemas (p. ej. un LMS):
+- POST /compare        {"text1": ..., "text2": ...}
+- POST /compare/batch  {"pairs": [[text1, text2], ...]} (hasta PLAGIARISM_MAX_QUEUE pares)
+- POST /search         {"text": ..., "top_k": 5} (1 <= top_k <= PLAGIARISM_MAX_TOP_K)
+- GET  /health
+- GET  /metrics        tiempos por etapa en formato de texto de Prometheus
+
+Las comparaciones concurrentes se agrupan en micro-lotes para compartir
+una sola llamada a SentenceTransformer.encode, y la cola es acotada: si
+está llena el servicio responde 503 en lugar de acumular trabajo.
+
+Uso: python service.py [--host 0.0.0.0] [--port 8000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+from aiohttp import web
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from plagiarism_detector import PlagiarismDetector
+from embedding_cache import EmbeddingCache
+from corpus_index import CorpusIndex
+from profiling import TimingStats, configure_logging
+
+# Configuración por variables de entorno
+LANGUAGE = os.environ.get('PLAGIARISM_LANGUAGE', 'spanish')
+MODEL_NAME = os.environ.get('PLAGIARISM_MODEL', 'paraphrase-multilingual-MiniLM-L12-v2')
+EMBEDDING_BACKEND = os.environ.get('PLAGIARISM_EMBEDDING_BACKEND', 'torch')
+CHUNKED_ENCODING = os.environ.get('PLAGIARISM_CHUNKED_ENCODING', '0') != '0'
+CACHE_DIR = os.environ.get(
+    'PLAGIARISM_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'cache'))
+INDEX_DIR = os.environ.get('PLAGIARISM_INDEX_DIR')
+MAX_BATCH_SIZE = int(os.environ.get('PLAGIARISM_MAX_BATCH', 32))
+MAX_WAIT_MS = float(os.environ.get('PLAGIARISM_MAX_WAIT_MS', 10))
+MAX_QUEUE = int(os.environ.get('PLAGIARISM_MAX_QUEUE', 256))
+MAX_TEXT_CHARS = int(os.environ.get('PLAGIARISM_MAX_TEXT_CHARS', 500000))
+MAX_TOP_K = int(os.environ.get('PLAGIARISM_MAX_TOP_K', 100))
+LOG_LEVEL = os.environ.get('PLAGIARISM_LOG_LEVEL', 'INFO')
+LOG_JSON = os.environ.get('PLAGIARISM_LOG_JSON', '0') != '0'
+
+
+def to_json(value):
+    """
+    Convierte un resultado del detector a tipos serializables en JSON.
+    Omite los vocabularios (conjuntos grandes) de las características.
+    """
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items() if key != 'vocabulary'}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if isinstance(value, set):
+        return sorted(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+class MicroBatcher:
+    "Agrupa comparaciones concurrentes en un solo compare_many"
+
+    def __init__(self, detector: PlagiarismDetector, executor: ThreadPoolExecutor,
+                 max_batch_size: int = 32, max_wait_ms: float = 10, max_queue: int = 256):
+        """
+            detector: Detector compartido
+            executor: Hilo donde se ejecuta el detector (uno solo)
+            max_batch_size: Máximo de pares por lote
+            max_wait_ms: Espera máxima para completar un lote
+            max_queue: Tamaño máximo de la cola (backpressure)
+        """
+        self.detector = detector
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def submit(self, text1: str, text2: str) -> asyncio.Future:
+        """
+        Encola un par y devuelve un futuro con el resultado.
+
+        Raises:
+            asyncio.QueueFull si la cola está llena
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait(((text1, text2), future))
+        return future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            # Completar el lote hasta max_batch_size o max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            pairs = [pair for pair, _ in batch]
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.detector.compare_many, pairs, len(pairs))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+def _validate_text(value) -> str:
+    if not isinstance(value, str):
+        raise web.HTTPBadRequest(reason='Los textos deben ser cadenas')
+    if len(value) > MAX_TEXT_CHARS:
+        raise web.HTTPRequestEntityTooLarge(
+            max_size=MAX_TEXT_CHARS, actual_size=len(value))
+    return value
+
+
+def _validate_top_k(value) -> int:
+    # bool es subclase de int: true no debe pasar como 1
+    if not isinstance(value, int) or isinstance(value, bool) or not 1 <= value <= MAX_TOP_K:
+        raise web.HTTPBadRequest(
+            reason=f'top_k debe ser un entero entre 1 y {MAX_TOP_K}')
+    return value
+
+
+async def _read_json(request: web.Request) -> Dict:
+    try:
+        body = await request.json()
+    except Exception:
+        raise web.HTTPBadRequest(reason='El cuerpo debe ser JSON válido')
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(reason='El cuerpo debe ser un objeto JSON')
+    return body
+
+
+async def _submit_pairs(request: web.Request, pairs: List[Tuple[str, str]]) -> List[Dict]:
+    batcher = request.app['batcher']
+    # Un lote mayor que la cola nunca cabría: reintentar no sirve
+    if len(pairs) > batcher.queue.maxsize:
+        raise web.HTTPRequestEntityTooLarge(
+            max_size=batcher.queue.maxsize, actual_size=len(pairs),
+            text=f'El lote admite como máximo {batcher.queue.maxsize} pares')
+    if len(pairs) > batcher.queue.maxsize - batcher.queue.qsize():
+        raise web.HTTPServiceUnavailable(
+            reason='Cola llena, intenta más tarde', headers={'Retry-After': '1'})
+    try:
+        futures = [batcher.submit(text1, text2) for text1, text2 in pairs]
+    except asyncio.QueueFull:
+        raise web.HTTPServiceUnavailable(
+            reason='Cola llena, intenta más tarde', headers={'Retry-After': '1'})
+    return await asyncio.gather(*futures)
+
+
+async def handle_compare(request: web.Request) -> web.Response:
+    body = await _read_json(request)
+    text1 = _validate_text(body.get('text1'))
+    text2 = _validate_text(body.get('text2'))
+
+    result, = await _submit_pairs(request, [(text1, text2)])
+    return web.json_response(to_json(result))
+
+
+async def handle_compare_batch(request: web.Request) -> web.Response:
+    body = await _read_json(request)
+    pairs = body.get('pairs')
+    if not isinstance(pairs, list) or not all(
+            isinstance(pair, (list, tuple)) and len(pair) == 2 for pair in pairs):
+        raise web.HTTPBadRequest(reason='pairs debe ser una lista de [text1, text2]')
+
+    pairs = [(_validate_text(text1), _validate_text(text2)) for text1, text2 in pairs]
+    results = await _submit_pairs(request, pairs)
+    return web.json_response({'results': to_json(results)})
+
+
+async def handle_search(request: web.Request) -> web.Response:
+    index = request.app['index']
+    if index is None:
+        raise web.HTTPServiceUnavailable(reason='No hay un índice de corpus cargado')
+
+    body = await _read_json(request)
+    text = _validate_text(body.get('text'))
+    top_k = _validate_top_k(body.get('top_k', 5))
+
+    results = await asyncio.get_running_loop().run_in_executor(
+        request.app['executor'], index.search, text, top_k)
+    return web.json_response({'results': to_json(results)})
+
+
+async def handle_health(request: web.Request) -> web.Response:
+    batcher = request.app['batcher']
+    return web.json_response({
+        'status': 'ok',
+        'model': MODEL_NAME,
+        'embedding_backend': EMBEDDING_BACKEND,
+        'queue_depth': batcher.queue.qsize(),
+        'queue_capacity': batcher.queue.maxsize,
+        'index_documents': len(request.app['index']) if request.app['index'] else 0
+    })
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    stats = request.app['timing_stats']
+    return web.Response(text=stats.to_prometheus() if stats else '',
+                        content_type='text/plain', charset='utf-8')
+
+
+async def on_startup(app: web.Application):
+    app['batcher'].start()
+
+
+async def on_cleanup(app: web.Application):
+    await app['batcher'].stop()
+    app['executor'].shutdown(wait=False)
+
+
+def create_app(detector: PlagiarismDetector = None) -> web.Application:
+    """
+    Crea la aplicación aiohttp con el detector y el índice configurados.
+    """
+    detector = detector or PlagiarismDetector(
+        language=LANGUAGE, model_name=MODEL_NAME, embedding_backend=EMBEDDING_BACKEND,
+        embedding_cache=EmbeddingCache(cache_dir=os.path.join(CACHE_DIR, 'embeddings')),
+        warm_up=True, chunked_encoding=CHUNKED_ENCODING, passage_alignment=True,
+        timing_stats=TimingStats())
+
+    index = None
+    if INDEX_DIR and os.path.exists(INDEX_DIR):
+        index = CorpusIndex.load(INDEX_DIR, detector)
+
+    # Un solo hilo para el detector: el modelo no se usa en paralelo
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    app = web.Application(client_max_size=4 * MAX_TEXT_CHARS + 1024)
+    app['executor'] = executor
+    app['index'] = index
+    app['timing_stats'] = detector.timing_stats
+    app['batcher'] = MicroBatcher(detector, executor, MAX_BATCH_SIZE, MAX_WAIT_MS, MAX_QUEUE)
+
+    app.router.add_post('/compare', handle_compare)
+    app.router.add_post('/compare/batch', handle_compare_batch)
+    app.router.add_post('/search', handle_search)
+    app.router.add_get('/health', handle_health)
+    app.router.add_get('/metrics', handle_metrics)
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servicio HTTP del detector de plagio')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    configure_logging(LOG_LEVEL, json_format=LOG_JSON)
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
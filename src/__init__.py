@@ -1,17 +1,33 @@
 """
 Modelo de Detección de Plagio y Similitud de Textos
+
+Las clases se importan al accederse por primera vez (PEP 562), de modo que
+importar el paquete no carga sentence-transformers, torch ni scikit-learn.
 """
 
-from .plagiarism_detector import PlagiarismDetector
-from .text_preprocessor import TextPreprocessor
-from .similarity_metrics import SimilarityMetrics
-from .model_trainer import PlagiarismModelTrainer
+import importlib
 
 __version__ = '1.0.0'
 
-__all__ = [
-    'PlagiarismDetector',
-    'TextPreprocessor',
-    'SimilarityMetrics',
-    'PlagiarismModelTrainer',
-]
+# Nombre público -> submódulo que lo define
+_EXPORTS = {
+    'PlagiarismDetector': 'plagiarism_detector',
+    'TextPreprocessor': 'text_preprocessor',
+    'SimilarityMetrics': 'similarity_metrics',
+    'PlagiarismModelTrainer': 'model_trainer',
+    'EmbeddingCache': 'embedding_cache',
+    'EmbeddingScheduler': 'embedding_scheduler',
+    'CorpusIndex': 'corpus_index',
+    'MinHasher': 'minhash',
+    'LSHIndex': 'minhash',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,164 @@
+"""
+batch_comparison.py
+Comparación de todos los pares de un lote de documentos
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Revisa un lote de entregas (p. ej. 200 documentos = 19 900 pares) sin
+ejecutar el análisis completo sobre cada par:
+- Primera pasada para todos los pares: coseno de embeddings calculados
+  por lotes (un producto de matrices) y Jaccard de shingles estimado
+  con firmas MinHash
+- Análisis completo (compare_many) solo sobre los pares con mayor score
+  de preselección, reportando el avance a medida que terminan
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from plagiarism_detector import PlagiarismDetector
+from minhash import MinHasher
+
+# Etapas reportadas por el callback progress(etapa, fracción)
+BATCH_STAGES = ('preprocess', 'screening', 'analysis')
+
+
+def _no_progress(stage: str, fraction: float):
+    pass
+
+
+class BatchComparison:
+    "Matriz de similitud de un lote y análisis completo de los pares más parecidos"
+
+    def __init__(self, detector: PlagiarismDetector, shingle_size: int = 3,
+                 semantic_weight: float = 0.5, num_perm: int = 128):
+        """
+            detector: Detector que aporta el preprocesador, el modelo y el análisis
+            shingle_size: Tamaño de los n-gramas de palabras
+            semantic_weight: Peso del coseno frente al Jaccard de shingles
+                en el score de preselección (como en CorpusIndex)
+            num_perm: Tamaño de las firmas MinHash
+        """
+        self.detector = detector
+        self.preprocessor = detector.preprocessor
+        self.semantic_weight = semantic_weight
+        self.hasher = MinHasher(num_perm=num_perm, ngram_size=shingle_size,
+                                preprocessor=detector.preprocessor)
+
+    def screen(self, texts: List[str], batch_size: int = 64,
+               progress: Callable[[str, float], None] = _no_progress) -> Dict[str, np.ndarray]:
+        """
+        Primera pasada sobre todos los pares del lote.
+
+        Args:
+            texts: Documentos del lote
+            batch_size: Documentos codificados por lote
+            progress: Callback (etapa, fracción completada de la etapa)
+
+        Returns:
+            Matrices simétricas (N x N) 'semantic', 'jaccard' y 'score'
+        """
+        n = len(texts)
+        clean_texts = []
+        signatures = []
+        for i, text in enumerate(texts):
+            clean_text = self.preprocessor.normalize_text(text)
+            shingles = self.preprocessor.get_shingle_hashes(
+                self.preprocessor.tokenize_words(clean_text), self.hasher.ngram_size)
+            clean_texts.append(clean_text)
+            signatures.append(self.hasher.signature_from_hashes(shingles))
+            progress('preprocess', (i + 1) / n)
+
+        # Coseno entre todos los documentos con un solo producto
+        embeddings = []
+        for start in range(0, n, batch_size):
+            embeddings.append(self.detector._encode_documents(
+                clean_texts[start:start + batch_size], batch_size=batch_size))
+            progress('screening', min(start + batch_size, n) / (2 * n))
+        embeddings = self.detector._normalize_rows(np.vstack(embeddings))
+        semantic = np.clip(embeddings @ embeddings.T, 0.0, 1.0)
+
+        # Jaccard estimado: fracción de mínimos iguales entre firmas
+        signatures = np.vstack(signatures)
+        jaccard = np.zeros((n, n), dtype=np.float32)
+        for i in range(n):
+            jaccard[i, i + 1:] = MinHasher.estimate_jaccard_many(signatures[i], signatures[i + 1:])
+            progress('screening', 0.5 + (i + 1) / (2 * n))
+        jaccard = jaccard + jaccard.T
+        np.fill_diagonal(jaccard, 1.0)
+
+        score = self.semantic_weight * semantic + (1 - self.semantic_weight) * jaccard
+        return {'semantic': semantic, 'jaccard': jaccard, 'score': score}
+
+    @staticmethod
+    def top_pairs(score: np.ndarray, top_k: int) -> List[Tuple[int, int]]:
+        """
+        Los top_k pares (i < j) con mayor score de preselección.
+        """
+        rows, cols = np.triu_indices(len(score), k=1)
+        if not len(rows):
+            return []
+        scores = score[rows, cols]
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[k]), int(cols[k])) for k in top]
+
+    def run(self, documents: List[Tuple[str, str]], top_k: int = 20,
+            group_size: int = 8, batch_size: int = 64,
+            progress: Optional[Callable[[str, float], None]] = None) -> Dict:
+        """
+        Compara todos los pares de un lote.
+
+        Args:
+            documents: Lista de tuplas (nombre, texto)
+            top_k: Pares analizados a fondo con compare_many
+            group_size: Pares analizados por llamada a compare_many
+                (el avance se reporta al terminar cada grupo)
+            batch_size: Documentos codificados por lote en la preselección
+            progress: Callback (etapa de BATCH_STAGES, fracción completada)
+
+        Returns:
+            Diccionario con 'names', las matrices de screen y 'pairs': lista
+            de los pares analizados ordenada por similitud final, cada uno
+            con sus índices, scores de preselección y resultado completo
+        """
+        progress = progress or _no_progress
+        names = [name for name, _ in documents]
+        texts = [text for _, text in documents]
+
+        matrices = self.screen(texts, batch_size=batch_size, progress=progress)
+        candidates = self.top_pairs(matrices['score'], top_k)
+
+        # Cada documento de los pares elegidos se preprocesa una sola vez
+        processed = {}
+        for i, j in candidates:
+            for index in (i, j):
+                if index not in processed:
+                    processed[index] = self.detector.process_document(texts[index])
+
+        pairs = []
+        progress('analysis', 0.0)
+        for start in range(0, len(candidates), group_size):
+            group = candidates[start:start + group_size]
+            results = self.detector.compare_many(
+                [(processed[i], processed[j]) for i, j in group], batch_size=batch_size)
+
+            for (i, j), result in zip(group, results):
+                pairs.append({
+                    'index1': i,
+                    'index2': j,
+                    'name1': names[i],
+                    'name2': names[j],
+                    'candidate_score': float(matrices['score'][i, j]),
+                    'semantic': float(matrices['semantic'][i, j]),
+                    'jaccard': float(matrices['jaccard'][i, j]),
+                    'similarity_percentage': float(result['similarity_percentage']),
+                    'result': result
+                })
+            progress('analysis', min(start + group_size, len(candidates)) / len(candidates))
+
+        pairs.sort(key=lambda pair: pair['similarity_percentage'], reverse=True)
+        return {'names': names, **matrices, 'pairs': pairs}
@@ -0,0 +1,226 @@
+"""
+corpus_index.py
+Índice de corpus para búsqueda de plagio uno contra muchos
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Indexa una sola vez los documentos de referencia y busca los candidatos
+más parecidos a un documento nuevo:
+- Matriz de embeddings normalizados (similitud coseno con un producto)
+- Índice invertido de shingles (n-gramas de palabras)
+- Análisis completo del detector solo sobre los candidatos preseleccionados
+"""
+
+import json
+import os
+import pickle
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from plagiarism_detector import PlagiarismDetector
+
+
+class CorpusIndex:
+    "Índice de documentos de referencia para búsqueda de candidatos"
+
+    def __init__(self, detector: PlagiarismDetector, shingle_size: int = 3,
+                 semantic_weight: float = 0.5):
+        """
+            detector: Detector que aporta el preprocesador y el modelo
+            shingle_size: Tamaño de los n-gramas de palabras
+            semantic_weight: Peso del coseno frente a la contención de
+                shingles en el score de preselección
+        """
+        self.detector = detector
+        self.preprocessor = detector.preprocessor
+        self.shingle_size = shingle_size
+        self.semantic_weight = semantic_weight
+
+        self.doc_ids = []
+        self.texts = []
+        self._pending_embeddings = []
+        self._embeddings = None
+        self._shingle_index = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def _document_shingles(self, text: str) -> set:
+        clean_text = self.preprocessor.normalize_text(text)
+        tokens = self.preprocessor.tokenize_words(clean_text)
+        return self.preprocessor.get_shingle_hashes(tokens, self.shingle_size)
+
+    def add_documents(self, documents: Iterable[Tuple[str, str]], batch_size: int = 64):
+        """
+        Agrega documentos al índice.
+
+        Args:
+            documents: Iterable de tuplas (id, texto)
+            batch_size: Documentos codificados por lote
+        """
+        batch = []
+        for doc_id, text in documents:
+            batch.append((doc_id, text))
+            if len(batch) >= batch_size:
+                self._add_batch(batch, batch_size)
+                batch = []
+
+        if batch:
+            self._add_batch(batch, batch_size)
+
+    def _add_batch(self, batch: List[Tuple[str, str]], batch_size: int):
+        clean_texts = [self.preprocessor.normalize_text(text) for _, text in batch]
+        embeddings = self.detector._normalize_rows(
+            self.detector._encode_documents(clean_texts, batch_size=batch_size))
+
+        for (doc_id, text), embedding in zip(batch, embeddings):
+            position = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.texts.append(text)
+            self._pending_embeddings.append(embedding)
+
+            for shingle in self._document_shingles(text):
+                self._shingle_index[shingle].append(position)
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        "Matriz (N x d) de embeddings normalizados del corpus"
+        if self._pending_embeddings:
+            pending = np.vstack(self._pending_embeddings).astype(np.float32)
+            if self._embeddings is None or not len(self._embeddings):
+                self._embeddings = pending
+            else:
+                self._embeddings = np.vstack([self._embeddings, pending])
+            self._pending_embeddings = []
+
+        if self._embeddings is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._embeddings
+
+    def retrieve(self, text: str, top_k: int = 10) -> List[Dict]:
+        """
+        Recupera los candidatos más parecidos sin ejecutar el análisis completo.
+
+        Args:
+            text: Documento a consultar
+            top_k: Número de candidatos
+
+        Returns:
+            Lista de candidatos ordenada por score de preselección
+        """
+        if not self.doc_ids or not text:
+            return []
+
+        # Similitud coseno con todo el corpus en un solo producto
+        clean_text = self.preprocessor.normalize_text(text)
+        query = self.detector._normalize_rows(
+            self.detector._encode_documents([clean_text]))[0]
+        semantic = self.embeddings @ query
+
+        # Contención de shingles de la consulta en cada documento
+        query_shingles = self._document_shingles(text)
+        overlap = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for shingle in query_shingles:
+            postings = self._shingle_index.get(shingle)
+            if postings:
+                np.add.at(overlap, postings, 1.0)
+        containment = overlap / len(query_shingles) if query_shingles else overlap
+
+        scores = self.semantic_weight * semantic + \
+            (1 - self.semantic_weight) * containment
+
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+
+        return [{
+            'doc_id': self.doc_ids[i],
+            'candidate_score': float(scores[i]),
+            'semantic': float(semantic[i]),
+            'shingle_containment': float(containment[i])
+        } for i in top]
+
+    def search(self, text: str, top_k: int = 5, candidates: int = 50) -> List[Dict]:
+        """
+        Busca plagio de un documento contra el corpus.
+
+        Preselecciona candidatos con el índice y ejecuta
+        PlagiarismDetector.analyze_texts solo sobre ellos.
+
+        Args:
+            text: Documento a consultar
+            top_k: Número de resultados finales
+            candidates: Número de candidatos a analizar a fondo
+
+        Returns:
+            Lista de resultados ordenada por score final
+        """
+        shortlist = self.retrieve(text, top_k=max(top_k, candidates))
+        position = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+
+        # La consulta se preprocesa una sola vez para todos los candidatos
+        query_document = self.detector.process_document(text)
+
+        results = []
+        for candidate in shortlist:
+            analysis = self.detector.analyze_texts(
+                query_document, self.texts[position[candidate['doc_id']]])
+            results.append({
+                **candidate,
+                'final_score': float(analysis['final_score']),
+                'similarity_percentage': float(analysis['similarity_percentage']),
+                'verdict': self.detector.get_verdict(analysis['similarity_percentage']),
+                'details': analysis
+            })
+
+        results.sort(key=lambda r: r['final_score'], reverse=True)
+        return results[:top_k]
+
+    def save(self, directory: str):
+        """
+        Guarda el índice en un directorio (embeddings, textos y shingles).
+        """
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'embeddings.npy'), self.embeddings)
+
+        with open(os.path.join(directory, 'documents.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'doc_ids': self.doc_ids,
+                'texts': self.texts,
+                'shingle_size': self.shingle_size,
+                'model_name': self.detector.model_name,
+                'embedding_backend': self.detector.embedding_backend
+            }, f, ensure_ascii=False)
+
+        with open(os.path.join(directory, 'shingles.pkl'), 'wb') as f:
+            pickle.dump(dict(self._shingle_index), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, directory: str, detector: PlagiarismDetector,
+             semantic_weight: float = 0.5) -> 'CorpusIndex':
+        """
+        Carga un índice guardado con save().
+        """
+        with open(os.path.join(directory, 'documents.json'), 'r', encoding='utf-8') as f:
+            documents = json.load(f)
+
+        if documents['model_name'] != detector.model_name:
+            raise ValueError(
+                f"El índice se creó con el modelo {documents['model_name']}")
+        if documents.get('embedding_backend', 'torch') != detector.embedding_backend:
+            raise ValueError(
+                f"El índice se creó con el backend {documents['embedding_backend']}")
+
+        index = cls(detector, shingle_size=documents['shingle_size'],
+                    semantic_weight=semantic_weight)
+        index.doc_ids = documents['doc_ids']
+        index.texts = documents['texts']
+        index._embeddings = np.load(os.path.join(directory, 'embeddings.npy'))
+
+        with open(os.path.join(directory, 'shingles.pkl'), 'rb') as f:
+            index._shingle_index = defaultdict(list, pickle.load(f))
+
+        return index
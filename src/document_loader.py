@@ -0,0 +1,264 @@
+"""
+document_loader.py
+Lectura de documentos PDF, TXT y MD en streaming
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Extrae el texto de un documento por partes en lugar de cargar el archivo
+completo y decodificarlo de una vez:
+- TXT/MD: lectura por bloques con un decodificador incremental
+  (BOM UTF-8/UTF-16, UTF-8 o cp1252 detectado en el primer bloque)
+- PDF: extracción página por página con pypdf (se importa solo al leer un PDF)
+- Normalización incremental: saltos de línea \\r\\n -> \\n y Unicode NFC
+- Límites de tamaño del archivo, de páginas y de caracteres extraídos
+- Archivos ZIP con varios documentos (modo por lotes de la app)
+"""
+
+import codecs
+import io
+import os
+import unicodedata
+import zipfile
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+DEFAULT_MAX_CHARS = 2_000_000
+DEFAULT_MAX_PAGES = 500
+DEFAULT_MAX_FILES = 500
+READ_BLOCK_SIZE = 64 * 1024
+
+TEXT_EXTENSIONS = ('.txt', '.md')
+PDF_EXTENSIONS = ('.pdf',)
+
+Source = Union[str, os.PathLike, BinaryIO]
+
+
+class DocumentTooLargeError(ValueError):
+    "El documento supera alguno de los límites de tamaño"
+
+
+class UnsupportedDocumentError(ValueError):
+    "Formato de documento no soportado"
+
+
+def _source_name(source: Source, name: Optional[str]) -> str:
+    if name:
+        return name
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return getattr(source, 'name', '') or ''
+
+
+def _source_size(source: Source) -> Optional[int]:
+    "Tamaño en bytes si se conoce sin leer el contenido"
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    size = getattr(source, 'size', None)
+    return size if isinstance(size, int) else None
+
+
+def _open_binary(source: Source) -> BinaryIO:
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, 'rb')
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return source
+
+
+def detect_format(source: Source, name: Optional[str] = None) -> str:
+    """
+    Formato de un documento ('pdf' o 'text') por extensión o firma %PDF.
+    """
+    extension = os.path.splitext(_source_name(source, name))[1].lower()
+    if extension in PDF_EXTENSIONS:
+        return 'pdf'
+    if extension in TEXT_EXTENSIONS:
+        return 'text'
+
+    stream = _open_binary(source)
+    try:
+        header = stream.read(5)
+    finally:
+        if stream is not source:
+            stream.close()
+        elif hasattr(source, 'seek'):
+            source.seek(0)
+
+    if header == b'%PDF-':
+        return 'pdf'
+    if extension:
+        raise UnsupportedDocumentError(f"Formato no soportado: {extension}")
+    return 'text'
+
+
+def _detect_encoding(first_block: bytes) -> str:
+    "Codificación a partir del primer bloque (BOM, UTF-8 válido o cp1252)"
+    if first_block.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if first_block.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        # final=False: un carácter cortado al final del bloque no es error
+        codecs.getincrementaldecoder('utf-8')().decode(first_block, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp1252'
+
+
+def _iter_text_blocks(stream: BinaryIO, encoding: Optional[str],
+                      max_bytes: int) -> Iterator[str]:
+    "Decodifica un archivo de texto por bloques"
+    first_block = stream.read(READ_BLOCK_SIZE)
+    decoder = codecs.getincrementaldecoder(
+        encoding or _detect_encoding(first_block))(errors='replace')
+
+    total = 0
+    block = first_block
+    while block:
+        total += len(block)
+        if total > max_bytes:
+            raise DocumentTooLargeError(
+                f"El documento supera el límite de {max_bytes / (1024 * 1024):.1f} MB")
+        yield decoder.decode(block)
+        block = stream.read(READ_BLOCK_SIZE)
+    yield decoder.decode(b'', final=True)
+
+
+def _iter_pdf_pages(stream: BinaryIO, max_pages: int) -> Iterator[str]:
+    "Extrae el texto de un PDF página por página"
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ImportError("Para leer PDF instala pypdf: pip install pypdf")
+
+    reader = PdfReader(stream)
+    if len(reader.pages) > max_pages:
+        raise DocumentTooLargeError(
+            f"El PDF tiene {len(reader.pages)} páginas (límite: {max_pages})")
+
+    for page in reader.pages:
+        yield (page.extract_text() or '') + '\n\n'
+
+
+def _normalize_stream(pieces: Iterator[str]) -> Iterator[str]:
+    """
+    Normaliza saltos de línea y Unicode (NFC) pieza por pieza. Se retienen
+    los caracteres del final que pueden combinarse con la pieza siguiente
+    (un \\r antes de \\n o un carácter base antes de un acento combinante).
+    """
+    pending = ''
+    for piece in pieces:
+        text = (pending + piece).replace('\r\n', '\n')
+        cut = len(text)
+        while cut > 0 and (text[cut - 1] == '\r' or unicodedata.combining(text[cut - 1])):
+            cut -= 1
+        # El carácter base también se retiene por si le sigue un combinante
+        if cut < len(text) or (cut > 0 and text[cut - 1] != '\n'):
+            cut = max(cut - 1, 0)
+
+        pending = text[cut:]
+        if cut:
+            yield unicodedata.normalize('NFC', text[:cut].replace('\r', '\n'))
+
+    if pending:
+        yield unicodedata.normalize('NFC', pending.replace('\r', '\n'))
+
+
+def iter_document_text(source: Source, name: Optional[str] = None,
+                       encoding: Optional[str] = None,
+                       max_bytes: int = DEFAULT_MAX_BYTES,
+                       max_chars: int = DEFAULT_MAX_CHARS,
+                       max_pages: int = DEFAULT_MAX_PAGES) -> Iterator[str]:
+    """
+    Recorre el texto de un documento por partes (bloques o páginas).
+
+    Args:
+        source: Ruta o archivo binario (p. ej. un archivo subido en Streamlit)
+        name: Nombre del archivo para reconocer la extensión
+        encoding: Codificación de los TXT/MD (None = detectar)
+        max_bytes: Tamaño máximo del archivo
+        max_chars: Caracteres máximos de texto extraído
+        max_pages: Páginas máximas de un PDF
+
+    Yields:
+        Fragmentos de texto normalizado, en orden
+    """
+    size = _source_size(source)
+    if size is not None and size > max_bytes:
+        raise DocumentTooLargeError(
+            f"El documento supera el límite de {max_bytes / (1024 * 1024):.1f} MB")
+
+    document_format = detect_format(source, name)
+    stream = _open_binary(source)
+    try:
+        if document_format == 'pdf':
+            pieces = _iter_pdf_pages(stream, max_pages)
+        else:
+            pieces = _iter_text_blocks(stream, encoding, max_bytes)
+
+        chars = 0
+        for text in _normalize_stream(pieces):
+            chars += len(text)
+            if chars > max_chars:
+                raise DocumentTooLargeError(
+                    f"El documento supera el límite de {max_chars} caracteres")
+            yield text
+    finally:
+        if stream is not source:
+            stream.close()
+
+
+def load_document(source: Source, name: Optional[str] = None,
+                  encoding: Optional[str] = None,
+                  max_bytes: int = DEFAULT_MAX_BYTES,
+                  max_chars: int = DEFAULT_MAX_CHARS,
+                  max_pages: int = DEFAULT_MAX_PAGES) -> str:
+    """
+    Texto completo de un documento PDF, TXT o MD (ver iter_document_text).
+
+    El archivo se lee por partes y solo se construye la cadena final,
+    sin guardar una copia completa de los bytes ni del texto sin normalizar.
+    """
+    buffer = io.StringIO()
+    for text in iter_document_text(source, name=name, encoding=encoding,
+                                   max_bytes=max_bytes, max_chars=max_chars,
+                                   max_pages=max_pages):
+        buffer.write(text)
+    return buffer.getvalue()
+
+
+def iter_archive_documents(source: Source, max_files: int = DEFAULT_MAX_FILES,
+                           max_bytes: int = DEFAULT_MAX_BYTES,
+                           max_chars: int = DEFAULT_MAX_CHARS,
+                           max_pages: int = DEFAULT_MAX_PAGES) -> Iterator[Tuple[str, str]]:
+    """
+    Recorre los documentos PDF, TXT y MD de un archivo ZIP sin
+    descomprimirlo a disco; los demás archivos se ignoran.
+
+    Args:
+        source: Ruta o archivo binario del ZIP
+        max_files: Documentos máximos en el archivo
+        max_bytes: Tamaño máximo descomprimido de cada documento
+        max_chars, max_pages: Límites de cada documento (ver iter_document_text)
+
+    Yields:
+        Tuplas (nombre dentro del ZIP, texto)
+    """
+    with zipfile.ZipFile(source) as archive:
+        members = [info for info in archive.infolist()
+                   if not info.is_dir() and not os.path.basename(info.filename).startswith('.')
+                   and os.path.splitext(info.filename)[1].lower() in TEXT_EXTENSIONS + PDF_EXTENSIONS]
+        if len(members) > max_files:
+            raise DocumentTooLargeError(
+                f"El archivo contiene {len(members)} documentos (límite: {max_files})")
+
+        for info in members:
+            # El tamaño declarado se comprueba antes de descomprimir
+            if info.file_size > max_bytes:
+                raise DocumentTooLargeError(
+                    f"{info.filename} supera el límite de {max_bytes / (1024 * 1024):.1f} MB")
+            with archive.open(info) as member:
+                yield info.filename, load_document(
+                    member, name=info.filename, max_bytes=max_bytes,
+                    max_chars=max_chars, max_pages=max_pages)
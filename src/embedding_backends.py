@@ -0,0 +1,203 @@
+"""
+embedding_backends.py
+Backend ONNX Runtime (int8) para los embeddings semánticos
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Alternativa a SentenceTransformer para nodos solo con CPU:
+- Exporta el transformer del modelo a ONNX y lo cuantiza a int8 (dinámico)
+- Ejecuta el modelo exportado con onnxruntime y el mismo tokenizador
+- Aplica el mismo pooling (promedio sobre la máscara de atención)
+
+El modelo exportado vive en models/<modelo>-onnx-int8 y expone encode()
+con la misma interfaz que SentenceTransformer.encode.
+"""
+
+import json
+import os
+from typing import List, Optional, Union
+
+import numpy as np
+
+
+EMBEDDING_BACKENDS = ('torch', 'onnx')
+
+MODELS_DIR = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models'))
+
+# Archivos dentro del directorio exportado
+ONNX_MODEL_FILE = 'model_int8.onnx'
+ONNX_CONFIG_FILE = 'embedding_config.json'
+
+
+def default_onnx_dir(model_name: str) -> str:
+    """
+    Directorio por defecto del modelo ONNX cuantizado dentro de models/.
+    """
+    return os.path.join(MODELS_DIR, f"{os.path.basename(model_name)}-onnx-int8")
+
+
+def export_onnx_model(model_name: str, output_dir: Optional[str] = None,
+                      quantize: bool = True, opset: int = 14) -> str:
+    """
+    Exporta un modelo de sentence-transformers a ONNX con cuantización int8.
+
+    Requiere torch, sentence-transformers, onnx y onnxruntime (solo al
+    exportar; la inferencia solo necesita onnxruntime y transformers).
+
+    Args:
+        model_name: Nombre o ruta del modelo de sentence-transformers
+        output_dir: Directorio destino (por defecto default_onnx_dir)
+        quantize: Cuantizar los pesos a int8 (si no, se guarda en fp32)
+        opset: Versión de opset de ONNX
+
+    Returns:
+        Ruta del directorio exportado
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = output_dir or default_onnx_dir(model_name)
+    os.makedirs(output_dir, exist_ok=True)
+
+    model = SentenceTransformer(model_name, device='cpu')
+    transformer = model[0]
+    pooling = model[1]
+    if not getattr(pooling, 'pooling_mode_mean_tokens', False):
+        raise ValueError("Solo se admiten modelos con pooling promedio")
+    if len(model) > 2:
+        raise ValueError("El modelo tiene capas después del pooling y no se puede exportar")
+
+    auto_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+    sample = tokenizer(["texto de ejemplo para exportar"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids')
+                   if name in sample]
+
+    class _TokenEmbeddings(torch.nn.Module):
+        "Envuelve el transformer para devolver solo los embeddings de tokens"
+
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *inputs):
+            return self.inner(**dict(zip(input_names, inputs)))[0]
+
+    fp32_path = os.path.join(output_dir, 'model_fp32.onnx')
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['token_embeddings'] = {0: 'batch', 1: 'sequence'}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _TokenEmbeddings(auto_model), tuple(sample[name] for name in input_names),
+            fp32_path, input_names=input_names, output_names=['token_embeddings'],
+            dynamic_axes=dynamic_axes, opset_version=opset, do_constant_folding=True)
+
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    if quantize:
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError:
+            raise ImportError("Para cuantizar instala el backend ONNX: "
+                              "pip install -r requirements-onnx.txt")
+
+        quantize_dynamic(fp32_path, model_path, weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+    else:
+        os.replace(fp32_path, model_path)
+
+    tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, ONNX_CONFIG_FILE), 'w', encoding='utf-8') as f:
+        json.dump({
+            'model_name': model_name,
+            'max_seq_length': model.max_seq_length,
+            'pooling': 'mean',
+            'quantized': quantize,
+            'embedding_dimension': model.get_sentence_embedding_dimension()
+        }, f, indent=2)
+
+    return output_dir
+
+
+class OnnxEmbeddingModel:
+    "Modelo de embeddings exportado a ONNX, compatible con SentenceTransformer.encode"
+
+    def __init__(self, model_dir: str, num_threads: Optional[int] = None):
+        """
+            model_dir: Directorio creado con export_onnx_model
+            num_threads: Hilos de onnxruntime (None = los del proceso)
+        """
+        config_path = os.path.join(model_dir, ONNX_CONFIG_FILE)
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(
+                f"No hay un modelo ONNX exportado en {model_dir}. "
+                f"Ejecuta examples/export_onnx.py para crearlo.")
+
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("Para el backend ONNX instala onnxruntime: "
+                              "pip install -r requirements-onnx.txt")
+        from transformers import AutoTokenizer
+
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+
+        self.model_dir = model_dir
+        self.max_seq_length = self.config['max_seq_length']
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, ONNX_MODEL_FILE), options,
+            providers=['CPUExecutionProvider'])
+        self._input_names = [node.name for node in self.session.get_inputs()]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config['embedding_dimension']
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(texts, padding=True, truncation=True,
+                                 max_length=self.max_seq_length, return_tensors='np')
+        feeds = {name: encoded[name].astype(np.int64) for name in self._input_names}
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Pooling promedio sobre los tokens reales (igual que sentence-transformers)
+        mask = encoded['attention_mask'][..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        return (summed / counts).astype(np.float32)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               convert_to_tensor: bool = False, **kwargs) -> np.ndarray:
+        """
+        Codifica textos igual que SentenceTransformer.encode.
+
+        Args:
+            sentences: Un texto o lista de textos
+            batch_size: Textos por llamada al modelo
+
+        Returns:
+            Arreglo float32 (1D para un solo texto)
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        # Ordenar por longitud para reducir el relleno dentro de cada lote
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings = np.empty((len(texts), self.get_sentence_embedding_dimension()),
+                              dtype=np.float32)
+
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            embeddings[batch] = self._encode_batch([texts[i] for i in batch])
+
+        return embeddings[0] if single else embeddings
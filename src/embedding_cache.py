@@ -0,0 +1,246 @@
+"""
+embedding_cache.py
+Caché persistente de embeddings direccionada por contenido
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Guarda los embeddings de textos y oraciones para no volver a codificarlos:
+- Nivel en memoria con política LRU
+- Nivel en disco con SQLite (vectores float32) y desalojo por tamaño
+- Búsqueda por lotes (get_many): una sola transacción por lote de textos
+- Claves: hash de (modelo, texto normalizado)
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Claves por consulta IN (...) (SQLite antiguo admite 999 parámetros)
+_SQL_BATCH = 500
+# Lotes guardados entre recuentos del disco (otros procesos también escriben)
+_RECOUNT_INTERVAL = 256
+
+
+class EmbeddingCache:
+    "Caché de embeddings en dos niveles (memoria LRU + SQLite en disco)"
+
+    def __init__(self, cache_dir: Optional[str] = None,
+                 max_memory_items: int = 10000,
+                 max_disk_items: int = 200000):
+        """
+            cache_dir: Directorio del archivo SQLite (None = solo memoria)
+            max_memory_items: Máximo de vectores en el nivel en memoria
+            max_disk_items: Máximo de vectores en el nivel en disco
+        """
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._disk_items = 0
+        self._puts_since_count = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._connection = sqlite3.connect(
+                os.path.join(cache_dir, 'embeddings.sqlite3'),
+                check_same_thread=False, timeout=30)
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS embeddings ('
+                'key TEXT PRIMARY KEY, vector BLOB NOT NULL, '
+                'last_access REAL NOT NULL)')
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS idx_last_access '
+                'ON embeddings (last_access)')
+            self._connection.commit()
+            self._disk_items = self._count_disk()
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        """
+        Clave direccionada por contenido para un texto y un modelo.
+
+        Args:
+            model_name: Nombre del modelo de embeddings
+            text: Texto codificado
+
+        Returns:
+            Hash SHA-1 hexadecimal
+        """
+        normalized = re.sub(r'\s+', ' ', text).strip()
+        return hashlib.sha1(
+            f"{model_name}\0{normalized}".encode('utf-8')).hexdigest()
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        """
+        Busca el embedding de un texto, primero en memoria y luego en disco.
+
+        Returns:
+            Vector float32 o None si no está en caché
+        """
+        return self.get_many(model_name, [text]).get(text)
+
+    def get_many(self, model_name: str, texts: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Busca los embeddings de varios textos. Los que no están en memoria
+        se leen de disco y su último acceso se actualiza en una sola
+        transacción para todo el lote.
+
+        Returns:
+            Diccionario texto -> vector float32 con los textos encontrados
+        """
+        found = {}
+        pending: Dict[str, List[str]] = {}
+
+        with self._lock:
+            for text in texts:
+                key = self.make_key(model_name, text)
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    found[text] = vector
+                else:
+                    pending.setdefault(key, []).append(text)
+
+            if self._connection is not None and pending:
+                keys = list(pending)
+                hits = []
+                for start in range(0, len(keys), _SQL_BATCH):
+                    batch = keys[start:start + _SQL_BATCH]
+                    rows = self._connection.execute(
+                        'SELECT key, vector FROM embeddings WHERE key IN '
+                        f'({", ".join("?" * len(batch))})', batch).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        self._remember(key, vector)
+                        for text in pending.pop(key):
+                            found[text] = vector
+                            self.disk_hits += 1
+                        hits.append(key)
+
+                if hits:
+                    now = time.time()
+                    self._connection.executemany(
+                        'UPDATE embeddings SET last_access = ? WHERE key = ?',
+                        [(now, key) for key in hits])
+                    self._connection.commit()
+
+            self.misses += sum(len(pending_texts) for pending_texts in pending.values())
+
+        return found
+
+    def put(self, model_name: str, text: str, vector: np.ndarray):
+        """
+        Guarda el embedding de un texto en ambos niveles.
+        """
+        self.put_many(model_name, {text: vector})
+
+    def put_many(self, model_name: str, vectors: Dict[str, np.ndarray]):
+        """
+        Guarda varios embeddings en una sola transacción.
+
+        Args:
+            model_name: Nombre del modelo de embeddings
+            vectors: Diccionario texto -> vector
+        """
+        now = time.time()
+        rows = []
+
+        with self._lock:
+            for text, vector in vectors.items():
+                key = self.make_key(model_name, text)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes(), now))
+
+            if self._connection is not None and rows:
+                # La clave depende del contenido: un vector ya guardado es el mismo,
+                # así que solo se cuentan las filas nuevas
+                changes = self._connection.total_changes
+                self._connection.executemany(
+                    'INSERT OR IGNORE INTO embeddings (key, vector, last_access) '
+                    'VALUES (?, ?, ?)', rows)
+                self._disk_items += self._connection.total_changes - changes
+                self._evict_disk()
+                self._connection.commit()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        "Inserta en el nivel en memoria respetando el límite LRU"
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _count_disk(self) -> int:
+        return self._connection.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+    def _evict_disk(self):
+        """
+        Elimina los vectores menos usados si el disco supera su límite.
+        El conteo se lleva en memoria y se recalcula de vez en cuando (y antes
+        de desalojar) porque otros procesos pueden compartir el archivo.
+        """
+        self._puts_since_count += 1
+        if self._puts_since_count >= _RECOUNT_INTERVAL:
+            self._disk_items = self._count_disk()
+            self._puts_since_count = 0
+
+        if self._disk_items <= self.max_disk_items:
+            return
+
+        self._disk_items = self._count_disk()
+        self._puts_since_count = 0
+        excess = self._disk_items - self.max_disk_items
+        if excess > 0:
+            self._connection.execute(
+                'DELETE FROM embeddings WHERE key IN ('
+                'SELECT key FROM embeddings ORDER BY last_access LIMIT ?)',
+                (excess,))
+            self._disk_items -= excess
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Contadores de aciertos y fallos de la caché.
+
+        Returns:
+            Diccionario con aciertos por nivel, fallos y tasa de acierto
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            disk_items = 0
+            if self._connection is not None:
+                disk_items = self._connection.execute(
+                    'SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_items': len(self._memory),
+                'disk_items': disk_items
+            }
+
+    def clear(self):
+        "Vacía ambos niveles de la caché"
+        with self._lock:
+            self._memory.clear()
+            if self._connection is not None:
+                self._connection.execute('DELETE FROM embeddings')
+                self._connection.commit()
+                self._disk_items = 0
@@ -0,0 +1,224 @@
+"""
+embedding_scheduler.py
+Planificador de micro-lotes para las peticiones de embeddings
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Se coloca delante del SentenceTransformer del detector y agrupa las
+peticiones de encode de varios hilos o corrutinas:
+- Espera hasta max_wait_ms o hasta max_batch_size textos
+- Ordena los textos por longitud para reducir el relleno (padding)
+- Ejecuta una sola llamada a encode y devuelve futuros por petición
+- Registra profundidad de cola, histograma de tamaños de lote y esperas
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List, Union
+
+import numpy as np
+
+
+# Límites superiores de las cubetas del histograma de tamaños de lote
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class EmbeddingScheduler:
+    "Agrupa peticiones concurrentes de encode en lotes dinámicos"
+
+    def __init__(self, model, max_batch_size: int = 64, max_wait_ms: float = 5.0,
+                 encode_batch_size: int = 32):
+        """
+            model: Modelo con método encode (SentenceTransformer), o una
+                función sin argumentos que lo devuelve (carga diferida)
+            max_batch_size: Máximo de textos por lote despachado
+            max_wait_ms: Espera máxima para completar un lote
+            encode_batch_size: batch_size interno de model.encode
+        """
+        self._model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.encode_batch_size = encode_batch_size
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending_texts = 0
+
+        self.batches = 0
+        self.texts_encoded = 0
+        self.batch_size_histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.batch_size_histogram['+inf'] = 0
+        self._wait_times = deque(maxlen=1000)
+
+        self._stopped = False
+        self._thread = threading.Thread(
+            target=self._run, name='embedding-scheduler', daemon=True)
+        self._thread.start()
+
+    @property
+    def model(self):
+        "Modelo de embeddings (resuelve la carga diferida en el primer uso)"
+        if not hasattr(self._model, 'encode') and callable(self._model):
+            self._model = self._model()
+        return self._model
+
+    def submit(self, texts: Union[str, List[str]]) -> Future:
+        """
+        Encola textos para codificar.
+
+        Args:
+            texts: Un texto o lista de textos
+
+        Returns:
+            Futuro con el arreglo de embeddings (1D para un solo texto)
+        """
+        if self._stopped:
+            raise RuntimeError("El planificador de embeddings está detenido")
+
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        future = Future()
+
+        if not texts:
+            future.set_result(np.zeros((0, 0), dtype=np.float32))
+            return future
+
+        with self._lock:
+            self._pending_texts += len(texts)
+        self._queue.put((texts, single, future, time.perf_counter()))
+        return future
+
+    def encode(self, texts: Union[str, List[str]], **kwargs) -> np.ndarray:
+        """
+        Interfaz compatible con SentenceTransformer.encode (bloqueante).
+        Los parámetros adicionales se ignoran: el lote lo decide el planificador.
+        """
+        return self.submit(texts).result()
+
+    async def encode_async(self, texts: Union[str, List[str]]) -> np.ndarray:
+        "Versión para corrutinas de encode"
+        return await asyncio.wrap_future(self.submit(texts))
+
+    def _collect_batch(self) -> list:
+        "Toma peticiones de la cola hasta max_batch_size textos o max_wait"
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        if first is None:
+            return [None]
+
+        requests = [first]
+        size = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                requests.append(None)
+                break
+            requests.append(request)
+            size += len(request[0])
+
+        return requests
+
+    def _run(self):
+        while True:
+            requests = self._collect_batch()
+            if not requests:
+                if self._stopped:
+                    return
+                continue
+
+            stop = requests[-1] is None
+            requests = [request for request in requests if request is not None]
+            if requests:
+                self._dispatch(requests)
+            if stop:
+                return
+
+    def _dispatch(self, requests: list):
+        started = time.perf_counter()
+        texts = [text for request_texts, _, _, _ in requests for text in request_texts]
+
+        with self._lock:
+            self._pending_texts -= len(texts)
+            self.batches += 1
+            self.texts_encoded += len(texts)
+            self._record_batch_size(len(texts))
+            for _, _, _, enqueued in requests:
+                self._wait_times.append(started - enqueued)
+
+        # Ordenar por longitud para minimizar el relleno
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+
+        try:
+            encoded = self.model.encode(
+                [texts[i] for i in order], batch_size=self.encode_batch_size,
+                convert_to_tensor=False)
+        except Exception as e:
+            for _, _, future, _ in requests:
+                future.set_exception(e)
+            return
+
+        vectors = np.empty_like(encoded)
+        vectors[order] = encoded
+
+        offset = 0
+        for request_texts, single, future, _ in requests:
+            result = vectors[offset:offset + len(request_texts)]
+            offset += len(request_texts)
+            future.set_result(result[0] if single else result)
+
+    def _record_batch_size(self, size: int):
+        for bucket in BATCH_SIZE_BUCKETS:
+            if size <= bucket:
+                self.batch_size_histogram[bucket] += 1
+                return
+        self.batch_size_histogram['+inf'] += 1
+
+    @property
+    def queue_depth(self) -> int:
+        "Textos en cola pendientes de codificar"
+        with self._lock:
+            return self._pending_texts
+
+    def stats(self) -> Dict:
+        """
+        Métricas del planificador.
+
+        Returns:
+            Diccionario con profundidad de cola, lotes, histograma de
+            tamaños y tiempos de espera (segundos) de las últimas peticiones
+        """
+        with self._lock:
+            waits = np.array(self._wait_times) if self._wait_times else np.zeros(1)
+            return {
+                'queue_depth': self._pending_texts,
+                'batches': self.batches,
+                'texts_encoded': self.texts_encoded,
+                'avg_batch_size': self.texts_encoded / self.batches if self.batches else 0.0,
+                'batch_size_histogram': dict(self.batch_size_histogram),
+                'wait_time_avg': float(waits.mean()),
+                'wait_time_p95': float(np.percentile(waits, 95)),
+                'wait_time_max': float(waits.max())
+            }
+
+    def close(self):
+        "Detiene el hilo tras despachar las peticiones pendientes"
+        if not self._stopped:
+            self._stopped = True
+            self._queue.put(None)
+            self._thread.join()
@@ -0,0 +1,222 @@
+"""
+job_queue.py
+Cola local de trabajos de comparación en segundo plano
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Ejecuta las comparaciones largas fuera del hilo del script de Streamlit:
+- submit devuelve un ID de trabajo de inmediato
+- Cada trabajo reporta la etapa en curso (preprocess, semantic, lexical,
+  sequence) a través del callback progress de compare_texts
+- La interfaz consulta el estado con get y muestra el resultado al terminar
+- Un pool de hilos acotado limita los trabajos pesados simultáneos;
+  los demás esperan en cola
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Sequence
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class Job:
+    "Estado de un trabajo de la cola"
+
+    def __init__(self, job_id: str, key: Optional[str], stages: Sequence[str]):
+        self.job_id = job_id
+        self.key = key
+        self.stages = tuple(stages)
+        self.status = QUEUED
+        self.stage = None
+        self.stage_index = -1
+        self.stage_fraction = 0.0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+
+    def set_stage(self, stage: str, fraction: float = 0.0):
+        """
+        Registra la etapa en curso y, opcionalmente, la fracción completada
+        de esa etapa (el avance nunca retrocede).
+        """
+        self.stage = stage
+        if stage not in self.stages:
+            return
+        index = self.stages.index(stage)
+        if index > self.stage_index:
+            self.stage_index = index
+            self.stage_fraction = fraction
+        elif index == self.stage_index:
+            self.stage_fraction = max(self.stage_fraction, fraction)
+
+    @property
+    def progress(self) -> float:
+        "Fracción completada según las etapas iniciadas"
+        if self.status == DONE:
+            return 1.0
+        if self.stage_index < 0:
+            return 0.0
+        return (self.stage_index + min(self.stage_fraction, 1.0)) / len(self.stages)
+
+    def snapshot(self) -> Dict:
+        "Copia del estado para la interfaz"
+        now = self.finished or time.time()
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'queued_seconds': (self.started or now) - self.created,
+            'elapsed_seconds': now - self.started if self.started else 0.0,
+        }
+
+
+class JobQueue:
+    "Cola de trabajos con un máximo de trabajos pesados simultáneos"
+
+    def __init__(self, stages: Sequence[str], max_concurrent: int = 1,
+                 max_jobs: int = 200):
+        """
+            stages: Etapas en el orden en que se reportan
+                (PlagiarismDetector usa PROGRESS_STAGES)
+            max_concurrent: Trabajos ejecutándose a la vez (el resto espera)
+            max_jobs: Trabajos terminados que se conservan para consultarlos
+        """
+        self.max_concurrent = max_concurrent
+        self.max_jobs = max_jobs
+        self.stages = tuple(stages)
+
+        # Hilos y no procesos: los trabajos comparten el modelo ya cargado
+        # en lugar de duplicarlo en memoria por cada proceso
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent,
+                                            thread_name_prefix='comparison-job')
+        self._jobs: Dict[str, Job] = {}
+        self._active_keys: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, task: Callable[[Callable[..., None]], Dict],
+               key: Optional[str] = None,
+               stages: Optional[Sequence[str]] = None) -> str:
+        """
+        Encola un trabajo.
+
+        Args:
+            task: Función que recibe el callback progress(etapa, fracción=0)
+                y devuelve el resultado
+            key: Identificador de la comparación; si ya hay un trabajo
+                pendiente con la misma clave se devuelve ese en lugar de
+                encolar otro (doble clic, varias sesiones)
+            stages: Etapas de este trabajo (por defecto las de la cola)
+
+        Returns:
+            ID del trabajo
+        """
+        with self._lock:
+            if key is not None and key in self._active_keys:
+                return self._active_keys[key]
+
+            job = Job(uuid.uuid4().hex, key, stages or self.stages)
+            self._jobs[job.job_id] = job
+            if key is not None:
+                self._active_keys[key] = job.job_id
+            self._prune()
+
+            job.future = self._executor.submit(self._run, job, task)
+            return job.job_id
+
+    def _run(self, job: Job, task: Callable[[Callable[..., None]], Dict]):
+        with self._lock:
+            if job.status == CANCELLED:
+                return
+            job.status = RUNNING
+            job.started = time.time()
+
+        try:
+            result = task(job.set_stage)
+        except Exception as e:
+            self._finish(job, FAILED, error=str(e))
+        else:
+            self._finish(job, DONE, result=result)
+
+    def _finish(self, job: Job, status: str, result: Optional[Dict] = None,
+                error: Optional[str] = None):
+        with self._lock:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished = time.time()
+            if job.key is not None and self._active_keys.get(job.key) == job.job_id:
+                del self._active_keys[job.key]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Estado de un trabajo (None si no existe o ya se descartó).
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job is not None else None
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancela un trabajo que aún espera en la cola.
+        Los trabajos en ejecución no se interrumpen.
+
+        Returns:
+            True si el trabajo se canceló
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return False
+            job.future.cancel()
+            job.status = CANCELLED
+            job.finished = time.time()
+            if job.key is not None and self._active_keys.get(job.key) == job.job_id:
+                del self._active_keys[job.key]
+            return True
+
+    def queue_position(self, job_id: str) -> int:
+        """
+        Trabajos en cola por delante de uno (0 si ya se está ejecutando).
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return 0
+            return sum(1 for other in self._jobs.values()
+                       if other.status == QUEUED and other.created < job.created)
+
+    def _prune(self):
+        # Descarta los trabajos terminados más antiguos
+        finished = [job for job in self._jobs.values() if job.status in FINISHED_STATES]
+        excess = len(finished) - self.max_jobs
+        if excess > 0:
+            for job in sorted(finished, key=lambda job: job.finished)[:excess]:
+                del self._jobs[job.job_id]
+
+    def stats(self) -> Dict[str, int]:
+        "Número de trabajos por estado"
+        with self._lock:
+            counts = {status: 0 for status in (QUEUED, RUNNING) + FINISHED_STATES}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def shutdown(self, wait: bool = True):
+        "Detiene el pool (los trabajos en cola se cancelan)"
+        self._executor.shutdown(wait=wait, cancel_futures=True)
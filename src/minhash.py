@@ -0,0 +1,225 @@
+"""
+minhash.py
+Firmas MinHash y LSH por bandas para detectar casi-duplicados
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Estima la similitud de Jaccard entre conjuntos de n-gramas de palabras
+(los mismos que usa SimilarityMetrics.ngram_similarity) sin comparar los
+conjuntos completos, y agrupa las firmas en cubetas LSH para encontrar
+pares candidatos en tiempo sublineal.
+
+El error estándar de la estimación es sqrt(J(1-J)/k) <= 1/(2·sqrt(k)),
+con k = número de permutaciones de la firma.
+"""
+
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+import numpy as np
+
+from text_preprocessor import TextPreprocessor
+
+
+# Primo mayor que 2^32 para el hashing universal (a·x + b) mod p
+_MERSENNE_PRIME = np.uint64(4294967311)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+
+class MinHasher:
+    "Genera firmas MinHash a partir de shingles de palabras"
+
+    def __init__(self, num_perm: int = 128, ngram_size: int = 3, seed: int = 1,
+                 preprocessor: TextPreprocessor = None):
+        """
+            num_perm: Tamaño de la firma (más permutaciones = más precisión
+                y más memoria, 4 bytes por permutación)
+            ngram_size: Tamaño de los n-gramas de palabras
+            seed: Semilla de las permutaciones (firmas comparables solo
+                con la misma semilla y tamaño)
+            preprocessor: Preprocesador usado para tokenizar textos
+        """
+        self.num_perm = num_perm
+        self.ngram_size = ngram_size
+        self.preprocessor = preprocessor or TextPreprocessor()
+
+        # a, b < 2^31 para que a·x + b no desborde uint64 con x < 2^32
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 2 ** 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, 2 ** 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature_from_hashes(self, shingle_hashes: Iterable[int]) -> np.ndarray:
+        """
+        Calcula la firma MinHash de un conjunto de shingles ya hasheados.
+
+        Args:
+            shingle_hashes: Hashes enteros de los n-gramas
+
+        Returns:
+            Vector uint32 de longitud num_perm
+        """
+        hashes = np.fromiter(shingle_hashes, dtype=np.uint64)
+        if hashes.size == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+
+        hashes = (hashes & _MAX_HASH)[:, None]
+        permuted = (hashes * self._a[None, :] + self._b[None, :]) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=0).astype(np.uint32)
+
+    def signature_from_tokens(self, tokens: List[str]) -> np.ndarray:
+        """
+        Firma MinHash de los n-gramas de una lista de tokens.
+        """
+        return self.signature_from_hashes(
+            self.preprocessor.get_shingle_hashes(tokens, self.ngram_size))
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Firma MinHash de un texto (normalizado y tokenizado como en el detector).
+        """
+        clean_text = self.preprocessor.normalize_text(text)
+        return self.signature_from_tokens(self.preprocessor.tokenize_words(clean_text))
+
+    @staticmethod
+    def is_empty(signature: np.ndarray) -> bool:
+        """
+        Indica si la firma corresponde a un conjunto sin shingles (textos
+        con menos de ngram_size tokens): todas sus posiciones valen _MAX_HASH.
+        """
+        return bool(np.all(signature == _MAX_HASH))
+
+    @staticmethod
+    def estimate_jaccard(signature1: np.ndarray, signature2: np.ndarray) -> float:
+        """
+        Estima la similitud de Jaccard como la fracción de mínimos iguales.
+        Un conjunto vacío no se parece a ninguno (como en ngram_similarity).
+
+        Returns:
+            Estimación de Jaccard [0, 1]
+        """
+        if MinHasher.is_empty(signature1) or MinHasher.is_empty(signature2):
+            return 0.0
+        return float(np.mean(signature1 == signature2))
+
+    @staticmethod
+    def estimate_jaccard_many(signature: np.ndarray, signatures: np.ndarray) -> np.ndarray:
+        """
+        Jaccard estimado entre una firma y cada fila de una matriz de firmas.
+
+        Returns:
+            Vector de estimaciones [0, 1] (0 para las firmas vacías)
+        """
+        if len(signatures) == 0 or MinHasher.is_empty(signature):
+            return np.zeros(len(signatures), dtype=np.float32)
+        estimates = (signatures == signature).mean(axis=1).astype(np.float32)
+        estimates[np.all(signatures == _MAX_HASH, axis=1)] = 0.0
+        return estimates
+
+
+class LSHIndex:
+    "Índice LSH por bandas sobre firmas MinHash"
+
+    def __init__(self, threshold: float = 0.5, num_perm: int = 128):
+        """
+            threshold: Jaccard estimado a partir del cual un par es candidato
+            num_perm: Tamaño de las firmas que se insertarán
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = self.optimal_bands(threshold, num_perm)
+
+        self._buckets = [defaultdict(list) for _ in range(self.bands)]
+        self._signatures = {}
+
+    @staticmethod
+    def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+        """
+        Elige bandas b y filas r (b·r <= num_perm) cuyo punto de inflexión
+        (1/b)^(1/r) queda más cerca del umbral.
+        """
+        best = (1, num_perm)
+        best_error = float('inf')
+
+        for rows in range(1, num_perm + 1):
+            bands = num_perm // rows
+            error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+            if error < best_error:
+                best_error = error
+                best = (bands, rows)
+
+        return best
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes()
+                for band in range(self.bands)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def insert(self, key: Hashable, signature: np.ndarray):
+        """
+        Inserta una firma en las cubetas de cada banda. Las firmas vacías
+        se registran pero no entran en las cubetas: coincidirían en todas
+        las bandas con cualquier otra firma vacía.
+        """
+        if len(signature) != self.num_perm:
+            raise ValueError(
+                f"La firma debe tener {self.num_perm} permutaciones")
+
+        self._signatures[key] = signature
+        if MinHasher.is_empty(signature):
+            return
+        for band, band_key in enumerate(self._band_keys(signature)):
+            self._buckets[band][band_key].append(key)
+
+    def query(self, signature: np.ndarray, filter_by_estimate: bool = True) -> List[Tuple[Hashable, float]]:
+        """
+        Busca las firmas que comparten al menos una cubeta con la consulta.
+
+        Args:
+            signature: Firma de la consulta
+            filter_by_estimate: Descartar candidatos con Jaccard estimado
+                menor que el umbral
+
+        Returns:
+            Lista de (clave, Jaccard estimado) ordenada de mayor a menor
+        """
+        if MinHasher.is_empty(signature):
+            return []
+
+        candidates: Set[Hashable] = set()
+        for band, band_key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(band_key, ()))
+
+        results = []
+        for key in candidates:
+            estimate = MinHasher.estimate_jaccard(signature, self._signatures[key])
+            if not filter_by_estimate or estimate >= self.threshold:
+                results.append((key, estimate))
+
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results
+
+    def candidate_pairs(self, filter_by_estimate: bool = True) -> Dict[Tuple[Hashable, Hashable], float]:
+        """
+        Todos los pares de claves que comparten alguna cubeta
+        (las firmas vacías no están en ninguna).
+
+        Returns:
+            Diccionario (clave1, clave2) -> Jaccard estimado
+        """
+        pairs = {}
+        for buckets in self._buckets:
+            for keys in buckets.values():
+                for i in range(len(keys)):
+                    for j in range(i + 1, len(keys)):
+                        pair = (keys[i], keys[j])
+                        if pair in pairs:
+                            continue
+                        estimate = MinHasher.estimate_jaccard(
+                            self._signatures[keys[i]], self._signatures[keys[j]])
+                        if not filter_by_estimate or estimate >= self.threshold:
+                            pairs[pair] = estimate
+
+        return pairs
@@ -14,23 +14,101 @@ import pandas as pd
 from typing import List, Dict, Tuple, Optional
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
+import hashlib
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 
 from plagiarism_detector import PlagiarismDetector
+from embedding_cache import EmbeddingCache
+from pair_dataset import PairDataset, is_pair_dataset
+from profiling import TimingStats
+
+
+# Orden de las columnas de la matriz de componentes
+COMPONENTS = ('semantic', 'lexical', 'structural', 'sequence')
+
+
+# Detector de cada proceso del pool (se carga una sola vez por worker)
+_worker_detector = None
+
+
+def _init_worker(detector_config: Dict):
+    "Inicializa el detector (modelo y recursos de NLTK) en un proceso worker"
+    global _worker_detector
+
+    config = dict(detector_config)
+    cache_dir = config.pop('embedding_cache_dir', None)
+    if cache_dir:
+        config['embedding_cache'] = EmbeddingCache(cache_dir=cache_dir)
+
+    _worker_detector = PlagiarismDetector(**config, timing_stats=TimingStats())
+
+
+def _score_pairs(detector: PlagiarismDetector, pairs: List[Tuple[str, str]],
+                 batch_size: int) -> List[Optional[List[float]]]:
+    """
+    Scores por componente de una lista de pares, en lotes de batch_size.
+    Los pares con error devuelven None.
+    """
+    rows = []
+    for start in range(0, len(pairs), batch_size):
+        # La búsqueda de pesos necesita todos los componentes (sin cascada)
+        batch_results = detector.compare_many(
+            pairs[start:start + batch_size], batch_size=batch_size, cascade=False)
+
+        for result in batch_results:
+            if 'error' in result:
+                rows.append(None)
+                continue
+
+            analysis = result['details']
+            rows.append([analysis[name]['score'] for name in COMPONENTS])
+
+    return rows
+
+
+def _score_shard(args: Tuple[List[Tuple[str, str]], int]) -> Tuple[List[Optional[List[float]]], Dict]:
+    "Procesa un fragmento del dataset en un worker; devuelve también sus tiempos por etapa"
+    pairs, batch_size = args
+    rows = _score_pairs(_worker_detector, pairs, batch_size)
+
+    timings = _worker_detector.timing_stats.as_dict()
+    _worker_detector.timing_stats.reset()
+    return rows, timings
 
 
 class PlagiarismModelTrainer:
 
-    def __init__(self, detector: Optional[PlagiarismDetector] = None):
+    def __init__(self, detector: Optional[PlagiarismDetector] = None,
+                 cache_dir: Optional[str] = None):
+        """
+            detector: Detector a entrenar
+            cache_dir: Directorio donde persistir las matrices de componentes
+        """
         self.detector = detector or PlagiarismDetector()
         self.training_results = []
+        self.cache_dir = cache_dir
+        self._component_cache = {}
 
-    def load_dataset(self, dataset_path: str) -> pd.DataFrame:
+        # Tiempos por etapa de todos los análisis del entrenamiento
+        # (incluidos los de los procesos worker)
+        if self.detector.timing_stats is None:
+            self.detector.timing_stats = TimingStats()
+        self.timing_stats = self.detector.timing_stats
 
+    def load_dataset(self, dataset_path: str) -> pd.DataFrame:
+        """
+        Carga un dataset en CSV o en formato columnar (directorio .pairs,
+        ver pair_dataset.py). En formato columnar los textos repetidos se
+        leen una vez y el DataFrame incluye doc1_key y doc2_key.
+        """
         try:
-            df = pd.read_csv(dataset_path)
+            if is_pair_dataset(dataset_path):
+                df = PairDataset(dataset_path).to_dataframe()
+            else:
+                df = pd.read_csv(dataset_path)
             required_columns = ['text1', 'text2', 'is_plagiarism']
 
             if not all(col in df.columns for col in required_columns):
@@ -46,25 +124,202 @@ class PlagiarismModelTrainer:
         except Exception as e:
             raise Exception(f"Error al cargar el dataset: {str(e)}")
 
-    def evaluate_on_dataset(self, df: pd.DataFrame, threshold: float = 0.5) -> Dict:
+    def _dataset_fingerprint(self, df: pd.DataFrame) -> str:
+        """
+        Huella del dataset (pares y etiquetas) y de la configuración del
+        detector que afecta a los scores por componente (no depende de los pesos).
+        """
+        # Con formato columnar basta con las claves de contenido de los documentos;
+        # las etiquetas se guardan junto a los componentes, así que también cuentan
+        key_columns = ['doc1_key', 'doc2_key'] if 'doc1_key' in df.columns else ['text1', 'text2']
+        key_columns = key_columns + ['is_plagiarism']
+        row_hashes = pd.util.hash_pandas_object(
+            df[key_columns], index=False).values
+        digest = hashlib.sha1(row_hashes.tobytes())
+        digest.update(str(self.detector.language).encode('utf-8'))
+        digest.update(str(getattr(self.detector, 'model_name', '')).encode('utf-8'))
+        digest.update(str(getattr(self.detector, 'embedding_backend', 'torch')).encode('utf-8'))
+        if getattr(self.detector, 'chunked_encoding', False):
+            digest.update(f"chunks:{self.detector.chunk_size}:{self.detector.chunk_stride}:"
+                          f"{self.detector.chunk_pooling}".encode('utf-8'))
+        digest.update(str(getattr(self.detector.metrics_calculator,
+                                  'sequence_engine', '')).encode('utf-8'))
+        tfidf_path = getattr(self.detector.metrics_calculator, 'tfidf_model_path', None)
+        if tfidf_path and os.path.exists(tfidf_path):
+            digest.update(f"{tfidf_path}:{os.path.getmtime(tfidf_path)}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def compute_component_scores(self, df: pd.DataFrame, batch_size: int = 64,
+                                 n_jobs: int = 1) -> Dict:
+        """
+        Calcula una sola vez los scores por categoría de cada par.
+
+        El score final del detector es una suma ponderada de los scores
+        semántico, léxico, estructural y de secuencia, así que basta con
+        guardar esa matriz para evaluar cualquier combinación de pesos y
+        umbrales sin volver a ejecutar el detector.
+
+        Args:
+            df: Dataset con columnas text1, text2 e is_plagiarism
+            batch_size: Pares por lote para compare_many
+            n_jobs: Procesos para calcular los scores (-1 = todos los núcleos)
+
+        Returns:
+            Diccionario con 'components' (N x 4) y 'labels' (N,)
+        """
+        fingerprint = self._dataset_fingerprint(df)
+
+        if fingerprint in self._component_cache:
+            return self._component_cache[fingerprint]
+
+        cache_file = None
+        if self.cache_dir:
+            cache_file = os.path.join(
+                self.cache_dir, f"components_{fingerprint}.npz")
+            if os.path.exists(cache_file):
+                data = np.load(cache_file)
+                cached = {
+                    'components': data['components'],
+                    'labels': data['labels']
+                }
+                self._component_cache[fingerprint] = cached
+                print(f" Componentes cargados desde {cache_file}")
+                return cached
+
+        components = []
+        labels = []
+
+        print("Calculando scores por componente")
+        pairs = list(zip(df['text1'], df['text2']))
+        row_labels = df['is_plagiarism'].tolist()
+
+        for rows, shard_labels in self._iter_component_rows(pairs, row_labels, batch_size, n_jobs):
+            for row, label in zip(rows, shard_labels):
+                if row is None:
+                    continue
+
+                components.append(row)
+                labels.append(int(label))
+
+        cached = {
+            'components': np.asarray(components, dtype=np.float64).reshape(-1, len(COMPONENTS)),
+            'labels': np.asarray(labels, dtype=np.int64)
+        }
 
-        predictions = []
-        true_labels = []
-        scores = []
+        if cache_file:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            np.savez(cache_file, **cached)
 
-        print("Evaluando en el dataset")
-        for idx, row in tqdm(df.iterrows(), total=len(df)):
-            result = self.detector.compare_texts(row['text1'], row['text2'])
+        self._component_cache[fingerprint] = cached
+        return cached
 
-            if 'error' in result:
-                continue
+    def _detector_config(self) -> Dict:
+        "Parámetros para reconstruir el detector en los procesos worker"
+        metrics = self.detector.metrics_calculator
+        embedding_cache = getattr(self.detector, 'embedding_cache', None)
 
-            score = result['final_score']
-            prediction = 1 if score >= threshold else 0
+        return {
+            'language': self.detector.language,
+            'model_name': self.detector.model_name,
+            'embedding_backend': getattr(self.detector, 'embedding_backend', 'torch'),
+            'onnx_model_dir': getattr(self.detector, 'onnx_model_dir', None),
+            'chunked_encoding': getattr(self.detector, 'chunked_encoding', False),
+            'chunk_size': getattr(self.detector, 'chunk_size', 80),
+            'chunk_stride': getattr(self.detector, 'chunk_stride', 60),
+            'chunk_pooling': getattr(self.detector, 'chunk_pooling', 'mean'),
+            'custom_weights': dict(self.detector.weights),
+            'tfidf_model_path': getattr(metrics, 'tfidf_model_path', None),
+            'sequence_engine': getattr(metrics, 'sequence_engine', 'difflib'),
+            'embedding_cache_dir': embedding_cache.cache_dir if embedding_cache else None,
+        }
 
-            predictions.append(prediction)
-            true_labels.append(int(row['is_plagiarism']))
-            scores.append(score)
+    def _iter_component_rows(self, pairs: List[Tuple[str, str]], labels: List,
+                             batch_size: int, n_jobs: int):
+        """
+        Genera (filas de componentes, etiquetas) en el orden del dataset.
+
+        Con n_jobs > 1 el dataset se divide en fragmentos de tamaño múltiplo
+        de batch_size, de modo que cada worker procesa exactamente los mismos
+        lotes que el camino serial y los resultados son idénticos.
+        """
+        if n_jobs is not None and n_jobs < 0:
+            n_jobs = os.cpu_count() or 1
+
+        if not n_jobs or n_jobs <= 1 or len(pairs) <= batch_size:
+            for start in tqdm(range(0, len(pairs), batch_size)):
+                yield (_score_pairs(self.detector, pairs[start:start + batch_size], batch_size),
+                       labels[start:start + batch_size])
+            return
+
+        # Fragmentos de varios lotes para amortizar la comunicación
+        batches = -(-len(pairs) // batch_size)
+        batches_per_shard = max(1, batches // (n_jobs * 4))
+        shard_size = batches_per_shard * batch_size
+        starts = range(0, len(pairs), shard_size)
+
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(self._detector_config(),)) as executor:
+            shards = ((pairs[start:start + shard_size], batch_size) for start in starts)
+            for start, (rows, timings) in tqdm(zip(starts, executor.map(_score_shard, shards)),
+                                               total=len(starts)):
+                self.timing_stats.merge(timings)
+                yield rows, labels[start:start + shard_size]
+
+    @staticmethod
+    def _combine_components(components: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        Suma ponderada de los componentes en el mismo orden que el detector.
+
+        Args:
+            components: Matriz (N x 4) de scores por categoría
+            weights: Vector (4,) o matriz (K x 4) de pesos
+
+        Returns:
+            Scores finales (N,) o (N x K)
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.ndim == 1:
+            scores = components[:, 0] * weights[0]
+            for col in range(1, len(COMPONENTS)):
+                scores = scores + components[:, col] * weights[col]
+            return scores
+
+        scores = components[:, 0:1] * weights[None, :, 0]
+        for col in range(1, len(COMPONENTS)):
+            scores = scores + components[:, col:col + 1] * weights[None, :, col]
+        return scores
+
+    @staticmethod
+    def _vectorized_metrics(true_labels: np.ndarray, predictions: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Accuracy, precision, recall y F1 para varias columnas de
+        predicciones a la vez (misma convención zero_division=0 que sklearn).
+        """
+        y = true_labels.astype(bool)[:, None]
+        pred = predictions.astype(bool)
+
+        tp = np.sum(pred & y, axis=0).astype(np.float64)
+        fp = np.sum(pred & ~y, axis=0).astype(np.float64)
+        fn = np.sum(~pred & y, axis=0).astype(np.float64)
+        tn = np.sum(~pred & ~y, axis=0).astype(np.float64)
+        total = max(len(true_labels), 1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+            recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+            f1 = np.where(2 * tp + fp + fn > 0,
+                          2 * tp / (2 * tp + fp + fn), 0.0)
+
+        return {
+            'accuracy': (tp + tn) / total,
+            'precision': precision,
+            'recall': recall,
+            'f1_score': f1
+        }
+
+    def _metrics_from_scores(self, true_labels: List[int], scores: List[float],
+                             threshold: float) -> Dict:
+        predictions = [1 if score >= threshold else 0 for score in scores]
 
         # Calculo de métricas
         accuracy = accuracy_score(true_labels, predictions)
@@ -85,7 +340,23 @@ class PlagiarismModelTrainer:
             'threshold_used': threshold
         }
 
-    def optimize_threshold(self, df: pd.DataFrame, metric: str = 'f1_score') -> Tuple[float, Dict]:
+    def _weights_vector(self, weights: Dict[str, float]) -> np.ndarray:
+        return np.array([weights[name] for name in COMPONENTS], dtype=np.float64)
+
+    def evaluate_on_dataset(self, df: pd.DataFrame, threshold: float = 0.5,
+                            n_jobs: int = 1) -> Dict:
+
+        print("Evaluando en el dataset")
+        cached = self.compute_component_scores(df, n_jobs=n_jobs)
+
+        scores = self._combine_components(
+            cached['components'], self._weights_vector(self.detector.weights))
+
+        return self._metrics_from_scores(
+            cached['labels'].tolist(), scores.tolist(), threshold)
+
+    def optimize_threshold(self, df: pd.DataFrame, metric: str = 'f1_score',
+                           n_jobs: int = 1) -> Tuple[float, Dict]:
         thresholds = np.arange(0.1, 1.0, 0.05)
         best_threshold = 0.5
         best_score = 0.0
@@ -93,14 +364,21 @@ class PlagiarismModelTrainer:
 
         print(f"Optimizando umbral basado en {metric}")
 
-        for threshold in tqdm(thresholds):
-            metrics = self.evaluate_on_dataset(df, threshold=threshold)
-            current_score = metrics[metric]
+        cached = self.compute_component_scores(df, n_jobs=n_jobs)
+        scores = self._combine_components(
+            cached['components'], self._weights_vector(self.detector.weights))
+
+        # Todas las predicciones (N x T) en una sola operación
+        predictions = scores[:, None] >= thresholds[None, :]
+        all_metrics = self._vectorized_metrics(cached['labels'], predictions)
+        metric_values = all_metrics[metric]
 
-            if current_score > best_score:
-                best_score = current_score
-                best_threshold = threshold
-                best_metrics = metrics
+        best_idx = int(np.argmax(metric_values))
+        if metric_values[best_idx] > best_score:
+            best_score = float(metric_values[best_idx])
+            best_threshold = thresholds[best_idx]
+            best_metrics = self._metrics_from_scores(
+                cached['labels'].tolist(), scores.tolist(), best_threshold)
 
         print(f"\n Mejor umbral encontrado: {best_threshold:.2f}")
         print(f"  {metric}: {best_score:.4f}")
@@ -108,7 +386,8 @@ class PlagiarismModelTrainer:
         return best_threshold, best_metrics
 
     def grid_search_weights(self, df: pd.DataFrame,
-                            weight_ranges: Optional[Dict[str, List[float]]] = None) -> Dict:
+                            weight_ranges: Optional[Dict[str, List[float]]] = None,
+                            n_jobs: int = 1) -> Dict:
 
         if weight_ranges is None:
             weight_ranges = {
@@ -118,9 +397,6 @@ class PlagiarismModelTrainer:
                 'sequence': [0.05, 0.1, 0.15]
             }
 
-        best_f1 = 0.0
-        best_weights = None
-
         print("Realizando búsqueda de mejores pesos")
 
         from itertools import product
@@ -132,26 +408,24 @@ class PlagiarismModelTrainer:
             weight_ranges['sequence']
         ))
 
-        for sem, lex, struc, seq in tqdm(combinations):
-            # Normalizar para que sumen 1
+        # Normalizar para que sumen 1
+        weight_matrix = []
+        for sem, lex, struc, seq in combinations:
             total = sem + lex + struc + seq
-            weights = {
-                'semantic': sem / total,
-                'lexical': lex / total,
-                'structural': struc / total,
-                'sequence': seq / total
-            }
-
-            # Actualizar pesos del detector
-            self.detector.weights = weights
+            weight_matrix.append(
+                [sem / total, lex / total, struc / total, seq / total])
+        weight_matrix = np.array(weight_matrix, dtype=np.float64)
 
-            # Evaluar
-            metrics = self.evaluate_on_dataset(df, threshold=0.5)
-            f1 = metrics['f1_score']
+        # Evaluar todas las combinaciones sobre la matriz de componentes
+        cached = self.compute_component_scores(df, n_jobs=n_jobs)
+        scores = self._combine_components(cached['components'], weight_matrix)
+        f1_values = self._vectorized_metrics(
+            cached['labels'], scores >= 0.5)['f1_score']
 
-            if f1 > best_f1:
-                best_f1 = f1
-                best_weights = weights.copy()
+        best_idx = int(np.argmax(f1_values))
+        best_f1 = float(f1_values[best_idx])
+        best_weights = {name: float(weight_matrix[best_idx, col])
+                        for col, name in enumerate(COMPONENTS)}
 
         print(f"\n Mejores pesos encontrados (F1: {best_f1:.4f}):")
         for key, value in best_weights.items():
@@ -160,7 +434,12 @@ class PlagiarismModelTrainer:
         return best_weights
 
     def train(self, dataset_path: str, optimize_weights: bool = True,
-              optimize_threshold: bool = True, test_size: float = 0.2) -> Dict:
+              optimize_threshold: bool = True, test_size: float = 0.2,
+              n_jobs: int = 1, timings_path: Optional[str] = None) -> Dict:
+        """
+        Optimiza pesos y umbral y evalúa en test.
+        timings_path guarda en JSON los tiempos por etapa acumulados.
+        """
 
         # Cargar datos
         df = self.load_dataset(dataset_path)
@@ -180,7 +459,7 @@ class PlagiarismModelTrainer:
             print("\n" + "="*70)
             print("Fase 1: optimización de pesos")
             print("="*70)
-            best_weights = self.grid_search_weights(train_df)
+            best_weights = self.grid_search_weights(train_df, n_jobs=n_jobs)
             self.detector.weights = best_weights
             results['optimized_weights'] = best_weights
         else:
@@ -191,7 +470,7 @@ class PlagiarismModelTrainer:
             print("Fase 2: optimización de umbral")
             print("="*70)
             best_threshold, _ = self.optimize_threshold(
-                train_df, metric='f1_score')
+                train_df, metric='f1_score', n_jobs=n_jobs)
             self.detector.thresholds['moderate_plagiarism'] = best_threshold
             results['optimized_threshold'] = best_threshold
         else:
@@ -203,7 +482,8 @@ class PlagiarismModelTrainer:
         print("="*70)
         test_metrics = self.evaluate_on_dataset(
             test_df,
-            threshold=results['optimized_threshold']
+            threshold=results['optimized_threshold'],
+            n_jobs=n_jobs
         )
 
         results['test_metrics'] = {
@@ -214,6 +494,10 @@ class PlagiarismModelTrainer:
             'confusion_matrix': test_metrics['confusion_matrix'].tolist()
         }
 
+        results['timings'] = self.timing_stats.summary()
+        if timings_path:
+            self.timing_stats.write_json(timings_path)
+
         self.print_training_results(results)
 
         return results
@@ -260,4 +544,10 @@ class PlagiarismModelTrainer:
 
         print(f"\n Umbral optimizado: {results['optimized_threshold']:.3f}")
 
+        if results.get('timings'):
+            print("\n Tiempo por etapa (análisis del dataset):")
+            for row in results['timings'][:8]:
+                print(f"  {row['stage']:20s}: {row['wall_ms'] / 1000:8.2f} s "
+                      f"({row['share']:.1%}, CPU {row['cpu_ms'] / 1000:.2f} s)")
+
         print("\n" + "="*70 + "\n")
@@ -0,0 +1,255 @@
+"""
+pair_dataset.py
+Formato columnar y memory-mapped para datasets de pares de textos
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Un dataset es un directorio <nombre>.pairs con:
+- texts.bin: textos de los documentos (UTF-8), cada uno una sola vez
+- offsets.npy: posición en bytes de cada documento en texts.bin (N + 1)
+- doc_keys.npy: hash de 64 bits del contenido de cada documento
+- pairs.npy: tabla de pares (doc1, doc2, is_plagiarism, plagiarism_type)
+- meta.json: versión, conteos y vocabulario de plagiarism_type
+
+Los archivos se abren con memory-mapping: solo se leen de disco los
+textos que se usan, y un documento repetido en muchos pares ocupa el
+espacio de uno. doc_keys identifica el mismo documento en datasets
+distintos, por lo que sirve como clave de caché de features.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+
+PAIR_DTYPE = np.dtype([
+    ('doc1', np.int64),
+    ('doc2', np.int64),
+    ('is_plagiarism', np.bool_),
+    ('plagiarism_type', np.int32),
+])
+
+
+def document_key(text: str) -> int:
+    "Hash de 64 bits del contenido de un documento"
+    return int.from_bytes(hashlib.blake2b(
+        text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def is_pair_dataset(path: str) -> bool:
+    "Indica si una ruta es un dataset en formato columnar"
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, 'meta.json'))
+
+
+class PairDatasetWriter:
+    "Escribe un dataset de pares en streaming, deduplicando documentos"
+
+    def __init__(self, path: str):
+        """
+            path: Directorio destino (se sobrescribe al cerrar)
+        """
+        self.path = path
+        # Se escribe en un directorio temporal junto al destino: un dataset
+        # existente solo se reemplaza cuando la escritura termina bien
+        self._tmp_path = f"{os.path.normpath(path)}.tmp-{os.getpid()}"
+        if os.path.exists(self._tmp_path):
+            shutil.rmtree(self._tmp_path)
+        os.makedirs(self._tmp_path)
+
+        self._texts = open(os.path.join(self._tmp_path, 'texts.bin'), 'wb')
+        self._offsets = [0]
+        self._keys = []
+        self._doc_index: Dict[int, int] = {}
+        self._pairs = []
+        self._types: Dict[str, int] = {}
+
+    def __enter__(self) -> 'PairDatasetWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add_document(self, text: str) -> int:
+        """
+        Agrega un documento si no existe y devuelve su índice.
+        """
+        key = document_key(text)
+        index = self._doc_index.get(key)
+        if index is not None:
+            return index
+
+        data = text.encode('utf-8')
+        self._texts.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+        self._keys.append(key)
+
+        index = len(self._keys) - 1
+        self._doc_index[key] = index
+        return index
+
+    def add_pair(self, text1: str, text2: str, is_plagiarism: bool,
+                 plagiarism_type: Optional[str] = None):
+        """
+        Agrega un par de textos (los textos repetidos se guardan una vez).
+        """
+        plagiarism_type = '' if plagiarism_type is None or pd.isna(plagiarism_type) \
+            else str(plagiarism_type)
+        type_index = self._types.setdefault(plagiarism_type, len(self._types))
+        self._pairs.append((self.add_document(text1), self.add_document(text2),
+                            bool(is_plagiarism), type_index))
+
+    def add_dataframe(self, df: pd.DataFrame):
+        "Agrega todas las filas de un DataFrame con text1, text2, is_plagiarism"
+        types = df['plagiarism_type'] if 'plagiarism_type' in df.columns else [None] * len(df)
+        for text1, text2, label, ptype in zip(df['text1'], df['text2'],
+                                              df['is_plagiarism'], types):
+            self.add_pair(str(text1), str(text2), label, ptype)
+
+    def close(self, shuffle_seed: Optional[int] = None):
+        """
+        Escribe la tabla de pares, los offsets y los metadatos y mueve
+        el dataset a su destino.
+
+        Args:
+            shuffle_seed: Si se indica, mezcla el orden de los pares
+        """
+        if self._texts.closed:
+            return
+        self._texts.close()
+
+        pairs = np.array(self._pairs, dtype=PAIR_DTYPE)
+        if shuffle_seed is not None:
+            pairs = pairs[np.random.RandomState(shuffle_seed).permutation(len(pairs))]
+
+        try:
+            np.save(os.path.join(self._tmp_path, 'offsets.npy'),
+                    np.array(self._offsets, dtype=np.int64))
+            np.save(os.path.join(self._tmp_path, 'doc_keys.npy'),
+                    np.array(self._keys, dtype=np.uint64))
+            np.save(os.path.join(self._tmp_path, 'pairs.npy'), pairs)
+
+            with open(os.path.join(self._tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': FORMAT_VERSION,
+                    'documents': len(self._keys),
+                    'pairs': len(pairs),
+                    'plagiarism_types': sorted(self._types, key=self._types.get)
+                }, f, ensure_ascii=False, indent=2)
+        except BaseException:
+            shutil.rmtree(self._tmp_path, ignore_errors=True)
+            raise
+
+        # os.replace no sobrescribe directorios con contenido: el anterior
+        # se aparta primero y se borra cuando el nuevo ya está en su lugar
+        previous = None
+        if os.path.exists(self.path):
+            previous = f"{self._tmp_path}.old"
+            os.replace(self.path, previous)
+        os.replace(self._tmp_path, self.path)
+        if previous:
+            shutil.rmtree(previous, ignore_errors=True)
+
+    def abort(self):
+        "Descarta lo escrito sin tocar el destino"
+        if not self._texts.closed:
+            self._texts.close()
+        shutil.rmtree(self._tmp_path, ignore_errors=True)
+
+
+class PairDataset:
+    "Dataset de pares abierto con memory-mapping"
+
+    def __init__(self, path: str):
+        """
+            path: Directorio creado con PairDatasetWriter
+        """
+        if not is_pair_dataset(path):
+            raise FileNotFoundError(f"No es un dataset de pares: {path}")
+
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != FORMAT_VERSION:
+            raise ValueError(f"Versión de dataset no soportada: {self.meta['version']}")
+
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+        self.doc_keys = np.load(os.path.join(path, 'doc_keys.npy'), mmap_mode='r')
+        self.pairs = np.load(os.path.join(path, 'pairs.npy'), mmap_mode='r')
+        self.plagiarism_types = self.meta['plagiarism_types']
+
+        texts_path = os.path.join(path, 'texts.bin')
+        self._blob = np.memmap(texts_path, dtype=np.uint8, mode='r') \
+            if os.path.getsize(texts_path) else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    @property
+    def num_documents(self) -> int:
+        return len(self.doc_keys)
+
+    def document(self, index: int) -> str:
+        "Texto de un documento por índice"
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return self._blob[start:end].tobytes().decode('utf-8')
+
+    def _frame(self, rows: np.ndarray) -> pd.DataFrame:
+        # Cada documento se decodifica una vez: ambas columnas comparten el objeto str
+        cache = {index: self.document(index)
+                 for index in np.unique(np.concatenate([rows['doc1'], rows['doc2']]))}
+
+        return pd.DataFrame({
+            'text1': [cache[index] for index in rows['doc1']],
+            'text2': [cache[index] for index in rows['doc2']],
+            'is_plagiarism': rows['is_plagiarism'].astype(bool),
+            'plagiarism_type': [self.plagiarism_types[t] for t in rows['plagiarism_type']],
+            'doc1_key': self.doc_keys[rows['doc1']],
+            'doc2_key': self.doc_keys[rows['doc2']],
+        })
+
+    def iter_batches(self, batch_size: int = 1000) -> Iterator[pd.DataFrame]:
+        """
+        Recorre el dataset por bloques de pares sin cargarlo completo.
+        """
+        for start in range(0, len(self.pairs), batch_size):
+            yield self._frame(np.asarray(self.pairs[start:start + batch_size]))
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        DataFrame con todos los pares; los documentos repetidos se
+        decodifican una sola vez y comparten memoria.
+        """
+        return self._frame(np.asarray(self.pairs))
+
+    @staticmethod
+    def from_csv(csv_path: str, output_path: str, chunksize: int = 10000,
+                 shuffle_seed: Optional[int] = None) -> 'PairDataset':
+        """
+        Convierte un CSV (text1, text2, is_plagiarism) leyéndolo por bloques.
+        """
+        with PairDatasetWriter(output_path) as writer:
+            for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+                writer.add_dataframe(chunk)
+            writer.close(shuffle_seed=shuffle_seed)
+        return PairDataset(output_path)
+
+
+def iter_dataset_frames(path: str, batch_size: int = 10000) -> Iterator[pd.DataFrame]:
+    """
+    Recorre por bloques un dataset en CSV o en formato columnar.
+    """
+    if is_pair_dataset(path):
+        yield from PairDataset(path).iter_batches(batch_size)
+    else:
+        yield from pd.read_csv(path, chunksize=batch_size)
+
@@ -0,0 +1,308 @@
+"""
+passage_alignment.py
+Localización de pasajes plagiados con offsets de caracteres
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Alinea pasajes entre un documento fuente y uno sospechoso:
+- Semillas: n-gramas de palabras compartidos (tabla hash del fuente)
+- Extensión: agrupa semillas cercanas en ambos documentos (barrido lineal)
+- Oraciones alineadas por embeddings (paráfrasis sin n-gramas comunes)
+- Fusión de pasajes solapados o cercanos en registros
+  (source_span, suspicious_span, score)
+
+Incluye las métricas de PAN (precisión, recall, granularidad y plagdet)
+para evaluar los pasajes contra las anotaciones this_offset/source_offset.
+"""
+
+import math
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Span = Tuple[int, int]
+
+
+def tokenize_with_offsets(text: str) -> List[Tuple[str, int, int]]:
+    """
+    Tokeniza un texto conservando la posición de cada palabra.
+
+    Returns:
+        Lista de (token en minúsculas, inicio, fin) en caracteres del texto original
+    """
+    return [(match.group().lower(), match.start(), match.end())
+            for match in re.finditer(r'\w+', text) if len(match.group()) > 1]
+
+
+def sentence_spans(text: str, sentences: Sequence[str]) -> List[Optional[Span]]:
+    """
+    Ubica cada oración en el texto original, en orden.
+
+    Returns:
+        Lista de (inicio, fin) por oración (None si no se encontró)
+    """
+    spans = []
+    cursor = 0
+    for sentence in sentences:
+        start = text.find(sentence, cursor)
+        if start < 0:
+            start = text.find(sentence)
+        if start < 0:
+            spans.append(None)
+            continue
+        spans.append((start, start + len(sentence)))
+        cursor = start + len(sentence)
+    return spans
+
+
+def _span_gap(span1: Span, span2: Span) -> int:
+    "Caracteres entre dos intervalos (0 si se solapan)"
+    return max(0, max(span1[0], span2[0]) - min(span1[1], span2[1]))
+
+
+class PassageAligner:
+    "Alinea pasajes entre dos documentos por semillas de n-gramas y oraciones"
+
+    def __init__(self, ngram_size: int = 3, max_gap: int = 20, min_seeds: int = 3,
+                 max_postings: int = 50, merge_gap_chars: int = 100):
+        """
+            ngram_size: Tamaño de los n-gramas semilla
+            max_gap: Distancia máxima (en palabras) entre semillas de un pasaje
+            min_seeds: Semillas mínimas para aceptar un pasaje por n-gramas
+            max_postings: Los n-gramas que aparecen más veces en el fuente
+                se ignoran (frases hechas que solo generan ruido)
+            merge_gap_chars: Distancia máxima para fusionar dos pasajes
+        """
+        self.ngram_size = ngram_size
+        self.max_gap = max_gap
+        self.min_seeds = min_seeds
+        self.max_postings = max_postings
+        self.merge_gap_chars = merge_gap_chars
+
+    def seed_matches(self, tokens1: List[str], tokens2: List[str]) -> List[Tuple[int, int]]:
+        """
+        Posiciones (i en el fuente, j en el sospechoso) de n-gramas iguales.
+        """
+        n = self.ngram_size
+        postings = defaultdict(list)
+        for i in range(len(tokens1) - n + 1):
+            postings[tuple(tokens1[i:i + n])].append(i)
+
+        seeds = []
+        for j in range(len(tokens2) - n + 1):
+            positions = postings.get(tuple(tokens2[j:j + n]))
+            if positions and len(positions) <= self.max_postings:
+                seeds.extend((i, j) for i in positions)
+        return seeds
+
+    def extend_seeds(self, seeds: List[Tuple[int, int]]) -> List[Dict]:
+        """
+        Agrupa las semillas en pasajes recorriendo el documento sospechoso.
+
+        Una semilla se une a un pasaje abierto si está a menos de max_gap
+        palabras de él en ambos documentos; los pasajes que quedan atrás
+        se cierran, de modo que el costo es casi lineal en las semillas.
+
+        Returns:
+            Lista de pasajes con intervalos de palabras y score de cobertura
+        """
+        n = self.ngram_size
+        active = []
+        closed = []
+
+        for i, j in sorted(seeds, key=lambda seed: (seed[1], seed[0])):
+            still_active = []
+            for cluster in active:
+                if j - cluster['j_end'] > self.max_gap:
+                    closed.append(cluster)
+                else:
+                    still_active.append(cluster)
+            active = still_active
+
+            for cluster in active:
+                if cluster['i_start'] - self.max_gap <= i <= cluster['i_end'] + self.max_gap:
+                    # Palabras del sospechoso cubiertas por las semillas
+                    cluster['covered'] += max(0, j + n - max(j, cluster['covered_end']))
+                    cluster['covered_end'] = max(cluster['covered_end'], j + n)
+                    cluster['i_start'] = min(cluster['i_start'], i)
+                    cluster['i_end'] = max(cluster['i_end'], i)
+                    cluster['j_end'] = j
+                    cluster['seeds'] += 1
+                    break
+            else:
+                active.append({'i_start': i, 'i_end': i, 'j_start': j, 'j_end': j,
+                               'seeds': 1, 'covered': n, 'covered_end': j + n})
+
+        passages = []
+        for cluster in closed + active:
+            if cluster['seeds'] < self.min_seeds:
+                continue
+            length = cluster['j_end'] + n - cluster['j_start']
+            passages.append({
+                'source_tokens': (cluster['i_start'], cluster['i_end'] + n),
+                'suspicious_tokens': (cluster['j_start'], cluster['j_end'] + n),
+                'score': cluster['covered'] / length
+            })
+        return passages
+
+    def merge(self, passages: List[Dict]) -> List[Dict]:
+        """
+        Fusiona pasajes que se solapan o están a menos de merge_gap_chars
+        caracteres en ambos documentos. El score es el promedio ponderado
+        por la longitud en el sospechoso.
+        """
+        merged = []
+        for passage in sorted(passages, key=lambda p: p['suspicious_span']):
+            last = merged[-1] if merged else None
+            if last is not None and \
+                    _span_gap(last['suspicious_span'], passage['suspicious_span']) <= self.merge_gap_chars and \
+                    _span_gap(last['source_span'], passage['source_span']) <= self.merge_gap_chars:
+                length1 = last['suspicious_span'][1] - last['suspicious_span'][0]
+                length2 = passage['suspicious_span'][1] - passage['suspicious_span'][0]
+                last['score'] = (last['score'] * length1 + passage['score'] * length2) / \
+                    max(length1 + length2, 1)
+                last['source_span'] = (min(last['source_span'][0], passage['source_span'][0]),
+                                       max(last['source_span'][1], passage['source_span'][1]))
+                last['suspicious_span'] = (min(last['suspicious_span'][0], passage['suspicious_span'][0]),
+                                           max(last['suspicious_span'][1], passage['suspicious_span'][1]))
+                last['methods'].update(passage['methods'])
+            else:
+                merged.append({**passage, 'methods': set(passage['methods'])})
+
+        return [{
+            'source_span': passage['source_span'],
+            'suspicious_span': passage['suspicious_span'],
+            'score': float(passage['score']),
+            'method': '+'.join(sorted(passage['methods']))
+        } for passage in merged]
+
+    def align(self, source_text: str, suspicious_text: str,
+              source_sentences: Optional[Sequence[str]] = None,
+              suspicious_sentences: Optional[Sequence[str]] = None,
+              sentence_alignments: Optional[Sequence[Tuple[int, int, float]]] = None) -> List[Dict]:
+        """
+        Localiza los pasajes del fuente reutilizados en el sospechoso.
+
+        Args:
+            source_text: Texto fuente original (los offsets se refieren a él)
+            suspicious_text: Texto sospechoso original
+            source_sentences: Oraciones del fuente (para sentence_alignments)
+            suspicious_sentences: Oraciones del sospechoso
+            sentence_alignments: (índice fuente, índice sospechoso, similitud)
+                de compute_sentence_level_similarity
+
+        Returns:
+            Lista de {'source_span', 'suspicious_span', 'score', 'method'}
+            ordenada por posición en el sospechoso; los spans son
+            (inicio, fin) en caracteres
+        """
+        source_tokens = tokenize_with_offsets(source_text)
+        suspicious_tokens = tokenize_with_offsets(suspicious_text)
+
+        passages = []
+        seeds = self.seed_matches([token for token, _, _ in source_tokens],
+                                  [token for token, _, _ in suspicious_tokens])
+        for passage in self.extend_seeds(seeds):
+            i_start, i_end = passage['source_tokens']
+            j_start, j_end = passage['suspicious_tokens']
+            passages.append({
+                'source_span': (source_tokens[i_start][1], source_tokens[i_end - 1][2]),
+                'suspicious_span': (suspicious_tokens[j_start][1], suspicious_tokens[j_end - 1][2]),
+                'score': passage['score'],
+                'methods': {'ngram'}
+            })
+
+        if sentence_alignments and source_sentences and suspicious_sentences:
+            source_spans = sentence_spans(source_text, source_sentences)
+            suspicious_spans = sentence_spans(suspicious_text, suspicious_sentences)
+            for i, j, similarity in sentence_alignments:
+                if source_spans[i] is None or suspicious_spans[j] is None:
+                    continue
+                passages.append({
+                    'source_span': source_spans[i],
+                    'suspicious_span': suspicious_spans[j],
+                    'score': similarity,
+                    'methods': {'semantic'}
+                })
+
+        return self.merge(passages)
+
+
+def _overlap(span1: Span, span2: Span) -> Optional[Span]:
+    start, end = max(span1[0], span2[0]), min(span1[1], span2[1])
+    return (start, end) if start < end else None
+
+
+def _union_length(spans: List[Span]) -> int:
+    "Caracteres cubiertos por la unión de intervalos"
+    total = 0
+    current_start = current_end = None
+    for start, end in sorted(spans):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def _detects(case: Dict, detection: Dict) -> bool:
+    "Una detección detecta un caso si se solapa con él en ambos documentos"
+    return case.get('pair') == detection.get('pair') and \
+        _overlap(case['suspicious_span'], detection['suspicious_span']) is not None and \
+        _overlap(case['source_span'], detection['source_span']) is not None
+
+
+def _covered_fraction(target: Dict, others: List[Dict]) -> float:
+    "Fracción de caracteres de target (ambos documentos) cubierta por others"
+    length = (target['suspicious_span'][1] - target['suspicious_span'][0]) + \
+        (target['source_span'][1] - target['source_span'][0])
+    if length <= 0:
+        return 0.0
+    covered = _union_length([_overlap(target['suspicious_span'], other['suspicious_span'])
+                             for other in others]) + \
+        _union_length([_overlap(target['source_span'], other['source_span'])
+                       for other in others])
+    return covered / length
+
+
+def pan_metrics(cases: List[Dict], detections: List[Dict]) -> Dict[str, float]:
+    """
+    Métricas de detección de plagio de PAN (Potthast et al., 2010).
+
+    Cada caso (anotación) y cada detección es un diccionario con
+    'source_span' y 'suspicious_span' en caracteres; la clave opcional
+    'pair' identifica el par de documentos cuando se evalúan varios.
+
+    Returns:
+        Diccionario con precision, recall, granularity y plagdet
+    """
+    detected_by = [[detection for detection in detections if _detects(case, detection)]
+                   for case in cases]
+    detecting = [[case for case in cases if _detects(case, detection)]
+                 for detection in detections]
+
+    recall = sum(_covered_fraction(case, found)
+                 for case, found in zip(cases, detected_by)) / len(cases) if cases else 0.0
+    precision = sum(_covered_fraction(detection, found)
+                    for detection, found in zip(detections, detecting)) / len(detections) \
+        if detections else 0.0
+
+    detected_counts = [len(found) for found in detected_by if found]
+    granularity = sum(detected_counts) / len(detected_counts) if detected_counts else 1.0
+
+    f_measure = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    plagdet = f_measure / math.log2(1 + granularity)
+
+    return {
+        'precision': precision,
+        'recall': recall,
+        'granularity': granularity,
+        'plagdet': plagdet,
+        'cases': len(cases),
+        'detections': len(detections)
+    }
@@ -10,19 +10,56 @@ Este módulo implementa el detector principal que combina:
 - Análisis léxico (TF-IDF, Jaccard, n-gramas)
 - Análisis estructural del texto
 - Análisis de secuencias (LCS, SequenceMatcher)
+
+El modelo de Sentence-BERT (y torch) se carga la primera vez que se
+necesita un embedding, o en segundo plano con warm_up. Con
+embedding_backend='onnx' se usa el modelo int8 exportado a models/.
+
+El modelo trunca las entradas largas (128 subpalabras en MiniLM). Con
+chunked_encoding=True los textos largos se dividen en ventanas solapadas
+de palabras que se codifican en un solo lote y se agrupan (promedio o
+máximo) en un vector por documento.
 """
 
 import numpy as np
+import logging
 import os
-from typing import Dict, Tuple, Optional
-from sentence_transformers import SentenceTransformer
+import threading
+import time
+from typing import Callable, Dict, List, Tuple, Optional, Union
 import warnings
 
-from text_preprocessor import TextPreprocessor
+from text_preprocessor import TextPreprocessor, ProcessedDocument, ensure_nltk_resources
 from similarity_metrics import SimilarityMetrics
+from embedding_cache import EmbeddingCache
+from embedding_scheduler import EmbeddingScheduler
+from embedding_backends import EMBEDDING_BACKENDS, OnnxEmbeddingModel, default_onnx_dir
+from passage_alignment import PassageAligner
+from document_loader import load_document
+from profiling import StageTimer, TimingStats
 
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
+# Etapas reportadas por el callback progress de analyze_texts, en orden
+PROGRESS_STAGES = ('preprocess', 'semantic', 'lexical', 'sequence')
+
+# Etapas del modo cascada agrupadas en las etapas de progreso
+CASCADE_PROGRESS_STAGES = {
+    'structural': 'lexical',
+    'lexical_sets': 'lexical',
+    'tfidf': 'lexical',
+    'semantic_overall': 'semantic',
+    'semantic_sentences': 'semantic',
+    'lcs': 'sequence',
+    'sequence_matcher': 'sequence',
+}
+
+
+def _no_progress(stage: str):
+    pass
+
 
 class PlagiarismDetector:
     """
@@ -32,16 +69,64 @@ class PlagiarismDetector:
     def __init__(self,
                  language: str = 'español',
                  model_name: str = 'paraphrase-multilingual-MiniLM-L12-v2',
-                 custom_weights: Optional[Dict[str, float]] = None):
+                 custom_weights: Optional[Dict[str, float]] = None,
+                 embedding_cache: Optional[EmbeddingCache] = None,
+                 tfidf_model_path: Optional[str] = None,
+                 cascade: bool = False,
+                 sequence_engine: str = 'difflib',
+                 micro_batching: bool = False,
+                 warm_up: bool = False,
+                 embedding_backend: str = 'torch',
+                 onnx_model_dir: Optional[str] = None,
+                 chunked_encoding: bool = False,
+                 chunk_size: int = 80,
+                 chunk_stride: int = 60,
+                 chunk_pooling: str = 'mean',
+                 passage_alignment: bool = False,
+                 timing_stats: Optional[TimingStats] = None):
+
+        if embedding_backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Backend de embeddings desconocido: {embedding_backend}")
+        if chunk_pooling not in ('mean', 'max'):
+            raise ValueError(f"Pooling de fragmentos desconocido: {chunk_pooling}")
+        if not 0 < chunk_stride <= chunk_size:
+            raise ValueError("chunk_stride debe estar entre 1 y chunk_size")
 
         self.language = language
+        self.model_name = model_name
+        self.embedding_backend = embedding_backend
+        self.onnx_model_dir = onnx_model_dir or default_onnx_dir(model_name)
         self.preprocessor = TextPreprocessor(language=language)
-        self.metrics_calculator = SimilarityMetrics()
+        self.metrics_calculator = SimilarityMetrics(
+            tfidf_model_path=tfidf_model_path,
+            sequence_engine=sequence_engine)
+
+        # Caché de embeddings compartida entre comparaciones (opcional)
+        self.embedding_cache = embedding_cache
+
+        # El modelo de embeddings se carga al primer uso
+        self._embedding_model = None
+        self._model_lock = threading.Lock()
+        self._warm_up_thread = None
+
+        # Codificación por fragmentos solapados para textos largos:
+        # ventanas de chunk_size palabras que avanzan chunk_stride palabras
+        self.chunked_encoding = chunked_encoding
+        self.chunk_size = chunk_size
+        self.chunk_stride = chunk_stride
+        self.chunk_pooling = chunk_pooling
+
+        # Localización de pasajes (offsets de caracteres) en analyze_texts
+        self.passage_alignment = passage_alignment
+        self.passage_aligner = PassageAligner()
+
+        # Acumulado opcional de los tiempos por etapa de todos los análisis
+        # (cada resultado trae además los suyos en details['timings'])
+        self.timing_stats = timing_stats
 
-        # Cargar modelo de embeddings semánticos
-        print(f"Cargando modelo de embeddings: {model_name}...")
-        self.embedding_model = SentenceTransformer(model_name)
-        print("Modelo cargado exitosamente.")
+        # Planificador de micro-lotes para encode concurrente (opcional)
+        self.embedding_scheduler = EmbeddingScheduler(
+            lambda: self.embedding_model) if micro_batching else None
 
         # Pesos por defecto para cada tipo de métrica
         self.weights = custom_weights or {
@@ -59,12 +144,175 @@ class PlagiarismDetector:
             # <30% = similitud baja/normal
         }
 
-    def compute_semantic_similarity(self, text1: str, text2: str) -> float:
+        # Oraciones del texto 1 por bloque en la alineación de oraciones
+        self.sentence_block_size = 1024
+
+        # Modo cascada: métricas de menor a mayor costo con salida temprana
+        self.cascade = cascade
+
+        if warm_up:
+            self.warm_up()
+
+    @property
+    def embedding_model(self):
+        "Modelo de embeddings semánticos (se carga la primera vez que se usa)"
+        if self._embedding_model is None:
+            with self._model_lock:
+                if self._embedding_model is None:
+                    logger.info("Cargando modelo de embeddings: %s (%s)",
+                                self.model_name, self.embedding_backend)
+                    start = time.perf_counter()
+                    if self.embedding_backend == 'onnx':
+                        self._embedding_model = OnnxEmbeddingModel(self.onnx_model_dir)
+                    else:
+                        from sentence_transformers import SentenceTransformer
+
+                        self._embedding_model = SentenceTransformer(self.model_name)
+                    logger.info("Modelo cargado en %.1f s", time.perf_counter() - start)
+
+        return self._embedding_model
+
+    @embedding_model.setter
+    def embedding_model(self, model):
+        self._embedding_model = model
+
+    @property
+    def embedding_key(self) -> str:
+        "Identificador de los vectores en la caché (modelo y backend)"
+        if self.embedding_backend == 'torch':
+            return self.model_name
+        return f"{self.model_name}@{self.embedding_backend}"
+
+    @property
+    def model_loaded(self) -> bool:
+        return self._embedding_model is not None
+
+    def warm_up(self, background: bool = True):
+        """
+        Carga el modelo y los recursos de NLTK antes de la primera petición.
+
+        Args:
+            background: Cargar en un hilo sin bloquear al llamador
+        """
+        def load():
+            ensure_nltk_resources()
+            self.embedding_model.encode(['calentamiento'], convert_to_tensor=False)
+
+        if not background:
+            load()
+            return
+
+        if self._warm_up_thread is None:
+            self._warm_up_thread = threading.Thread(
+                target=load, name='detector-warm-up', daemon=True)
+            self._warm_up_thread.start()
+
+    def _encode(self, texts: List[str],
+                embedding_lookup: Optional[Dict[str, np.ndarray]] = None,
+                batch_size: int = 32) -> np.ndarray:
+        """
+        Codifica una lista de textos, reutilizando los vectores ya
+        calculados en embedding_lookup o en la caché de embeddings.
+        Los textos restantes se codifican en una sola llamada.
+        """
+        vectors = [None] * len(texts)
+        missing = {}
+
+        # Una sola consulta a la caché para todo el lote
+        cached = {}
+        if self.embedding_cache is not None:
+            cached = self.embedding_cache.get_many(
+                self.embedding_key,
+                [text for text in texts
+                 if embedding_lookup is None or text not in embedding_lookup])
+
+        for i, text in enumerate(texts):
+            if embedding_lookup is not None and text in embedding_lookup:
+                vectors[i] = embedding_lookup[text]
+            elif text in cached:
+                vectors[i] = cached[text]
+            else:
+                missing.setdefault(text, []).append(i)
+
+        if missing:
+            unique_texts = list(missing)
+            encoder = self.embedding_scheduler or self.embedding_model
+            encoded = encoder.encode(
+                unique_texts, batch_size=batch_size, convert_to_tensor=False)
+
+            for text, vector in zip(unique_texts, encoded):
+                for i in missing[text]:
+                    vectors[i] = vector
+
+            if self.embedding_cache is not None:
+                self.embedding_cache.put_many(
+                    self.embedding_key, dict(zip(unique_texts, encoded)))
+
+        return np.array(vectors)
+
+    def split_into_chunks(self, text: str) -> List[str]:
+        """
+        Divide un texto en ventanas solapadas de chunk_size palabras.
+
+        Los textos que caben en una ventana (o con chunked_encoding
+        desactivado) se devuelven completos, sin cambios.
+
+        Returns:
+            Lista de fragmentos; la última ventana termina al final del texto
+        """
+        words = text.split()
+        if not self.chunked_encoding or len(words) <= self.chunk_size:
+            return [text]
+
+        starts = list(range(0, len(words) - self.chunk_size, self.chunk_stride))
+        starts.append(len(words) - self.chunk_size)
+        return [' '.join(words[start:start + self.chunk_size]) for start in starts]
+
+    def encode_chunks(self, text: str,
+                      embedding_lookup: Optional[Dict[str, np.ndarray]] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Fragmentos de un texto y sus embeddings (uno por fila).
+        Los vectores pasan por la caché de embeddings como cualquier texto.
+        """
+        chunks = self.split_into_chunks(text)
+        return chunks, self._encode(chunks, embedding_lookup)
+
+    def _pool_chunks(self, vectors: np.ndarray) -> np.ndarray:
+        "Agrupa los embeddings normalizados de los fragmentos de un documento"
+        vectors = self._normalize_rows(vectors)
+        if self.chunk_pooling == 'max':
+            return vectors.max(axis=0)
+        return vectors.mean(axis=0)
+
+    def _encode_documents(self, texts: List[str],
+                          embedding_lookup: Optional[Dict[str, np.ndarray]] = None,
+                          batch_size: int = 32) -> np.ndarray:
+        """
+        Igual que _encode, pero los textos más largos que una ventana se
+        codifican por fragmentos (todos en un lote) y se agrupan.
+        """
+        if not self.chunked_encoding:
+            return self._encode(texts, embedding_lookup, batch_size)
+
+        chunks = [self.split_into_chunks(text) for text in texts]
+        vectors = self._encode([chunk for text_chunks in chunks for chunk in text_chunks],
+                               embedding_lookup, batch_size)
+
+        pooled = []
+        offset = 0
+        for text_chunks in chunks:
+            if len(text_chunks) == 1:
+                pooled.append(vectors[offset])
+            else:
+                pooled.append(self._pool_chunks(vectors[offset:offset + len(text_chunks)]))
+            offset += len(text_chunks)
+
+        return np.array(pooled)
+
+    def compute_semantic_similarity(self, text1: str, text2: str,
+                                    embedding_lookup: Optional[Dict[str, np.ndarray]] = None) -> float:
         # Generar embeddings
-        embedding1 = self.embedding_model.encode(
-            text1, convert_to_tensor=False)
-        embedding2 = self.embedding_model.encode(
-            text2, convert_to_tensor=False)
+        embedding1, embedding2 = self._encode_documents([text1, text2], embedding_lookup)
 
         # Calcular similitud coseno
         similarity = np.dot(embedding1, embedding2) / (
@@ -73,77 +321,155 @@ class PlagiarismDetector:
 
         return float(similarity)
 
-    def compute_sentence_level_similarity(self, sentences1: list, sentences2: list) -> Dict[str, float]:
+    def compute_sentence_level_similarity(self, sentences1: list, sentences2: list,
+                                          embedding_lookup: Optional[Dict[str, np.ndarray]] = None,
+                                          block_size: Optional[int] = None) -> Dict[str, float]:
         """
         Calcula similitud a nivel de oraciones.
+
+        Normaliza los embeddings y obtiene la matriz de similitud coseno con
+        un producto matricial. Con block_size las oraciones del primer texto
+        se procesan por bloques, de modo que la memoria máxima es
+        block_size x len(sentences2) en lugar de la matriz completa.
+
+        Returns:
+            Diccionario con promedios, conteo de coincidencias y
+            'alignments': lista de (índice en sentences1, índice en
+            sentences2, similitud) para las oraciones coincidentes
         """
         if not sentences1 or not sentences2:
-            return {'avg_similarity': 0.0, 'max_similarity': 0.0, 'matched_sentences': 0}
+            return {'avg_similarity': 0.0, 'max_similarity': 0.0, 'matched_sentences': 0,
+                    'match_ratio': 0.0, 'alignments': []}
 
         # Generar embeddings para todas las oraciones
-        embeddings1 = self.embedding_model.encode(
-            sentences1, convert_to_tensor=False)
-        embeddings2 = self.embedding_model.encode(
-            sentences2, convert_to_tensor=False)
-
-        # Calcular matriz de similitud
-        similarities = []
-        matched_count = 0
-
-        for emb1 in embeddings1:
-            max_sim = 0.0
-            for emb2 in embeddings2:
-                sim = np.dot(emb1, emb2) / \
-                    (np.linalg.norm(emb1) * np.linalg.norm(emb2))
-                max_sim = max(max_sim, sim)
-
-            similarities.append(max_sim)
-            if max_sim > 0.7:  # Umbral para considerar oraciones coincidentes
-                matched_count += 1
+        embeddings1 = self._normalize_rows(
+            self._encode_documents(sentences1, embedding_lookup))
+        embeddings2 = self._normalize_rows(
+            self._encode_documents(sentences2, embedding_lookup))
+
+        block_size = block_size or self.sentence_block_size or len(embeddings1)
+
+        # Mejor coincidencia de cada oración del texto 1, bloque por bloque
+        best_similarity = np.empty(len(embeddings1), dtype=np.float64)
+        best_index = np.empty(len(embeddings1), dtype=np.int64)
+
+        for start in range(0, len(embeddings1), block_size):
+            block = embeddings1[start:start + block_size] @ embeddings2.T
+            best_index[start:start + block_size] = np.argmax(block, axis=1)
+            best_similarity[start:start + block_size] = np.max(block, axis=1)
+
+        # Las similitudes negativas cuentan como 0
+        similarities = np.maximum(best_similarity, 0.0)
+
+        # Umbral para considerar oraciones coincidentes
+        matched = np.flatnonzero(similarities > 0.7)
+        alignments = [(int(i), int(best_index[i]), float(similarities[i]))
+                      for i in matched]
 
         return {
             'avg_similarity': float(np.mean(similarities)),
             'max_similarity': float(np.max(similarities)),
-            'matched_sentences': matched_count,
-            'match_ratio': matched_count / len(sentences1) if sentences1 else 0
+            'matched_sentences': len(alignments),
+            'match_ratio': len(alignments) / len(sentences1),
+            'alignments': alignments
         }
 
-    def analyze_texts(self, text1: str, text2: str) -> Dict:
+    @staticmethod
+    def _normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+        "Normaliza cada fila a norma 1 (las filas nulas quedan en cero)"
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeddings / norms
+
+    def locate_passages(self, text1: Union[str, ProcessedDocument],
+                        text2: Union[str, ProcessedDocument],
+                        sentence_alignments: Optional[List[Tuple[int, int, float]]] = None,
+                        embedding_lookup: Optional[Dict[str, np.ndarray]] = None) -> List[Dict]:
         """
-        Análisis completo de similitud entre dos textos.
+        Localiza los pasajes de text1 (fuente) reutilizados en text2 (sospechoso).
+
+        Combina semillas de n-gramas de palabras con las oraciones alineadas
+        por embeddings; si no se pasan sentence_alignments se calculan.
+
+        Returns:
+            Lista de {'source_span', 'suspicious_span', 'score', 'method'}
+            con spans (inicio, fin) en caracteres de los textos originales
         """
-        # Preprocesar textos
-        clean_text1 = self.preprocessor.normalize_text(text1)
-        clean_text2 = self.preprocessor.normalize_text(text2)
+        document1 = self.process_document(text1)
+        document2 = self.process_document(text2)
 
-        # Tokenizar
-        tokens1 = self.preprocessor.tokenize_words(clean_text1)
-        tokens2 = self.preprocessor.tokenize_words(clean_text2)
+        if sentence_alignments is None:
+            sentence_alignments = self.compute_sentence_level_similarity(
+                document1.sentences, document2.sentences, embedding_lookup)['alignments']
 
-        # Extraer características
-        features1 = self.preprocessor.extract_features(text1)
-        features2 = self.preprocessor.extract_features(text2)
+        return self.passage_aligner.align(
+            document1.text, document2.text, document1.sentences, document2.sentences,
+            sentence_alignments)
 
-        # Obtener oraciones
-        sentences1 = self.preprocessor.tokenize_sentences(text1)
-        sentences2 = self.preprocessor.tokenize_sentences(text2)
+    def process_document(self, text: Union[str, ProcessedDocument]) -> ProcessedDocument:
+        """
+        Preprocesa un texto una sola vez (los ProcessedDocument se devuelven tal cual).
+        """
+        if isinstance(text, ProcessedDocument):
+            return text
+        return self.preprocessor.process(text)
+
+    def analyze_texts(self, text1: Union[str, ProcessedDocument], text2: Union[str, ProcessedDocument],
+                      embedding_lookup: Optional[Dict[str, np.ndarray]] = None,
+                      cascade: Optional[bool] = None,
+                      progress: Optional[Callable[[str], None]] = None) -> Dict:
+        """
+        Análisis completo de similitud entre dos textos.
+
+        Los textos pueden ser cadenas o ProcessedDocument ya preprocesados
+        (por ejemplo, un documento de referencia comparado contra muchos).
+        embedding_lookup permite pasar embeddings ya calculados (texto -> vector)
+        para los textos normalizados y las oraciones, como hace compare_many.
+        cascade activa el modo cascada (por defecto self.cascade).
+        progress se llama con el nombre de cada etapa (PROGRESS_STAGES) al
+        empezarla, por ejemplo para mostrar el avance de un trabajo en cola.
+        Los tiempos de cada etapa quedan en analysis['timings'].
+        """
+        if cascade if cascade is not None else self.cascade:
+            return self.analyze_texts_cascade(text1, text2, embedding_lookup, progress)
+
+        if progress is None:
+            progress = _no_progress
+        timer = StageTimer()
+
+        # Preprocesar textos (una sola tokenización por documento)
+        progress('preprocess')
+        with timer.stage('preprocess', chars=self._input_chars(text1, text2)):
+            document1 = self.process_document(text1)
+            document2 = self.process_document(text2)
+
+        clean_text1 = document1.clean_text
+        clean_text2 = document2.clean_text
+        features1 = document1.features
+        features2 = document2.features
+        sentences1 = document1.sentences
+        sentences2 = document2.sentences
 
         # ANÁLISIS SEMÁNTICO - Usa embeddings de Sentence-BERT
-        print("Calculando similitud semántica")
-        semantic_overall = self.compute_semantic_similarity(
-            clean_text1, clean_text2)
-        sentence_level = self.compute_sentence_level_similarity(
-            sentences1, sentences2)
+        progress('semantic')
+        logger.debug("Calculando similitud semántica")
+        with timer.stage('semantic_overall', chars=len(clean_text1) + len(clean_text2)):
+            semantic_overall = self.compute_semantic_similarity(
+                clean_text1, clean_text2, embedding_lookup)
+        with timer.stage('semantic_sentences', sentences=len(sentences1) + len(sentences2)):
+            sentence_level = self.compute_sentence_level_similarity(
+                sentences1, sentences2, embedding_lookup)
 
         # Combinamos similitud global y a nivel de oraciones
         semantic_score = 0.6 * semantic_overall + \
             0.4 * sentence_level['avg_similarity']
 
         # ANÁLISIS LÉXICO - TF-IDF, Jaccard, n-gramas
-        print("Calculando métricas léxicas")
+        progress('lexical')
+        logger.debug("Calculando métricas léxicas")
         lexical_metrics = self.metrics_calculator.compute_all_metrics(
-            clean_text1, clean_text2, tokens1, tokens2, features1, features2
-        )
+            document1, document2, progress=progress, timer=timer)
 
         # Combinar métricas léxicas
         lexical_score = np.mean([
@@ -170,7 +496,7 @@ class PlagiarismDetector:
             self.weights['sequence'] * sequence_score
         )
 
-        return {
+        analysis = {
             'final_score': final_score,
             'similarity_percentage': final_score * 100,
 
@@ -179,6 +505,11 @@ class PlagiarismDetector:
                 'sentence_avg': sentence_level['avg_similarity'],
                 'matched_sentences': sentence_level['matched_sentences'],
                 'match_ratio': sentence_level['match_ratio'],
+                'aligned_sentences': [
+                    {'sentence1': sentences1[i], 'sentence2': sentences2[j],
+                     'index1': i, 'index2': j, 'similarity': sim}
+                    for i, j, sim in sentence_level['alignments']
+                ],
                 'score': semantic_score
             },
 
@@ -208,6 +539,220 @@ class PlagiarismDetector:
             }
         }
 
+        # PASAJES - offsets de los fragmentos coincidentes
+        if self.passage_alignment:
+            with timer.stage('passages', chars=len(document1.text) + len(document2.text)):
+                analysis['passages'] = self.locate_passages(
+                    document1, document2, sentence_level['alignments'])
+
+        analysis['timings'] = self._finish_timings(timer)
+        return analysis
+
+    @staticmethod
+    def _input_chars(text1: Union[str, ProcessedDocument],
+                     text2: Union[str, ProcessedDocument]) -> int:
+        "Caracteres de entrada de un par de textos"
+        return sum(len(text.text if isinstance(text, ProcessedDocument) else text)
+                   for text in (text1, text2))
+
+    def _finish_timings(self, timer: StageTimer) -> Dict[str, Dict[str, float]]:
+        """
+        Cierra los tiempos de un análisis, los suma a timing_stats y los
+        registra en el log (nivel DEBUG, campo extra 'timings').
+        """
+        timings = timer.finish()
+        if self.timing_stats is not None:
+            self.timing_stats.add(timings)
+        logger.debug("Tiempos del análisis: %.1f ms", timings['total']['wall_ms'],
+                     extra={'timings': timings})
+        return timings
+
+    def _verdict_band(self, score: float) -> int:
+        "Número de umbrales superados por un score (misma regla que get_verdict)"
+        return sum(score * 100 >= threshold * 100
+                   for threshold in self.thresholds.values())
+
+    def analyze_texts_cascade(self, text1: Union[str, ProcessedDocument],
+                              text2: Union[str, ProcessedDocument],
+                              embedding_lookup: Optional[Dict[str, np.ndarray]] = None,
+                              progress: Optional[Callable[[str], None]] = None) -> Dict:
+        """
+        Análisis en cascada: calcula las métricas de menor a mayor costo y
+        se detiene cuando los límites del score final (según self.weights)
+        ya no pueden cruzar ningún umbral de self.thresholds.
+
+        Las métricas no calculadas quedan en None y las etapas omitidas se
+        reportan en 'cascade'. El score final es el punto medio de los
+        límites, que siempre cae en la misma banda del veredicto.
+        """
+        if progress is None:
+            progress = _no_progress
+        timer = StageTimer()
+
+        progress('preprocess')
+        with timer.stage('preprocess', chars=self._input_chars(text1, text2)):
+            document1 = self.process_document(text1)
+            document2 = self.process_document(text2)
+        metrics = self.metrics_calculator
+        chars = len(document1.clean_text) + len(document2.clean_text)
+
+        values = {}
+
+        # Rango posible de cada métrica aún no calculada
+        ranges = {
+            'structural_similarity': (0.0, 1.0),
+            'jaccard_words': (0.0, 1.0),
+            'dice_coefficient': (0.0, 1.0),
+            'trigram_similarity': (0.0, 1.0),
+            'tfidf_cosine': (0.0, 1.0),
+            'semantic_overall': (-1.0, 1.0),
+            'sentence_avg': (0.0, 1.0),
+            'sequence_matcher': (0.0, 1.0),
+            'lcs_ratio': (0.0, 1.0),
+        }
+
+        def bounds(name):
+            if name in values:
+                return values[name], values[name]
+            return ranges[name]
+
+        def category_bounds():
+            lexical = [bounds(name) for name in
+                       ('tfidf_cosine', 'jaccard_words', 'trigram_similarity', 'dice_coefficient')]
+            sequence = [bounds(name) for name in ('sequence_matcher', 'lcs_ratio')]
+            overall = bounds('semantic_overall')
+            sentence = bounds('sentence_avg')
+
+            return {
+                'semantic': (0.6 * overall[0] + 0.4 * sentence[0],
+                             0.6 * overall[1] + 0.4 * sentence[1]),
+                'lexical': (np.mean([lo for lo, _ in lexical]),
+                            np.mean([hi for _, hi in lexical])),
+                'structural': bounds('structural_similarity'),
+                'sequence': (np.mean([lo for lo, _ in sequence]),
+                             np.mean([hi for _, hi in sequence])),
+            }
+
+        def final_bounds():
+            categories = category_bounds()
+            low = sum(self.weights[name] * categories[name][0] for name in categories)
+            high = sum(self.weights[name] * categories[name][1] for name in categories)
+            return low, high
+
+        sentence_level = None
+
+        def run_semantic_overall():
+            values['semantic_overall'] = self.compute_semantic_similarity(
+                document1.clean_text, document2.clean_text, embedding_lookup)
+
+        def run_sentences():
+            nonlocal sentence_level
+            sentence_level = self.compute_sentence_level_similarity(
+                document1.sentences, document2.sentences, embedding_lookup)
+            values['sentence_avg'] = sentence_level['avg_similarity']
+
+        def run_lexical_sets():
+            vocab_metrics = metrics.vocabulary_overlap(
+                document1.vocabulary, document2.vocabulary)
+            values['jaccard_words'] = metrics.jaccard_similarity(
+                document1.token_set, document2.token_set)
+            values['dice_coefficient'] = vocab_metrics['dice_coefficient']
+            if len(document1.tokens) < 3 or len(document2.tokens) < 3:
+                values['trigram_similarity'] = 0.0
+            else:
+                values['trigram_similarity'] = metrics.jaccard_similarity(
+                    document1.ngram_set(3), document2.ngram_set(3))
+
+        # Etapas ordenadas de menor a mayor costo
+        stages = [
+            ('structural', lambda: values.__setitem__(
+                'structural_similarity',
+                metrics.structural_similarity(document1.features, document2.features))),
+            ('lexical_sets', run_lexical_sets),
+            ('tfidf', lambda: values.__setitem__(
+                'tfidf_cosine',
+                metrics.cosine_similarity_tfidf(document1.clean_text, document2.clean_text))),
+            ('semantic_overall', run_semantic_overall),
+            ('lcs', lambda: values.__setitem__(
+                'lcs_ratio',
+                metrics.longest_common_subsequence(document1.clean_text, document2.clean_text))),
+            ('semantic_sentences', run_sentences),
+            ('sequence_matcher', lambda: values.__setitem__(
+                'sequence_matcher',
+                metrics.sequence_similarity(document1.clean_text, document2.clean_text))),
+        ]
+
+        stages_run = []
+        low, high = final_bounds()
+        for stage_name, run_stage in stages:
+            if self._verdict_band(low) == self._verdict_band(high):
+                break
+            progress(CASCADE_PROGRESS_STAGES[stage_name])
+            with timer.stage(stage_name, chars=chars):
+                run_stage()
+            stages_run.append(stage_name)
+            low, high = final_bounds()
+
+        stages_skipped = [name for name, _ in stages[len(stages_run):]]
+        complete = not stages_skipped
+        categories = category_bounds()
+
+        def category_score(name):
+            low_value, high_value = categories[name]
+            return low_value if low_value == high_value else None
+
+        final_score = low if complete else (low + high) / 2
+
+        return {
+            'final_score': final_score,
+            'similarity_percentage': final_score * 100,
+
+            'semantic': {
+                'overall': values.get('semantic_overall'),
+                'sentence_avg': values.get('sentence_avg'),
+                'matched_sentences': sentence_level['matched_sentences'] if sentence_level else None,
+                'match_ratio': sentence_level['match_ratio'] if sentence_level else None,
+                'aligned_sentences': [
+                    {'sentence1': document1.sentences[i], 'sentence2': document2.sentences[j],
+                     'index1': i, 'index2': j, 'similarity': sim}
+                    for i, j, sim in sentence_level['alignments']
+                ] if sentence_level else [],
+                'score': category_score('semantic')
+            },
+
+            'lexical': {
+                'tfidf_cosine': values.get('tfidf_cosine'),
+                'jaccard': values.get('jaccard_words'),
+                'trigram': values.get('trigram_similarity'),
+                'dice': values.get('dice_coefficient'),
+                'score': category_score('lexical')
+            },
+
+            'structural': {
+                'similarity': values.get('structural_similarity'),
+                'score': category_score('structural')
+            },
+
+            'sequence': {
+                'sequence_matcher': values.get('sequence_matcher'),
+                'lcs_ratio': values.get('lcs_ratio'),
+                'score': category_score('sequence')
+            },
+
+            'detailed_metrics': dict(values),
+            'features': {
+                'text1': document1.features,
+                'text2': document2.features
+            },
+            'cascade': {
+                'stages_run': stages_run,
+                'stages_skipped': stages_skipped,
+                'score_bounds': (float(low), float(high)),
+                'early_exit': not complete
+            },
+            'timings': self._finish_timings(timer)
+        }
+
     def get_verdict(self, similarity_percentage: float) -> str:
         """
         Determina el veredicto basado en el porcentaje de similitud
@@ -221,45 +766,142 @@ class PlagiarismDetector:
         else:
             return "Similitud baja - Texto original"
 
-    def compare_texts(self, text1: str, text2: str) -> Dict:
+    def compare_texts(self, text1: Union[str, ProcessedDocument],
+                      text2: Union[str, ProcessedDocument],
+                      progress: Optional[Callable[[str], None]] = None) -> Dict:
         """
         Compara dos textos y retorna el análisis completo.
+        progress recibe el nombre de cada etapa del análisis (ver analyze_texts).
         """
-        if not text1 or not text2:
+        if not self._has_content(text1) or not self._has_content(text2):
             return {
                 'error': 'Ambos textos deben tener contenido',
                 'similarity_percentage': 0.0
             }
 
-        analysis = self.analyze_texts(text1, text2)
+        analysis = self.analyze_texts(text1, text2, progress=progress)
 
+        return self._build_result(analysis)
+
+    @staticmethod
+    def _has_content(text: Union[str, ProcessedDocument]) -> bool:
+        if isinstance(text, ProcessedDocument):
+            return bool(text.text)
+        return bool(text)
+
+    def _build_result(self, analysis: Dict) -> Dict:
         return {
             'similarity_percentage': analysis['similarity_percentage'],
             'final_score': analysis['final_score'],
             'verdict': self.get_verdict(analysis['similarity_percentage']),
             'breakdown': {
-                'semantic': f"{analysis['semantic']['score'] * 100:.2f}%",
-                'lexical': f"{analysis['lexical']['score'] * 100:.2f}%",
-                'structural': f"{analysis['structural']['score'] * 100:.2f}%",
-                'sequence': f"{analysis['sequence']['score'] * 100:.2f}%",
+                category: self._format_percentage(analysis[category]['score'])
+                for category in ('semantic', 'lexical', 'structural', 'sequence')
             },
             'details': analysis,
             'weights_used': self.weights
         }
 
-    def compare_files(self, file1_path: str, file2_path: str, encoding: str = 'utf-8') -> Dict:
+    @staticmethod
+    def _format_percentage(score: Optional[float]) -> str:
+        "Formatea un score como porcentaje (N/A si la cascada lo omitió)"
+        if score is None:
+            return "N/A"
+        return f"{score * 100:.2f}%"
+
+    def compare_many(self, pairs: List[Tuple[str, str]], batch_size: int = 64,
+                     cascade: Optional[bool] = None) -> List[Dict]:
+        """
+        Compara muchos pares de textos con embeddings calculados por lotes.
+
+        Reúne todos los textos normalizados y oraciones de un grupo de
+        pares, elimina duplicados y los codifica en pocas llamadas grandes
+        a SentenceTransformer.encode. Cada resultado tiene el mismo formato
+        que compare_texts.
+
+        El preprocesamiento y la codificación por lotes son compartidos por
+        los pares del grupo, así que no aparecen en details['timings'] de
+        cada resultado; si hay timing_stats se suman ahí como etapas
+        batch_preprocess y batch_encode.
+
+        Args:
+            pairs: Lista de tuplas (texto1, texto2)
+            batch_size: Número de pares procesados por grupo
+            cascade: Modo cascada (por defecto self.cascade). En cascada los
+                embeddings solo se calculan para los pares que los necesitan.
+
+        Returns:
+            Lista de resultados en el mismo orden que pairs
+        """
+        results = []
+        if cascade is None:
+            cascade = self.cascade
+
+        for start in range(0, len(pairs), batch_size):
+            chunk = pairs[start:start + batch_size]
+            timer = StageTimer()
+
+            # Preprocesar una sola vez cada texto distinto del grupo
+            processed = {}
+            with timer.stage('batch_preprocess'):
+                for text1, text2 in chunk:
+                    if not self._has_content(text1) or not self._has_content(text2):
+                        continue
+                    for text in (text1, text2):
+                        key = text.text if isinstance(text, ProcessedDocument) else text
+                        if key not in processed:
+                            processed[key] = self.process_document(text)
+
+            # Reunir textos y oraciones únicos del grupo (sus fragmentos
+            # si los textos largos se codifican por ventanas)
+            documents = {}
+            sentences = {}
+            for document in processed.values():
+                documents.update(dict.fromkeys(self.split_into_chunks(document.clean_text)))
+                for sentence in document.sentences:
+                    sentences.update(dict.fromkeys(self.split_into_chunks(sentence)))
+
+            embedding_lookup = {}
+            for unique_texts in (list(documents), list(sentences)):
+                if not unique_texts or cascade:
+                    continue
+                with timer.stage('batch_encode', texts=len(unique_texts)):
+                    vectors = self._encode(unique_texts, batch_size=batch_size)
+                embedding_lookup.update(zip(unique_texts, vectors))
+
+            if self.timing_stats is not None:
+                self.timing_stats.add(timer.as_dict(), analyses=0)
+
+            for text1, text2 in chunk:
+                if not self._has_content(text1) or not self._has_content(text2):
+                    results.append({
+                        'error': 'Ambos textos deben tener contenido',
+                        'similarity_percentage': 0.0
+                    })
+                    continue
+
+                document1 = processed[text1.text if isinstance(text1, ProcessedDocument) else text1]
+                document2 = processed[text2.text if isinstance(text2, ProcessedDocument) else text2]
+                analysis = self.analyze_texts(
+                    document1, document2, embedding_lookup, cascade=cascade)
+                results.append(self._build_result(analysis))
+
+        return results
+
+    def compare_files(self, file1_path: str, file2_path: str,
+                      encoding: Optional[str] = None) -> Dict:
         """
-        Compara dos archivos de texto.
+        Compara dos archivos PDF, TXT o MD.
+        El texto se extrae en streaming (ver document_loader); encoding
+        fuerza la codificación de los archivos de texto (None = detectar).
         """
         try:
-            with open(file1_path, 'r', encoding=encoding) as f:
-                text1 = f.read()
+            text1 = load_document(file1_path, encoding=encoding)
         except Exception as e:
             return {'error': f'Error al leer archivo 1: {str(e)}'}
 
         try:
-            with open(file2_path, 'r', encoding=encoding) as f:
-                text2 = f.read()
+            text2 = load_document(file2_path, encoding=encoding)
         except Exception as e:
             return {'error': f'Error al leer archivo 2: {str(e)}'}
 
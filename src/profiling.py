@@ -0,0 +1,231 @@
+"""
+profiling.py
+Tiempos por etapa del análisis y su exportación
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Instrumentación del camino crítico de analyze_texts:
+- StageTimer: tiempo de reloj, tiempo de CPU del hilo y tamaño de la
+  entrada de cada etapa de un análisis (details['timings'])
+- TimingStats: acumula los tiempos de muchos análisis (un dataset en
+  el entrenamiento, las peticiones de la app o del servicio)
+- Exportación en texto de Prometheus (endpoint local /metrics) o JSON
+- Formato JSON para los registros del módulo logging
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# Campos de tiempo de cada etapa; el resto son tamaños de entrada
+TIME_FIELDS = ('wall_ms', 'cpu_ms', 'calls')
+
+
+class StageTimer:
+    "Tiempos por etapa de un análisis"
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+
+    @contextmanager
+    def stage(self, name: str, **sizes):
+        """
+        Mide un bloque como la etapa name.
+
+        Args:
+            name: Nombre de la etapa (las repeticiones se suman)
+            sizes: Tamaños de la entrada (chars, tokens, sentences...)
+        """
+        wall = time.perf_counter()
+        # Tiempo de CPU del hilo: no incluye otros trabajos en paralelo
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            record = self.stages.setdefault(name, {'wall_ms': 0.0, 'cpu_ms': 0.0, 'calls': 0})
+            record['wall_ms'] += (time.perf_counter() - wall) * 1000
+            record['cpu_ms'] += (time.thread_time() - cpu) * 1000
+            record['calls'] += 1
+            for key, value in sizes.items():
+                record[key] = record.get(key, 0) + value
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        "Copia de los tiempos (etapa -> campos)"
+        return {name: dict(record) for name, record in self.stages.items()}
+
+    def finish(self) -> Dict[str, Dict[str, float]]:
+        "Agrega la etapa 'total' (desde la creación del timer) y devuelve los tiempos"
+        self.stages['total'] = {
+            'wall_ms': (time.perf_counter() - self._wall_start) * 1000,
+            'cpu_ms': (time.thread_time() - self._cpu_start) * 1000,
+            'calls': 1
+        }
+        return self.as_dict()
+
+
+class TimingStats:
+    "Acumulado de los tiempos por etapa de muchos análisis"
+
+    def __init__(self):
+        self.analyses = 0
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, timings: Dict[str, Dict[str, float]], analyses: int = 1):
+        """
+        Suma los tiempos de uno o varios análisis.
+
+        Args:
+            timings: Tiempos por etapa (details['timings'] o StageTimer.as_dict)
+            analyses: Análisis que representan (0 para etapas compartidas
+                por un lote, como la codificación de compare_many)
+        """
+        with self._lock:
+            self.analyses += analyses
+            for name, record in timings.items():
+                totals = self._stages.setdefault(name, {})
+                for key, value in record.items():
+                    totals[key] = totals.get(key, 0) + value
+
+    def merge(self, stats: Dict):
+        "Suma un acumulado exportado con as_dict (p. ej. de un proceso worker)"
+        self.add(stats['stages'], analyses=stats['analyses'])
+
+    def reset(self):
+        with self._lock:
+            self.analyses = 0
+            self._stages = {}
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'analyses': self.analyses,
+                'stages': {name: dict(totals) for name, totals in self._stages.items()}
+            }
+
+    def summary(self) -> List[Dict]:
+        """
+        Etapas ordenadas por tiempo de reloj, con el promedio por análisis
+        y la fracción del tiempo total.
+        """
+        stats = self.as_dict()
+        stages = {name: totals for name, totals in stats['stages'].items() if name != 'total'}
+        wall_total = sum(totals.get('wall_ms', 0.0) for totals in stages.values())
+        analyses = max(stats['analyses'], 1)
+
+        rows = [{
+            'stage': name,
+            'wall_ms': totals.get('wall_ms', 0.0),
+            'cpu_ms': totals.get('cpu_ms', 0.0),
+            'calls': int(totals.get('calls', 0)),
+            'mean_wall_ms': totals.get('wall_ms', 0.0) / analyses,
+            'share': totals.get('wall_ms', 0.0) / wall_total if wall_total else 0.0,
+        } for name, totals in stages.items()]
+        return sorted(rows, key=lambda row: row['wall_ms'], reverse=True)
+
+    def to_prometheus(self, prefix: str = 'plagiarism') -> str:
+        """
+        Acumulado en el formato de texto de Prometheus (contadores por etapa).
+        """
+        stats = self.as_dict()
+        lines = [
+            f'# HELP {prefix}_analyses_total Análisis registrados',
+            f'# TYPE {prefix}_analyses_total counter',
+            f'{prefix}_analyses_total {stats["analyses"]}',
+        ]
+
+        metrics = [
+            ('wall_ms', 'stage_wall_seconds_total', 'Tiempo de reloj por etapa', 1e-3),
+            ('cpu_ms', 'stage_cpu_seconds_total', 'Tiempo de CPU por etapa', 1e-3),
+            ('calls', 'stage_calls_total', 'Ejecuciones por etapa', 1),
+        ]
+        size_fields = sorted({key for totals in stats['stages'].values()
+                              for key in totals if key not in TIME_FIELDS})
+        metrics += [(key, f'stage_input_{key}_total', f'Entrada procesada por etapa ({key})', 1)
+                    for key in size_fields]
+
+        for field, name, description, scale in metrics:
+            lines.append(f'# HELP {prefix}_{name} {description}')
+            lines.append(f'# TYPE {prefix}_{name} counter')
+            for stage, totals in sorted(stats['stages'].items()):
+                if field in totals:
+                    lines.append(f'{prefix}_{name}{{stage="{stage}"}} {totals[field] * scale:.6g}')
+
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path: str):
+        "Guarda el acumulado y el resumen en JSON"
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({**self.as_dict(), 'summary': self.summary()}, f, indent=2)
+
+
+def start_metrics_server(stats: TimingStats, port: int,
+                         host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    Sirve GET /metrics (texto de Prometheus) en un hilo en segundo plano.
+
+    Returns:
+        Servidor en ejecución (server.shutdown() lo detiene)
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = stats.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
+
+
+class JsonLogFormatter(logging.Formatter):
+    "Un objeto JSON por registro, con los campos extra (p. ej. timings)"
+
+    _RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items()
+                      if key not in self._RESERVED})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: str = 'INFO', json_format: bool = False,
+                      path: Optional[str] = None):
+    """
+    Configura el logging raíz en texto o en JSON por línea.
+
+    Args:
+        level: Nivel mínimo (DEBUG incluye los tiempos de cada análisis)
+        json_format: Registros como JSON (un objeto por línea)
+        path: Archivo de log (None = stderr)
+    """
+    handler = logging.FileHandler(path, encoding='utf-8') if path else logging.StreamHandler()
+    handler.setFormatter(JsonLogFormatter() if json_format else
+                         logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    logging.basicConfig(level=level, handlers=[handler], force=True)
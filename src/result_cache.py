@@ -0,0 +1,205 @@
+"""
+result_cache.py
+Caché persistente de resultados de comparación
+
+Autores: Alma Paulina González Sandoval, Diego Sánchez Valle
+Fecha: Diciembre 2025
+
+Guarda el resultado completo de compare_texts para no recalcularlo
+cuando se repite la misma comparación (otra sesión, otro clic o un
+re-render de Streamlit):
+- Clave: hash de (texto A, texto B, idioma, pesos, modelo y configuración)
+- Nivel en disco con SQLite, compartido entre sesiones y procesos
+- Caducidad por TTL y límite de tamaño con desalojo LRU
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    "Caché de resultados de comparación con TTL y tamaño máximo"
+
+    def __init__(self, cache_dir: Optional[str] = None,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_items: int = 2000):
+        """
+            cache_dir: Directorio del archivo SQLite (None = solo memoria)
+            ttl_seconds: Tiempo de vida de cada resultado
+            max_items: Máximo de resultados guardados
+        """
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            database = os.path.join(cache_dir, 'results.sqlite3')
+        else:
+            database = ':memory:'
+
+        self._connection = sqlite3.connect(database, check_same_thread=False, timeout=30)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, result BLOB NOT NULL, '
+            'created REAL NOT NULL, last_access REAL NOT NULL)')
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS idx_results_last_access '
+            'ON results (last_access)')
+        self._connection.commit()
+
+    @staticmethod
+    def make_key(text1: str, text2: str, language: str, weights: Dict[str, float],
+                 model: str, config: Optional[Dict] = None) -> str:
+        """
+        Clave de una comparación.
+
+        Args:
+            text1, text2: Textos comparados (el orden importa)
+            language: Idioma del detector
+            weights: Pesos de las categorías
+            model: Modelo de embeddings (con backend)
+            config: Otros parámetros que cambian el resultado
+
+        Returns:
+            Hash SHA-256 hexadecimal
+        """
+        payload = json.dumps({
+            'text1': _text_hash(text1),
+            'text2': _text_hash(text2),
+            'language': language,
+            'weights': weights,
+            'model': model,
+            'config': config or {}
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def key_for(cls, detector, text1: str, text2: str) -> str:
+        """
+        Clave de una comparación con la configuración actual de un detector.
+        """
+        metrics = detector.metrics_calculator
+        tfidf_path = metrics.tfidf_model_path
+        # La fecha de modificación invalida los resultados si el modelo
+        # TF-IDF se vuelve a ajustar en la misma ruta (como en el trainer)
+        if tfidf_path and os.path.exists(tfidf_path):
+            tfidf_path = f"{tfidf_path}:{os.path.getmtime(tfidf_path)}"
+        config = {
+            'thresholds': detector.thresholds,
+            'cascade': detector.cascade,
+            'sequence_engine': metrics.sequence_engine,
+            'tfidf_model_path': tfidf_path,
+            'chunked_encoding': detector.chunked_encoding,
+            'chunk_size': detector.chunk_size,
+            'chunk_stride': detector.chunk_stride,
+            'chunk_pooling': detector.chunk_pooling,
+            'passage_alignment': detector.passage_alignment,
+        }
+        return cls.make_key(text1, text2, detector.language, detector.weights,
+                            detector.embedding_key, config)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Busca un resultado; los caducados cuentan como fallo y se eliminan.
+
+        Returns:
+            Resultado guardado o None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT result, created FROM results WHERE key = ?', (key,)).fetchone()
+
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._connection.execute('DELETE FROM results WHERE key = ?', (key,))
+                    self._connection.commit()
+                self.misses += 1
+                return None
+
+            self._connection.execute(
+                'UPDATE results SET last_access = ? WHERE key = ?', (now, key))
+            self._connection.commit()
+            self.hits += 1
+
+        return pickle.loads(row[0])
+
+    def put(self, key: str, result: Dict):
+        """
+        Guarda un resultado y desaloja los caducados y los menos usados.
+        Los tiempos por etapa no se guardan: corresponden a la ejecución
+        que calculó el resultado, no a la que lo recupera.
+        """
+        now = time.time()
+        details = result.get('details')
+        if isinstance(details, dict) and 'timings' in details:
+            result = {**result, 'details': {key: value for key, value in details.items()
+                                            if key != 'timings'}}
+        blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO results (key, result, created, last_access) '
+                'VALUES (?, ?, ?, ?)', (key, blob, now, now))
+            self._evict(now)
+            self._connection.commit()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Dict]) -> Dict:
+        """
+        Devuelve el resultado guardado o lo calcula y lo guarda.
+        Los resultados con error no se guardan.
+        """
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            if 'error' not in result:
+                self.put(key, result)
+        return result
+
+    def _evict(self, now: float):
+        self._connection.execute(
+            'DELETE FROM results WHERE created < ?', (now - self.ttl_seconds,))
+
+        count = self._connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        excess = count - self.max_items
+        if excess > 0:
+            self._connection.execute(
+                'DELETE FROM results WHERE key IN ('
+                'SELECT key FROM results ORDER BY last_access LIMIT ?)', (excess,))
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Contadores de aciertos y fallos.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            items = self._connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'items': items
+            }
+
+    def clear(self):
+        "Elimina todos los resultados"
+        with self._lock:
+            self._connection.execute('DELETE FROM results')
+            self._connection.commit()
@@ -11,27 +11,126 @@ Implementa las métricas léxicas, estructurales y de secuencia:
 - N-gramas (bigrams, trigrams, 4-grams)
 - LCS (Longest Common Subsequence)
 - SequenceMatcher de Python
+
+scikit-learn, joblib y Levenshtein se importan al usarse por primera vez
+para no alargar el arranque.
 """
 
+import os
+import threading
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Optional, Tuple, Sequence
 from difflib import SequenceMatcher
-from collections import Counter
-import Levenshtein
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
+from collections import Counter, OrderedDict
+
+from text_preprocessor import ProcessedDocument
+from profiling import StageTimer
 
 
 class SimilarityMetrics:
     "Calcula múltiples métricas de similitud entre dos textos"
 
-    def __init__(self):
-        self.tfidf_vectorizer = TfidfVectorizer()
+    def __init__(self, tfidf_model_path: Optional[str] = None, tfidf_cache_size: int = 4096,
+                 sequence_engine: str = 'difflib', min_tile_length: int = 3):
+        """
+            tfidf_model_path: Vectorizador TF-IDF ajustado con fit_tfidf y
+                guardado con save_tfidf. Si es None, el TF-IDF se ajusta
+                sobre cada par de textos.
+            tfidf_cache_size: Máximo de vectores TF-IDF guardados en memoria
+            sequence_engine: Motor de sequence_similarity: 'difflib'
+                (SequenceMatcher sobre caracteres) o 'tiling' (cobertura de
+                coincidencias sobre IDs de tokens, costo lineal)
+            min_tile_length: Longitud mínima (en tokens) de una coincidencia
+                para el motor 'tiling'
+        """
+        if sequence_engine not in ('difflib', 'tiling'):
+            raise ValueError(f"Motor de secuencia desconocido: {sequence_engine}")
+
+        self.sequence_engine = sequence_engine
+        self.min_tile_length = min_tile_length
+        self._tfidf_vectorizer = None
+        self.fitted_vectorizer = None
+        self.tfidf_model_path = tfidf_model_path
+        self.tfidf_cache_size = tfidf_cache_size
+        self._tfidf_cache = OrderedDict()
+        # La instancia se comparte entre hilos (trabajos de la app, servicio)
+        self._tfidf_lock = threading.Lock()
+
+        if tfidf_model_path:
+            self.load_tfidf(tfidf_model_path)
+
+    @property
+    def tfidf_vectorizer(self):
+        "Vectorizador TF-IDF por par (se crea al usarse por primera vez)"
+        if self._tfidf_vectorizer is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            self._tfidf_vectorizer = TfidfVectorizer()
+        return self._tfidf_vectorizer
+
+    def fit_tfidf(self, corpus: List[str]):
+        """
+        Ajusta el vectorizador TF-IDF una sola vez sobre un corpus de referencia.
+
+        Args:
+            corpus: Textos normalizados del corpus
+        """
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        self.fitted_vectorizer = TfidfVectorizer().fit(corpus)
+        with self._tfidf_lock:
+            self._tfidf_cache.clear()
+
+    def save_tfidf(self, path: str):
+        """
+        Guarda el vectorizador ajustado.
+        """
+        if self.fitted_vectorizer is None:
+            raise ValueError("El vectorizador TF-IDF no ha sido ajustado")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        import joblib
+        joblib.dump(self.fitted_vectorizer, path)
+        self.tfidf_model_path = path
+
+    def load_tfidf(self, path: str):
+        """
+        Carga un vectorizador ajustado con fit_tfidf.
+        """
+        import joblib
+        self.fitted_vectorizer = joblib.load(path)
+        self.tfidf_model_path = path
+        with self._tfidf_lock:
+            self._tfidf_cache.clear()
+
+    def tfidf_vector(self, text: str):
+        """
+        Vector TF-IDF (disperso, norma L2) de un texto con el vectorizador
+        ajustado, reutilizando los vectores ya calculados.
+        """
+        with self._tfidf_lock:
+            vector = self._tfidf_cache.get(text)
+            if vector is not None:
+                self._tfidf_cache.move_to_end(text)
+                return vector
+
+        # transform fuera del candado: otros hilos no esperan al cálculo
+        vector = self.fitted_vectorizer.transform([text])
+        with self._tfidf_lock:
+            self._tfidf_cache[text] = vector
+            while len(self._tfidf_cache) > self.tfidf_cache_size:
+                self._tfidf_cache.popitem(last=False)
+
+        return vector
 
     def cosine_similarity_tfidf(self, text1: str, text2: str) -> float:
         """
         Calcula similitud coseno usando TF-IDF.
 
+        Con un vectorizador ajustado sobre un corpus, los vectores son de
+        norma L2 y la similitud es un producto punto disperso. Sin él, el
+        IDF se calcula solo con los dos textos.
+
         Args:
             text1: Primer texto
             text2: Segundo texto
@@ -39,7 +138,13 @@ class SimilarityMetrics:
         Returns:
             Score de similitud [0, 1]
         """
+        if self.fitted_vectorizer is not None:
+            vector1 = self.tfidf_vector(text1)
+            vector2 = self.tfidf_vector(text2)
+            return float(vector1.multiply(vector2).sum())
+
         try:
+            from sklearn.metrics.pairwise import cosine_similarity
             tfidf_matrix = self.tfidf_vectorizer.fit_transform([text1, text2])
             similarity = cosine_similarity(
                 tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
@@ -91,7 +196,10 @@ class SimilarityMetrics:
 
     def sequence_similarity(self, text1: str, text2: str) -> float:
         """
-        Calcula similitud de secuencia usando SequenceMatcher.
+        Calcula similitud de secuencia con el motor configurado.
+
+        Con 'difflib' usa SequenceMatcher sobre caracteres; con 'tiling'
+        usa token_tiling_similarity sobre las palabras del texto.
 
         Args:
             text1: Primer texto
@@ -100,8 +208,124 @@ class SimilarityMetrics:
         Returns:
             Score de similitud [0, 1]
         """
+        if self.sequence_engine == 'tiling':
+            return self.token_tiling_similarity(text1.split(), text2.split())
+
         return SequenceMatcher(None, text1, text2).ratio()
 
+    @staticmethod
+    def to_token_ids(tokens1: Sequence, tokens2: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Convierte dos secuencias de tokens a arreglos de IDs enteros con un
+        vocabulario compartido.
+        """
+        vocabulary = {}
+        ids1 = np.fromiter((vocabulary.setdefault(t, len(vocabulary)) for t in tokens1),
+                           dtype=np.int64, count=len(tokens1))
+        ids2 = np.fromiter((vocabulary.setdefault(t, len(vocabulary)) for t in tokens2),
+                           dtype=np.int64, count=len(tokens2))
+        return ids1, ids2
+
+    @staticmethod
+    def _build_suffix_automaton(ids: Sequence[int]) -> Tuple[List[Dict[int, int]], List[int], List[int]]:
+        """
+        Autómata de sufijos de una secuencia en O(n).
+
+        Returns:
+            (transiciones, enlaces de sufijo, longitud máxima por estado)
+        """
+        transitions = [{}]
+        links = [-1]
+        lengths = [0]
+        last = 0
+
+        for symbol in ids:
+            current = len(lengths)
+            transitions.append({})
+            lengths.append(lengths[last] + 1)
+            links.append(0)
+
+            state = last
+            while state != -1 and symbol not in transitions[state]:
+                transitions[state][symbol] = current
+                state = links[state]
+
+            if state != -1:
+                target = transitions[state][symbol]
+                if lengths[state] + 1 == lengths[target]:
+                    links[current] = target
+                else:
+                    clone = len(lengths)
+                    transitions.append(dict(transitions[target]))
+                    lengths.append(lengths[state] + 1)
+                    links.append(links[target])
+                    while state != -1 and transitions[state].get(symbol) == target:
+                        transitions[state][symbol] = clone
+                        state = links[state]
+                    links[target] = clone
+                    links[current] = clone
+
+            last = current
+
+        return transitions, links, lengths
+
+    def _covered_tokens(self, pattern_ids: Sequence[int], text_ids: Sequence[int]) -> int:
+        """
+        Número de tokens de text_ids cubiertos por coincidencias de al menos
+        min_tile_length tokens que también aparecen en pattern_ids.
+
+        Recorre text_ids sobre el autómata de sufijos de pattern_ids
+        (estadísticas de coincidencia) y une los intervalos cubiertos con un
+        arreglo de diferencias, todo en tiempo lineal.
+        """
+        transitions, links, lengths = self._build_suffix_automaton(pattern_ids)
+        coverage = np.zeros(len(text_ids) + 1, dtype=np.int64)
+
+        state = 0
+        length = 0
+        for position, symbol in enumerate(text_ids):
+            while state and symbol not in transitions[state]:
+                state = links[state]
+                length = lengths[state]
+
+            if symbol in transitions[state]:
+                state = transitions[state][symbol]
+                length += 1
+            else:
+                length = 0
+
+            if length >= self.min_tile_length:
+                coverage[position - length + 1] += 1
+                coverage[position + 1] -= 1
+
+        return int(np.count_nonzero(np.cumsum(coverage[:-1])))
+
+    def token_tiling_similarity(self, tokens1: Sequence, tokens2: Sequence) -> float:
+        """
+        Similitud de secuencia sobre IDs de tokens con costo lineal.
+
+        Cuenta los tokens de cada texto cubiertos por coincidencias
+        contiguas de al menos min_tile_length tokens con el otro texto,
+        como una teselación de cadenas sin el costo cuadrático.
+
+        Args:
+            tokens1: Tokens del primer texto
+            tokens2: Tokens del segundo texto
+
+        Returns:
+            Score de similitud [0, 1] = tokens cubiertos / tokens totales
+        """
+        total = len(tokens1) + len(tokens2)
+        if total == 0:
+            return 0.0
+
+        ids1, ids2 = self.to_token_ids(tokens1, tokens2)
+        ids1 = ids1.tolist()
+        ids2 = ids2.tolist()
+
+        covered = self._covered_tokens(ids1, ids2) + self._covered_tokens(ids2, ids1)
+        return covered / total
+
     def levenshtein_similarity(self, text1: str, text2: str) -> float:
         """
         Calcula similitud basada en distancia de Levenshtein normalizada.
@@ -117,6 +341,7 @@ class SimilarityMetrics:
         if max_len == 0:
             return 1.0
 
+        import Levenshtein
         distance = Levenshtein.distance(text1, text2)
         return 1 - (distance / max_len)
 
@@ -224,85 +449,179 @@ class SimilarityMetrics:
 
         return np.mean(metrics)
 
-    def longest_common_subsequence(self, text1: str, text2: str) -> float:
+    def longest_common_subsequence(self, text1: Sequence, text2: Sequence,
+                                   level: str = 'char') -> float:
         """
-        Calcula el ratio del substring común más largo.
+        Calcula el ratio de la subsecuencia común más larga (LCS).
+
+        Usa la formulación bit-paralela de Hyyrö: cada columna de la matriz
+        DP se representa como un entero de Python y se actualiza con
+        operaciones de palabra, por lo que la memoria es O(min(m, n)) bits
+        y el tiempo O(m·n / w). El resultado es idéntico al de la matriz
+        DP completa.
 
         Args:
-            text1: Primer texto
-            text2: Segundo texto
+            text1: Primer texto (o secuencia de tokens)
+            text2: Segundo texto (o secuencia de tokens)
+            level: Unidad de comparación ('char' o 'word'). Con 'word' los
+                textos se dividen por espacios; las listas se usan tal cual.
 
         Returns:
             Score de similitud [0, 1]
         """
+        if level == 'word':
+            if isinstance(text1, str):
+                text1 = text1.split()
+            if isinstance(text2, str):
+                text2 = text2.split()
+
         m = len(text1)
         n = len(text2)
 
         if m == 0 or n == 0:
             return 0.0
 
-        # Matriz DP
-        L = [[0] * (n + 1) for _ in range(m + 1)]
-
-        for i in range(m + 1):
-            for j in range(n + 1):
-                if i == 0 or j == 0:
-                    L[i][j] = 0
-                elif text1[i - 1] == text2[j - 1]:
-                    L[i][j] = L[i - 1][j - 1] + 1
-                else:
-                    L[i][j] = max(L[i - 1][j], L[i][j - 1])
-
-        lcs_length = L[m][n]
+        lcs_length = self.lcs_length(text1, text2)
         max_length = max(m, n)
 
         return lcs_length / max_length if max_length > 0 else 0.0
 
-    def compute_all_metrics(self, text1: str, text2: str, tokens1: List[str],
-                            tokens2: List[str], features1: Dict, features2: Dict) -> Dict[str, float]:
+    @staticmethod
+    def lcs_length(seq1: Sequence, seq2: Sequence) -> int:
+        """
+        Longitud de la LCS con el algoritmo bit-paralelo de Hyyrö (2004).
+
+        Args:
+            seq1: Primera secuencia (caracteres o tokens hashables)
+            seq2: Segunda secuencia
+
+        Returns:
+            Longitud de la subsecuencia común más larga
+        """
+        # La secuencia más corta define el ancho del vector de bits
+        if len(seq1) > len(seq2):
+            seq1, seq2 = seq2, seq1
+
+        m = len(seq1)
+        if m == 0:
+            return 0
+
+        # Máscara de posiciones de cada símbolo en la secuencia corta
+        match_masks = {}
+        for i, symbol in enumerate(seq1):
+            match_masks[symbol] = match_masks.get(symbol, 0) | (1 << i)
+
+        full_mask = (1 << m) - 1
+        v = full_mask
+
+        for symbol in seq2:
+            match = match_masks.get(symbol)
+            if match is None:
+                continue
+            u = v & match
+            v = ((v + u) | (v - u)) & full_mask
+
+        # Cada bit en cero de V corresponde a un incremento de la LCS
+        return m - bin(v).count('1')
+
+    def compute_all_metrics(self, text1, text2, tokens1: Optional[List[str]] = None,
+                            tokens2: Optional[List[str]] = None, features1: Optional[Dict] = None,
+                            features2: Optional[Dict] = None,
+                            progress: Optional[Callable[[str], None]] = None,
+                            timer: Optional[StageTimer] = None) -> Dict[str, float]:
         """
         Calcula todas las métricas de similitud.
 
+        Acepta textos normalizados con sus tokens y características, o bien
+        dos ProcessedDocument (en cuyo caso se reutilizan sus conjuntos de
+        tokens y n-gramas ya calculados).
+
         Args:
-            text1: Primer texto normalizado
-            text2: Segundo texto normalizado
+            text1: Primer texto normalizado o ProcessedDocument
+            text2: Segundo texto normalizado o ProcessedDocument
             tokens1: Tokens del primer texto
             tokens2: Tokens del segundo texto
             features1: Características del primer texto
             features2: Características del segundo texto
+            progress: Se llama con 'sequence' al pasar a las métricas de secuencia
+            timer: Registra el tiempo y el tamaño de entrada de cada grupo
+                de métricas (tfidf, lexical_sets, sequence_matcher,
+                levenshtein, lcs, structural, containment)
 
         Returns:
             Diccionario con todas las métricas
         """
-        vocab1 = features1['vocabulary']
-        vocab2 = features2['vocabulary']
-        vocab_metrics = self.vocabulary_overlap(vocab1, vocab2)
-        containment = self.containment_score(tokens1, tokens2)
-
-        metrics = {
-            # Métricas léxicas
-            'tfidf_cosine': self.cosine_similarity_tfidf(text1, text2),
-            'jaccard_words': self.jaccard_similarity(set(tokens1), set(tokens2)),
-            'jaccard_vocab': vocab_metrics['jaccard'],
-            'dice_coefficient': vocab_metrics['dice_coefficient'],
-
-            # Métricas de n-gramas
-            'bigram_similarity': self.ngram_similarity(tokens1, tokens2, n=2),
-            'trigram_similarity': self.ngram_similarity(tokens1, tokens2, n=3),
-            'fourgram_similarity': self.ngram_similarity(tokens1, tokens2, n=4),
-
-            # Métricas de secuencia
-            'sequence_matcher': self.sequence_similarity(text1, text2),
-            'levenshtein': self.levenshtein_similarity(text1, text2),
-            'lcs_ratio': self.longest_common_subsequence(text1, text2),
-
-            # Métricas estructurales
-            'structural_similarity': self.structural_similarity(features1, features2),
-
-            # Métricas de contención
+        if isinstance(text1, ProcessedDocument) and isinstance(text2, ProcessedDocument):
+            return self._compute_metrics(
+                text1.clean_text, text2.clean_text, text1.tokens, text2.tokens,
+                text1.features, text2.features,
+                text1.token_set, text2.token_set,
+                text1.ngram_set, text2.ngram_set, progress, timer
+            )
+
+        def ngram_set(tokens):
+            return lambda n: set(tuple(tokens[i:i+n])
+                                 for i in range(len(tokens) - n + 1))
+
+        return self._compute_metrics(
+            text1, text2, tokens1, tokens2, features1, features2,
+            set(tokens1), set(tokens2), ngram_set(tokens1), ngram_set(tokens2), progress, timer
+        )
+
+    def _compute_metrics(self, text1: str, text2: str, tokens1: List[str], tokens2: List[str],
+                         features1: Dict, features2: Dict, token_set1: set, token_set2: set,
+                         ngram_set1: Callable[[int], set], ngram_set2: Callable[[int], set],
+                         progress: Optional[Callable[[str], None]] = None,
+                         timer: Optional[StageTimer] = None) -> Dict[str, float]:
+        timer = timer or StageTimer()
+        chars = len(text1) + len(text2)
+        tokens = len(tokens1) + len(tokens2)
+
+        def ngram_similarity(n):
+            if len(tokens1) < n or len(tokens2) < n:
+                return 0.0
+            return self.jaccard_similarity(ngram_set1(n), ngram_set2(n))
+
+        # Métricas léxicas
+        with timer.stage('tfidf', chars=chars):
+            metrics = {'tfidf_cosine': self.cosine_similarity_tfidf(text1, text2)}
+
+        with timer.stage('lexical_sets', tokens=tokens):
+            vocab_metrics = self.vocabulary_overlap(features1['vocabulary'],
+                                                    features2['vocabulary'])
+            metrics.update({
+                'jaccard_words': self.jaccard_similarity(token_set1, token_set2),
+                'jaccard_vocab': vocab_metrics['jaccard'],
+                'dice_coefficient': vocab_metrics['dice_coefficient'],
+
+                # Métricas de n-gramas
+                'bigram_similarity': ngram_similarity(2),
+                'trigram_similarity': ngram_similarity(3),
+                'fourgram_similarity': ngram_similarity(4),
+            })
+
+        if progress is not None:
+            progress('sequence')
+
+        # Métricas de secuencia
+        with timer.stage('sequence_matcher', chars=chars):
+            metrics['sequence_matcher'] = self.sequence_similarity(text1, text2)
+        with timer.stage('levenshtein', chars=chars):
+            metrics['levenshtein'] = self.levenshtein_similarity(text1, text2)
+        with timer.stage('lcs', chars=chars):
+            metrics['lcs_ratio'] = self.longest_common_subsequence(text1, text2)
+
+        # Métricas estructurales
+        with timer.stage('structural'):
+            metrics['structural_similarity'] = self.structural_similarity(features1, features2)
+
+        # Métricas de contención
+        with timer.stage('containment', tokens=tokens):
+            containment = self.containment_score(tokens1, tokens2)
+        metrics.update({
             'containment_1_in_2': containment[0],
             'containment_2_in_1': containment[1],
             'max_containment': max(containment),
-        }
+        })
 
         return metrics
@@ -9,24 +9,82 @@ Maneja la limpieza y normalización de textos antes del análisis.
 Incluye tokenización, eliminación de stopwords y extracción de features.
 """
 
+import hashlib
+import os
 import re
+import threading
 import unicodedata
-from typing import List, Set
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize, sent_tokenize
+from typing import List, Optional, Set
 from unidecode import unidecode
 
-# Descargar recursos de NLTK si no están disponibles
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
+# Los recursos de NLTK se verifican la primera vez que se necesitan, no al
+# importar el módulo. PLAGIARISM_NLTK_DOWNLOAD=0 desactiva las descargas
+# (la tokenización usa entonces el respaldo con expresiones regulares).
+_nltk_ready = False
+_nltk_lock = threading.Lock()
 
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords', quiet=True)
+
+def ensure_nltk_resources():
+    "Verifica (y descarga si se permite) punkt y stopwords una sola vez"
+    global _nltk_ready
+
+    if _nltk_ready:
+        return
+
+    with _nltk_lock:
+        if _nltk_ready:
+            return
+
+        import nltk
+
+        allow_download = os.environ.get('PLAGIARISM_NLTK_DOWNLOAD', '1') != '0'
+        for resource, package in (('tokenizers/punkt', 'punkt'),
+                                  ('corpora/stopwords', 'stopwords')):
+            try:
+                nltk.data.find(resource)
+            except LookupError:
+                if allow_download:
+                    nltk.download(package, quiet=True)
+
+        _nltk_ready = True
+
+
+class ProcessedDocument:
+    """
+    Documento preprocesado una sola vez y reutilizable en muchas comparaciones.
+    """
+
+    __slots__ = ('text', 'clean_text', 'tokens', 'token_set', 'sentences',
+                 'features', 'vocabulary', '_ngram_sets')
+
+    def __init__(self, text: str, clean_text: str, tokens: List[str],
+                 sentences: List[str], features: dict):
+        """
+            text: Texto original
+            clean_text: Texto normalizado (normalize_text)
+            tokens: Tokens del texto normalizado
+            sentences: Oraciones del texto original
+            features: Características de extract_features sobre el original
+        """
+        self.text = text
+        self.clean_text = clean_text
+        self.tokens = tokens
+        self.token_set = set(tokens)
+        self.sentences = sentences
+        self.features = features
+        self.vocabulary = features['vocabulary']
+        self._ngram_sets = {}
+
+    def ngram_set(self, n: int) -> Set[tuple]:
+        """
+        Conjunto de n-gramas de los tokens (calculado una vez por n).
+        """
+        ngrams = self._ngram_sets.get(n)
+        if ngrams is None:
+            ngrams = set(tuple(self.tokens[i:i+n])
+                         for i in range(len(self.tokens) - n + 1))
+            self._ngram_sets[n] = ngrams
+        return ngrams
 
 
 class TextPreprocessor:
@@ -40,19 +98,29 @@ class TextPreprocessor:
         self.language = language
         self.remove_stopwords = remove_stopwords
 
-        # Mapeo de idiomas
-        lang_map = {
-            'spanish': 'spanish',
-            'es': 'spanish',
-            'english': 'english',
-            'en': 'english'
-        }
-
-        try:
-            self.stopwords = set(stopwords.words(
-                lang_map.get(language, 'spanish')))
-        except:
-            self.stopwords = set()
+        self._stopwords = None
+
+    @property
+    def stopwords(self) -> Set[str]:
+        "Stopwords del idioma (se cargan la primera vez que se usan)"
+        if self._stopwords is None:
+            # Mapeo de idiomas
+            lang_map = {
+                'spanish': 'spanish',
+                'es': 'spanish',
+                'english': 'english',
+                'en': 'english'
+            }
+
+            try:
+                ensure_nltk_resources()
+                from nltk.corpus import stopwords
+                self._stopwords = set(stopwords.words(
+                    lang_map.get(self.language, 'spanish')))
+            except:
+                self._stopwords = set()
+
+        return self._stopwords
 
     def clean_text(self, text: str, level: str = 'medium') -> str:
         """
@@ -104,6 +172,8 @@ class TextPreprocessor:
             Lista de tokens
         """
         try:
+            ensure_nltk_resources()
+            from nltk.tokenize import word_tokenize
             tokens = word_tokenize(text.lower())
         except:
             # Fallback simple si NLTK falla
@@ -128,6 +198,8 @@ class TextPreprocessor:
             Lista de oraciones
         """
         try:
+            ensure_nltk_resources()
+            from nltk.tokenize import sent_tokenize
             sentences = sent_tokenize(text)
         except:
             # Fallback simple
@@ -151,18 +223,41 @@ class TextPreprocessor:
 
         return [tuple(tokens[i:i+n]) for i in range(len(tokens) - n + 1)]
 
-    def extract_features(self, text: str) -> dict:
+    def get_shingle_hashes(self, tokens: List[str], n: int = 3) -> Set[int]:
+        """
+        Genera el conjunto de shingles (n-gramas de palabras) como enteros
+        de 64 bits estables entre procesos, útiles para índices y MinHash.
+
+        Args:
+            tokens: Lista de tokens
+            n: Tamaño del n-grama
+
+        Returns:
+            Conjunto de hashes de los n-gramas
+        """
+        return {
+            int.from_bytes(hashlib.blake2b(
+                ' '.join(ngram).encode('utf-8'), digest_size=8).digest(), 'little')
+            for ngram in self.get_ngrams(tokens, n)
+        }
+
+    def extract_features(self, text: str, sentences: Optional[List[str]] = None,
+                         tokens: Optional[List[str]] = None) -> dict:
         """
         Extrae características del texto para análisis.
 
         Args:
             text: Texto a analizar
+            sentences: Oraciones ya tokenizadas del texto (opcional)
+            tokens: Palabras ya tokenizadas del texto (opcional)
 
         Returns:
             Diccionario con características
         """
-        sentences = self.tokenize_sentences(text)
-        tokens = self.tokenize_words(text)
+        if sentences is None:
+            sentences = self.tokenize_sentences(text)
+        if tokens is None:
+            tokens = self.tokenize_words(text)
 
         return {
             'char_count': len(text),
@@ -198,3 +293,35 @@ class TextPreprocessor:
         text = re.sub(r'\s+', ' ', text).strip()
 
         return text
+
+    def process(self, text: str, ngram_sizes: tuple = (2, 3, 4)) -> ProcessedDocument:
+        """
+        Preprocesa un texto una sola vez para compararlo con muchos otros.
+
+        Args:
+            text: Texto original
+            ngram_sizes: Tamaños de n-gramas a precalcular
+
+        Returns:
+            ProcessedDocument con texto limpio, tokens, oraciones y features
+        """
+        clean_text = self.normalize_text(text)
+        sentences = self.tokenize_sentences(text)
+        # Una sola pasada de palabras: las features usan los tokens del texto
+        # normalizado (solo difieren de los del original en URLs, correos y
+        # teléfonos, que normalize_text elimina, y en caracteres que cambian
+        # con NFKC)
+        tokens = self.tokenize_words(clean_text)
+
+        document = ProcessedDocument(
+            text=text,
+            clean_text=clean_text,
+            tokens=tokens,
+            sentences=sentences,
+            features=self.extract_features(text, sentences=sentences, tokens=tokens)
+        )
+
+        for n in ngram_sizes:
+            document.ngram_set(n)
+
+        return document